@@ -0,0 +1,122 @@
+"""
+Аналитика по транзакциям: построчная агрегация в Python против GROUP BY в БД.
+Показывает число переданных строк и время.
+
+    PYTHONPATH=src python benchmarks/bench_analytics.py [rows]
+    BENCH_DATABASE_URL=postgresql+asyncpg://... PYTHONPATH=src python benchmarks/bench_analytics.py
+
+Для sqlite (по умолчанию) таблицы создаются в памяти.
+"""
+
+import asyncio
+import datetime as dt
+import itertools
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from application.transaction.cqs.queries import analytics
+from domain.base import Entity
+from domain.transaction.model import EnumTransactionType, Transaction
+from domain.user.model import User
+
+DATABASE_URL = os.environ.get('BENCH_DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+DAYS = 365
+
+
+async def legacy_handle(*, cur_user: User, db_session: AsyncSession) -> tuple[analytics.Analytics, int]:
+    """Прежняя реализация: все строки диапазона в Python"""
+
+    stream = await db_session.stream(
+        select(Transaction.date, Transaction.type, Transaction.amount, Transaction.account_id, Transaction.category_id)
+        .where(Transaction.user_id == cur_user.id)
+        .order_by(Transaction.date)
+    )
+
+    rows = 0
+    income, expense = list[analytics.AnalyticsByDay](), list[analytics.AnalyticsByDay]()
+    async for date, type, amount, account_id, category_id in stream:
+        rows += 1
+        by_day = income if type == EnumTransactionType.INCOME else expense
+        if not by_day or by_day[-1].date != date:
+            by_day.append(analytics.AnalyticsByDay(date=date))
+        by_day[-1].by_accounts[account_id] += amount
+        by_day[-1].by_categories[category_id] += amount
+
+    return analytics.Analytics(income=income, expense=expense), rows
+
+
+async def seed(session_maker: async_sessionmaker[AsyncSession], user: User) -> None:
+    accounts = [uuid4() for _ in range(3)]
+    categories = [uuid4() for _ in range(10)]
+    start = dt.date.today() - dt.timedelta(days=DAYS)
+    now = dt.datetime.now(dt.UTC)
+
+    rows = (
+        {
+            'id': uuid4(),
+            'date': start + dt.timedelta(days=random.randrange(DAYS)),
+            'type': random.choice(list(EnumTransactionType)),
+            'user_id': user.id,
+            'amount': Decimal(random.randrange(100, 100_000)) / 100,
+            'account_id': random.choice(accounts),
+            'category_id': random.choice(categories),
+            'lsn': 0,
+            'updated': now,
+        }
+        for _ in range(ROWS)
+    )
+    async with session_maker() as db_session:
+        for chunk in itertools.batched(rows, 2000):
+            await db_session.execute(insert(Transaction), chunk)
+        await db_session.commit()
+
+
+async def main() -> None:
+    engine = create_async_engine(DATABASE_URL)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    user = User(id=uuid4())
+
+    if engine.dialect.name == 'sqlite':
+        # В sqlite нет последовательностей, serial заполняем счетчиком
+        counter = itertools.count(1)
+        event.listen(
+            engine.sync_engine,
+            'connect',
+            lambda dbapi_connection, _: dbapi_connection.create_function('next_val', 0, lambda: next(counter)),
+        )
+        async with engine.begin() as connection:
+            await connection.run_sync(Entity.metadata.create_all)
+
+    await seed(session_maker, user)
+
+    try:
+        async with session_maker() as db_session:
+            started = time.perf_counter()
+            legacy, legacy_rows = await legacy_handle(cur_user=user, db_session=db_session)
+            legacy_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            result = await analytics.handle(cur_user=user, db_session=db_session)
+            sql_time = time.perf_counter() - started
+            sql_rows = len((await db_session.execute(analytics.render_statement(cur_user=user, queries=[]))).all())
+
+        assert len(result.income) == len(legacy.income) and len(result.expense) == len(legacy.expense)
+        print(f'legacy:   {legacy_rows:>9} rows  {legacy_time:8.3f} s')
+        print(f'group by: {sql_rows:>9} rows  {sql_time:8.3f} s')
+    finally:
+        async with session_maker() as db_session:
+            await db_session.execute(delete(Transaction).where(Transaction.user_id == user.id))
+            await db_session.commit()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""
+Выгрузка истории транзакций: загрузка ORM-сущностей списком против потоковой выгрузки.
+Показывает строки в секунду и пик памяти Python (tracemalloc).
+
+    PYTHONPATH=src python benchmarks/bench_export.py [rows]
+    BENCH_DATABASE_URL=postgresql+asyncpg://... PYTHONPATH=src python benchmarks/bench_export.py
+
+Для sqlite (по умолчанию) таблицы создаются в памяти.
+"""
+
+import asyncio
+import csv
+import datetime as dt
+import io
+import itertools
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from application.transaction.cqs.queries import export
+from domain.account.model import Account
+from domain.base import Entity
+from domain.category.model import Category
+from domain.transaction.model import EnumTransactionType, Transaction
+from domain.user.model import User
+
+DATABASE_URL = os.environ.get('BENCH_DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+
+async def legacy_export(*, cur_user: User, db_session: AsyncSession) -> int:
+    """Прежний путь: сущности целиком в памяти, затем CSV"""
+
+    transactions = list(
+        await db_session.scalars(
+            select(Transaction).where(Transaction.user_id == cur_user.id).order_by(Transaction.date, Transaction.id)
+        )
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for transaction in transactions:
+        writer.writerow([transaction.id, transaction.date, transaction.type, transaction.amount, transaction.tags])
+    return len(buffer.getvalue().encode())
+
+
+def stream_export(**kwargs) -> Callable[..., Awaitable[int]]:
+    async def run(*, cur_user: User, db_session: AsyncSession) -> int:
+        size = 0
+        async for chunk in await export.handle(cur_user=cur_user, db_session=db_session, **kwargs):
+            size += len(chunk)
+        return size
+
+    return run
+
+
+async def seed(session_maker: async_sessionmaker[AsyncSession], user: User) -> None:
+    now = dt.datetime.now(dt.UTC)
+    accounts = [
+        {'id': uuid4(), 'code': f'account-{i}', 'title': 'Account', 'user_id': user.id, 'lsn': 0, 'updated_at': now}
+        for i in range(3)
+    ]
+    categories = [
+        {'id': uuid4(), 'code': f'category-{i}', 'title': 'Category', 'user_id': user.id, 'lsn': 0, 'updated_at': now}
+        for i in range(10)
+    ]
+    rows = (
+        {
+            'id': uuid4(),
+            'date': dt.date.today() - dt.timedelta(days=random.randrange(3650)),
+            'type': random.choice(list(EnumTransactionType)),
+            'user_id': user.id,
+            'amount': Decimal(random.randrange(100, 100_000)) / 100,
+            'account_id': random.choice(accounts)['id'],
+            'category_id': random.choice(categories)['id'],
+            'tags': ['bench'],
+            'lsn': 0,
+            'updated': now,
+        }
+        for _ in range(ROWS)
+    )
+    async with session_maker() as db_session:
+        user_row = {'id': user.id, 'nickname': f'bench-{user.id}', 'lsn': 0, 'updated': now}
+        await db_session.execute(insert(User), [user_row])
+        await db_session.execute(insert(Account), accounts)
+        await db_session.execute(insert(Category), categories)
+        for chunk in itertools.batched(rows, 2000):
+            await db_session.execute(insert(Transaction), chunk)
+        await db_session.commit()
+
+
+async def bench(name: str, run: Callable[..., Awaitable[int]], session_maker, user: User) -> None:
+    async with session_maker() as db_session:
+        started = time.perf_counter()
+        size = await run(cur_user=user, db_session=db_session)
+        elapsed = time.perf_counter() - started
+
+    # Память отдельным проходом: tracemalloc сильно замедляет выполнение
+    async with session_maker() as db_session:
+        tracemalloc.start()
+        await run(cur_user=user, db_session=db_session)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f'{name:<16} {ROWS / elapsed:>10,.0f} rows/s  peak {peak / 2**20:8.1f} MiB  {size / 2**20:8.1f} MiB out')
+
+
+async def main() -> None:
+    engine = create_async_engine(DATABASE_URL)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    user = User(id=uuid4())
+
+    if engine.dialect.name == 'sqlite':
+        # В sqlite нет последовательностей, serial заполняем счетчиком
+        counter = itertools.count(1)
+        event.listen(
+            engine.sync_engine,
+            'connect',
+            lambda dbapi_connection, _: dbapi_connection.create_function('next_val', 0, lambda: next(counter)),
+        )
+        async with engine.begin() as connection:
+            await connection.run_sync(Entity.metadata.create_all)
+
+    await seed(session_maker, user)
+
+    try:
+        await bench('orm list + csv', legacy_export, session_maker, user)
+        await bench('stream csv', stream_export(), session_maker, user)
+        await bench('stream ndjson', stream_export(format=export.EnumExportFormat.NDJSON), session_maker, user)
+        await bench('stream csv.gz', stream_export(compress=True), session_maker, user)
+    finally:
+        async with session_maker() as db_session:
+            for entity_cls in (Transaction, Category, Account):
+                await db_session.execute(delete(entity_cls).where(entity_cls.user_id == user.id))
+            await db_session.execute(delete(User).where(User.id == user.id))
+            await db_session.commit()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
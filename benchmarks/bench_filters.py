@@ -0,0 +1,59 @@
+"""
+Сравнение построения запросов по фильтрам: прежний обход обработчиков и сводный план фильтров.
+
+    PYTHONPATH=src python benchmarks/bench_filters.py
+"""
+
+import timeit
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import Select
+
+from application.account.storage.repository import AccountRepository
+from application.category.storage.repository import CategoryRepository
+from shared.storage.filters import UseInForArrays
+from shared.storage.repository import RepositoryBase
+
+NUMBER = 10_000
+REPEAT = 5
+
+
+def legacy_apply_filters(repository_cls: type[RepositoryBase], statement: Select, filters: dict[str, Any]) -> Select:
+    config = repository_cls.config
+    all_filters = filters | config.default_filters
+    for handler in config.filter_handlers:
+        if issubclass(handler, UseInForArrays):
+            statement = handler.process_filters(config.entity_cls, statement, all_filters)
+            continue
+        for filter_name in list(all_filters):
+            if (handle := getattr(handler, filter_name, None)) is not None:
+                statement = handle(config.entity_cls, statement, all_filters.pop(filter_name))
+    return statement.filter_by(**all_filters)
+
+
+def bench(name: str, repository_cls: type[RepositoryBase], filters: dict[str, Any]) -> None:
+    base_statement = repository_cls.select()
+    legacy = min(
+        timeit.repeat(
+            lambda: legacy_apply_filters(repository_cls, base_statement, filters), number=NUMBER, repeat=REPEAT
+        )
+    )
+    plan = min(
+        timeit.repeat(lambda: repository_cls.apply_filters(base_statement, filters), number=NUMBER, repeat=REPEAT)
+    )
+    legacy_us, plan_us = legacy / NUMBER * 1e6, plan / NUMBER * 1e6
+    print(f'{name:<40} legacy {legacy_us:7.2f} us  plan {plan_us:7.2f} us  x{legacy / plan:.2f}')
+
+
+def main() -> None:
+    user_id = uuid4()
+    account_filters = {'account_id': uuid4(), 'user_id': user_id, 'for_update': True}
+    bench('account: account_id, user_id, for_update', AccountRepository, account_filters)
+    bench('account: code[], user_id', AccountRepository, {'code': ['a', 'b', 'c'], 'user_id': user_id})
+    bench('category: category_id, user_id', CategoryRepository, {'category_id': uuid4(), 'user_id': user_id})
+    bench('category: category_id[], title', CategoryRepository, {'category_id': [uuid4(), uuid4()], 'title': 't'})
+
+
+if __name__ == '__main__':
+    main()
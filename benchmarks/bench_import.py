@@ -0,0 +1,119 @@
+"""
+Импорт выписки: транзакции в секунду для первого импорта и повторного (все строки - дубли).
+
+    PYTHONPATH=src python benchmarks/bench_import.py [rows]
+    BENCH_DATABASE_URL=postgresql+asyncpg://... PYTHONPATH=src python benchmarks/bench_import.py
+
+Для sqlite (по умолчанию) таблицы создаются в памяти.
+"""
+
+import asyncio
+import datetime as dt
+import itertools
+import os
+import random
+import sys
+import time
+from uuid import uuid4
+
+from sqlalchemy import DefaultClause, delete, event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from application.transaction.cqs.commands import bulk_import
+from domain.account.model import Account
+from domain.base import Entity
+from domain.category.model import Category
+from domain.tag.model import TransactionTag
+from domain.transaction.model import Transaction
+from domain.transaction.rollup import TransactionDailyRollup
+from domain.user.model import User
+
+DATABASE_URL = os.environ.get('BENCH_DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+
+def make_records() -> list[dict[str, str]]:
+    return [
+        {
+            'date': (dt.date.today() - dt.timedelta(days=random.randrange(3650))).isoformat(),
+            'type': random.choice(['INCOME', 'EXPENSE']),
+            'amount': str(random.randrange(100, 100_000) / 100),
+            'account_code': f'account-{random.randrange(3)}',
+            'category_code': f'category-{random.randrange(10)}',
+            'description': '',
+            'tags': 'bench' if i % 3 == 0 else '',
+        }
+        for i in range(ROWS)
+    ]
+
+
+async def seed(session_maker: async_sessionmaker[AsyncSession], user: User) -> None:
+    now = dt.datetime.now(dt.UTC)
+    async with session_maker() as db_session:
+        user_row = {'id': user.id, 'nickname': f'bench-{user.id}', 'lsn': 0, 'updated': now}
+        await db_session.execute(insert(User), [user_row])
+        await db_session.execute(
+            insert(Account),
+            [
+                {'code': f'account-{i}', 'title': 'Account', 'user_id': user.id, 'lsn': 0, 'updated_at': now}
+                for i in range(3)
+            ],
+        )
+        await db_session.execute(
+            insert(Category),
+            [
+                {'code': f'category-{i}', 'title': 'Category', 'user_id': user.id, 'lsn': 0, 'updated_at': now}
+                for i in range(10)
+            ],
+        )
+        await db_session.commit()
+
+
+async def bench(name: str, session_maker, user: User, records: list[dict[str, str]]) -> None:
+    async with session_maker() as db_session:
+        started = time.perf_counter()
+        report = await bulk_import.handle(cur_user=user, db_session=db_session, records=records)
+        elapsed = time.perf_counter() - started
+
+    print(f'{name:<16} {ROWS / elapsed:>10,.0f} rows/s  imported {report.imported}  duplicates {report.duplicates}')
+
+
+async def main() -> None:
+    engine = create_async_engine(DATABASE_URL)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    user = User(id=uuid4())
+
+    if engine.dialect.name == 'sqlite':
+        # В sqlite нет последовательностей, serial заполняем счетчиком
+        counter = itertools.count(1)
+        event.listen(
+            engine.sync_engine,
+            'connect',
+            lambda dbapi_connection, _: dbapi_connection.create_function('next_val', 0, lambda: next(counter)),
+        )
+        # lsn и updated новых строк в рабочей схеме заполняет БД
+        columns = Transaction.__table__.c  # type: ignore
+        columns.lsn.server_default = DefaultClause(func.next_val())
+        columns.updated.server_default = DefaultClause(func.current_timestamp())
+        async with engine.begin() as connection:
+            await connection.run_sync(Entity.metadata.create_all)
+
+    await seed(session_maker, user)
+    records = make_records()
+
+    try:
+        await bench('first import', session_maker, user, records)
+        await bench('same again', session_maker, user, records)
+    finally:
+        async with session_maker() as db_session:
+            transaction_ids = select(Transaction.id).where(Transaction.user_id == user.id)
+            await db_session.execute(delete(TransactionTag).where(TransactionTag.entity_id.in_(transaction_ids)))
+            for entity_cls in (TransactionDailyRollup, Transaction, Category, Account):
+                await db_session.execute(delete(entity_cls).where(entity_cls.user_id == user.id))
+            await db_session.execute(delete(User).where(User.id == user.id))
+            await db_session.commit()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
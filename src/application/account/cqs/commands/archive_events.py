@@ -0,0 +1,32 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.account.storage.archive import ARCHIVABLE, archive_events, archive_horizon
+from domain.account.events import AccountEvent
+
+# Событий за одну транзакцию переноса
+ARCHIVE_BATCH_SIZE = 10_000
+
+
+async def handle(*, db_session: AsyncSession, batch_size: int = ARCHIVE_BATCH_SIZE, **_) -> int:
+    """
+    Переносит в архив события старше ARCHIVE_RETENTION пачками по keyset serial, пачка - своя транзакция.
+    Просмотр идет до конца таблицы: created_at не упорядочен по serial, старое событие может стоять за новыми.
+    Возвращает число перенесенных событий.
+    """
+
+    before = archive_horizon()
+    archived, last_serial = 0, 0
+    while True:
+        statement = (
+            select(AccountEvent.serial)
+            .where(AccountEvent.serial > last_serial, AccountEvent.created_at < before, *ARCHIVABLE)
+            .order_by(AccountEvent.serial)
+            .limit(batch_size)
+        )
+        if not (serials := list(await db_session.scalars(statement))):
+            return archived
+
+        archived += await archive_events(db_session, serials)
+        await db_session.commit()
+        last_serial = serials[-1]
@@ -0,0 +1,25 @@
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.account.storage.ledger import compact_ledger
+from domain.account.model import AccountID
+
+# Событий за одну транзакцию сворачивания
+COMPACT_BATCH_SIZE = 10_000
+
+
+async def handle(
+    *,
+    db_session: AsyncSession,
+    account_id: AccountID | list[AccountID] | None = None,
+    limit: int = COMPACT_BATCH_SIZE,
+    **_,
+) -> int:
+    """Сворачивает дельты счетов в режиме LEDGER в снимки балансов, возвращает число свернутых событий"""
+
+    account_ids = [account_id] if isinstance(account_id, UUID) else account_id
+    folded = await compact_ledger(db_session, account_ids, limit=limit)
+    await db_session.commit()
+
+    return folded
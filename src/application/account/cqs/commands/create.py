@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from application.account.errors import AccountIntegrityError
 from application.account.schemas.model import (
     SchemaAccountBalance,
+    SchemaAccountBalanceMode,
     SchemaAccountCode,
     SchemaAccountCurrency,
     SchemaAccountDescription,
@@ -12,7 +13,10 @@ from application.account.schemas.model import (
     SchemaAccountTitle,
     SchemaAccountType,
 )
+from application.tag.storage.tags import sync_tags
+from domain.account.events import AccountEvent
 from domain.account.model import Account
+from domain.tag.model import AccountTag
 from domain.user.model import User
 from shared.cqs.command import CommandBase
 from shared.cqs.parser import auto_parse_kwargs
@@ -23,6 +27,7 @@ class CreateAccountCommand(CommandBase):
     title: SchemaAccountTitle
     type: SchemaAccountType
     balance: SchemaAccountBalance
+    balance_mode: SchemaAccountBalanceMode
     description: SchemaAccountDescription
     currency: SchemaAccountCurrency
     tags: SchemaAccountTags
@@ -42,6 +47,7 @@ async def handle(
         description=command.description,
         type=command.type,
         balance=command.balance,
+        balance_mode=command.balance_mode,
         currency=command.currency,
         tags=command.tags,
         user_id=cur_user.id,
@@ -49,6 +55,9 @@ async def handle(
     db_session.add(account)
 
     try:
+        await db_session.flush()
+        db_session.add(AccountEvent.create(account=account))
+        await sync_tags(db_session, AccountTag, {account.id: account.tags})
         await db_session.commit()
     except sqlalchemy.exc.IntegrityError as exc:
         raise AccountIntegrityError from exc
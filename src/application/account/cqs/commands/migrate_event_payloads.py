@@ -0,0 +1,42 @@
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.account.events import PAYLOAD_COLUMNS, AccountEvent, decode_payload
+
+MIGRATE_BATCH_SIZE = 5000
+
+
+async def handle(*, db_session: AsyncSession, batch_size: int = MIGRATE_BATCH_SIZE, **_) -> int:
+    """
+    Переносит поля событий из JSON data в типизированные колонки пачками в порядке serial, пачка - своя транзакция.
+    Декодирование то же, что при чтении еще не перенесенного события, после переноса data = NULL.
+    Повторный запуск продолжает от первого неперенесенного события. Возвращает число перенесенных.
+    """
+
+    table = AccountEvent.__table__
+    # SET по ключам параметров: все колонки полей, неиспользуемые типом события - NULL
+    statement = update(table).where(table.c.serial == bindparam('serial_'))
+
+    migrated, last_serial = 0, 0
+    while True:
+        rows = (
+            await db_session.execute(
+                select(AccountEvent.serial, AccountEvent.event, AccountEvent.account_id, AccountEvent.data)
+                .where(AccountEvent.serial > last_serial, AccountEvent.data.is_not(None))
+                .order_by(AccountEvent.serial)
+                .limit(batch_size)
+            )
+        ).all()
+        if not rows:
+            return migrated
+
+        params = list[dict]()
+        for row in rows:
+            columns = dict.fromkeys(PAYLOAD_COLUMNS)
+            columns.update(decode_payload(row).to_columns(row.event))
+            params.append({'serial_': row.serial, 'data': None, **columns})
+        await db_session.execute(statement, params)
+        await db_session.commit()
+
+        migrated += len(rows)
+        last_serial = rows[-1].serial
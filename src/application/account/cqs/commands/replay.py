@@ -0,0 +1,38 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.account.errors import AccountNotFoundError
+from application.account.schemas.model import SchemaAccountID
+from application.account.storage.ledger import lock_accounts
+from application.account.storage.replay import SNAPSHOT_EVERY, replay_accounts
+from domain.account.replay import AccountState
+from domain.user.model import User
+from shared.cqs.command import CommandBase
+from shared.cqs.parser import auto_parse_kwargs
+
+
+class ReplayAccountCommand(CommandBase):
+    account_id: SchemaAccountID
+    snapshot_every: int | None = SNAPSHOT_EVERY
+
+
+@auto_parse_kwargs(command_type=ReplayAccountCommand)
+async def handle(
+    *,
+    db_session: AsyncSession,
+    command: ReplayAccountCommand,
+    cur_user: User | None = None,
+    **_,
+) -> AccountState:
+    """Баланс и валюта счета по событиям после последнего снимка, новые снимки сохраняются"""
+
+    # Блокировка на время воспроизведения: без незакоммиченных событий снимки не пропустят ни одного
+    accounts = await lock_accounts(
+        db_session, debit_ids=[command.account_id], credit_ids=(), user_id=cur_user and cur_user.id
+    )
+    if command.account_id not in accounts:
+        raise AccountNotFoundError('Account not found')
+
+    states = await replay_accounts(db_session, [command.account_id], snapshot_every=command.snapshot_every)
+    await db_session.commit()
+
+    return states[command.account_id]
@@ -1,13 +1,13 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from application.account.cqs.commands.transfer_money_batch import apply_transfer
 from application.account.cqs.queries.load_dst import load_dst_account
 from application.account.cqs.queries.load_src import load_src_account
-from application.account.errors import AccountNotEnoughBalanceError
 from application.account.schemas.model import (
     SchemaAccountTransferAmount,
     SchemaTransferRate,
 )
-from domain.account.events import AccountEvent
+from application.account.storage.ledger import lock_accounts
 from domain.account.model import Account
 from domain.vo.money import TransferRate
 from shared.cqs.command import CommandBase
@@ -19,8 +19,10 @@ class TransferMoneyCommand(CommandBase):
     transfer_rate: SchemaTransferRate = TransferRate(1)
 
 
-@load_src_account(for_update=True)
-@load_dst_account(for_update=True)
+# Счета находим без блокировки, блокируем оба одним запросом в порядке id:
+# две блокировки подряд взаимоблокировали встречные переводы
+@load_src_account()
+@load_dst_account()
 @auto_parse_kwargs(command_type=TransferMoneyCommand)
 async def handle(
     *,
@@ -30,19 +32,16 @@ async def handle(
     command: TransferMoneyCommand,
     **_,
 ) -> None:
-    if src_account.balance < command.amount:
-        raise AccountNotEnoughBalanceError
+    accounts = await lock_accounts(db_session, debit_ids=[src_account.id], credit_ids=[dst_account.id])
 
     db_session.add_all(
-        AccountEvent.transfer_money(
-            src_account=src_account,
-            dst_account=dst_account,
+        apply_transfer(
+            accounts,
+            src_account_id=src_account.id,
+            dst_account_id=dst_account.id,
             amount=command.amount,
             transfer_rate=command.transfer_rate,
         )
     )
 
-    src_account.balance -= command.amount
-    dst_account.balance += command.amount * command.transfer_rate
-
     await db_session.commit()
@@ -0,0 +1,120 @@
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.account.errors import AccountNotEnoughBalanceError, AccountNotFoundError
+from application.account.schemas.model import (
+    SchemaAccountID,
+    SchemaAccountTransferAmount,
+    SchemaTransferRate,
+)
+from application.account.storage.ledger import lock_accounts
+from application.account.storage.repository import AccountEventRepository
+from domain.account.events import AccountEvent
+from domain.account.model import Account, AccountID
+from domain.user.model import User
+from domain.vo.money import Money, TransferRate
+from shared.cqs.command import CommandBase
+from shared.cqs.parser import auto_parse_kwargs
+
+
+class TransferMoneyItem(CommandBase):
+    src_account_id: SchemaAccountID
+    dst_account_id: SchemaAccountID
+    amount: SchemaAccountTransferAmount
+    transfer_rate: SchemaTransferRate = TransferRate(1)
+
+
+class TransferMoneyBatchCommand(CommandBase):
+    transfers: list[TransferMoneyItem]
+    # False - первая ошибка отменяет всю пачку, True - ошибочные переводы пропускаются и попадают в отчет
+    skip_failed: bool = False
+
+
+class TransferMoneyFailure(BaseModel):
+    index: int  # Номер перевода в пачке, с 0
+    code: str
+    message: str
+
+
+class TransferMoneyBatchReport(BaseModel):
+    applied: list[int] = Field(default_factory=list)
+    failed: list[TransferMoneyFailure] = Field(default_factory=list)
+
+
+def apply_transfer(
+    accounts: dict[AccountID, Account],
+    *,
+    src_account_id: AccountID,
+    dst_account_id: AccountID,
+    amount: Money,
+    transfer_rate: TransferRate,
+) -> tuple[AccountEvent, AccountEvent]:
+    """Перевод между заблокированными счетами: проверка баланса, новые балансы и пара событий"""
+
+    if (src_account := accounts.get(src_account_id)) is None:
+        raise AccountNotFoundError('Source account not found error')
+    if (dst_account := accounts.get(dst_account_id)) is None:
+        raise AccountNotFoundError('Destination account not found error')
+    if src_account.effective_balance < amount:
+        raise AccountNotEnoughBalanceError
+
+    src_event, dst_event = AccountEvent.transfer_money(
+        src_account=src_account,
+        dst_account=dst_account,
+        amount=amount,
+        transfer_rate=transfer_rate,
+    )
+    src_event.apply_delta(src_account, -amount)
+    dst_event.apply_delta(dst_account, amount * transfer_rate)
+
+    return src_event, dst_event
+
+
+@auto_parse_kwargs(command_type=TransferMoneyBatchCommand)
+async def handle(
+    *,
+    db_session: AsyncSession,
+    command: TransferMoneyBatchCommand,
+    cur_user: User | None = None,
+    **_,
+) -> TransferMoneyBatchReport:
+    """
+    Пачка переводов в одной транзакции: все счета блокируются одним запросом в порядке id (для счетов LEDGER - журналы),
+    переводы применяются по порядку (следующий видит балансы после предыдущих),
+    события всех переводов пишутся одним многострочным INSERT.
+    """
+
+    accounts = await lock_accounts(
+        db_session,
+        debit_ids={transfer.src_account_id for transfer in command.transfers},
+        credit_ids={transfer.dst_account_id for transfer in command.transfers},
+        user_id=cur_user and cur_user.id,
+    )
+
+    report = TransferMoneyBatchReport()
+    events = list[AccountEvent]()
+    for index, transfer in enumerate(command.transfers):
+        try:
+            events.extend(
+                apply_transfer(
+                    accounts,
+                    src_account_id=transfer.src_account_id,
+                    dst_account_id=transfer.dst_account_id,
+                    amount=transfer.amount,
+                    transfer_rate=transfer.transfer_rate,
+                )
+            )
+        except (AccountNotFoundError, AccountNotEnoughBalanceError) as error:
+            if not command.skip_failed:
+                # Балансы уже измененных счетов в сессии откатываются вместе с блокировками
+                await db_session.rollback()
+                raise
+            report.failed.append(TransferMoneyFailure(index=index, code=error.code, message=error.message))
+        else:
+            report.applied.append(index)
+
+    if events:
+        await AccountEventRepository(db_session).insert_many(events, returning=False)
+    await db_session.commit()
+
+    return report
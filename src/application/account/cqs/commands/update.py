@@ -1,69 +1,82 @@
-from typing import get_args
+from typing import Any, get_args
 
 import sqlalchemy.exc
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from application.account.cqs.queries.load import load_account
-from application.account.errors import AccountIntegrityError
+from application.account.errors import AccountIntegrityError, AccountNotFoundError, AccountVersionConflictError
 from application.account.schemas.model import (
     SchemaAccountCode,
     SchemaAccountDescription,
+    SchemaAccountID,
     SchemaAccountStatus,
     SchemaAccountTags,
     SchemaAccountTitle,
     SchemaAccountType,
 )
+from application.account.storage.repository import AccountRepository
+from application.tag.storage.tags import sync_tags
 from domain.account.model import Account
+from domain.tag.model import AccountTag
+from domain.user.model import User
 from shared.cqs.command import CommandBase
 from shared.cqs.parser import auto_parse_kwargs
+from shared.cqs.retry import retry_on_conflict
 
 
-class UpdateAccountCodeCommand(CommandBase):
-    code: SchemaAccountCode
+class UpdateAccountCommandBase(CommandBase):
+    def render_values(self) -> dict[str, Any]:
+        """Значения колонок: для загруженной сущности и для UPDATE ... WHERE lsn"""
+
+        raise NotImplementedError
 
     def apply(self, account: Account) -> Account:
-        account.code = self.code
+        for key, value in self.render_values().items():
+            setattr(account, key, value)
         return account
 
 
-class UpdateAccountTitleCommand(CommandBase):
+class UpdateAccountCodeCommand(UpdateAccountCommandBase):
+    code: SchemaAccountCode
+
+    def render_values(self) -> dict[str, Any]:
+        return {'code': self.code}
+
+
+class UpdateAccountTitleCommand(UpdateAccountCommandBase):
     title: SchemaAccountTitle
 
-    def apply(self, account: Account) -> Account:
-        account.title = self.title
-        return account
+    def render_values(self) -> dict[str, Any]:
+        return {'title': self.title}
 
 
-class UpdateAccountDescriptionCommand(CommandBase):
+class UpdateAccountDescriptionCommand(UpdateAccountCommandBase):
     description: SchemaAccountDescription
 
-    def apply(self, account: Account) -> Account:
-        account.description = self.description
-        return account
+    def render_values(self) -> dict[str, Any]:
+        return {'description': self.description}
 
 
-class UpdateAccountTypeCommand(CommandBase):
+class UpdateAccountTypeCommand(UpdateAccountCommandBase):
     type: SchemaAccountType
 
-    def apply(self, account: Account) -> Account:
-        account.type = self.type
-        return account
+    def render_values(self) -> dict[str, Any]:
+        return {'type': self.type}
 
 
-class UpdateAccountTagsCommand(CommandBase):
+class UpdateAccountTagsCommand(UpdateAccountCommandBase):
     tags: SchemaAccountTags
 
-    def apply(self, account: Account) -> Account:
-        account.tags = self.tags
-        return account
+    def render_values(self) -> dict[str, Any]:
+        return {'tags': self.tags}
 
 
-class UpdateAccountStatusCommand(CommandBase):
+class UpdateAccountStatusCommand(UpdateAccountCommandBase):
     status: SchemaAccountStatus
 
-    def apply(self, account: Account) -> Account:
-        account.status = self.status
-        return account
+    def render_values(self) -> dict[str, Any]:
+        return {'status': self.status}
 
 
 UpdateAccountCommand = (
@@ -85,12 +98,67 @@ async def handle(
     commands: list[UpdateAccountCommand],
     **_,  # cur_user, code или account_id
 ) -> Account:
+    old_tags = list(account.tags)
     for command in commands:
         command.apply(account)
 
     try:
+        if account.tags != old_tags:
+            await sync_tags(db_session, AccountTag, {account.id: account.tags})
         await db_session.commit()
     except sqlalchemy.exc.IntegrityError as exc:
         raise AccountIntegrityError from exc
 
     return account
+
+
+@auto_parse_kwargs(command_types=get_args(UpdateAccountCommand))
+async def handle_cas(
+    *,
+    account_id: SchemaAccountID,
+    db_session: AsyncSession,
+    commands: list[UpdateAccountCommand],
+    expected_lsn: int | None = None,
+    cur_user: User | None = None,
+    **_,
+) -> Account:
+    """
+    Изменение без блокировки: UPDATE ... WHERE id = :id AND lsn = :expected_lsn RETURNING *.
+    expected_lsn - версия, которую видел клиент, без него берется текущая.
+    Если счет успели изменить, AccountVersionConflictError.
+    """
+
+    where = [Account.user_id == cur_user.id] if cur_user is not None else []
+    # Строки, вставленные до умолчания lsn и ни разу не изменявшиеся, хранят NULL - это не отсутствие строки
+    current = select(Account.id, Account.lsn).where(Account.id == account_id, *where)
+
+    if expected_lsn is None:
+        if (row := (await db_session.execute(current)).one_or_none()) is None:
+            raise AccountNotFoundError
+        expected_lsn = row.lsn
+
+    values = dict[str, Any]()
+    for command in commands:
+        values.update(command.render_values())
+
+    try:
+        account = await AccountRepository(db_session).compare_and_swap(
+            account_id, expected_lsn=expected_lsn, values=values, where=where
+        )
+        if account is None:
+            # Повторное чтение только на неудаче: счета нет или версия другая
+            if (row := (await db_session.execute(current)).one_or_none()) is None:
+                raise AccountNotFoundError
+            raise AccountVersionConflictError(details={'expected_lsn': expected_lsn, 'lsn': row.lsn})
+
+        if 'tags' in values:
+            await sync_tags(db_session, AccountTag, {account.id: account.tags})
+        await db_session.commit()
+    except sqlalchemy.exc.IntegrityError as exc:
+        raise AccountIntegrityError from exc
+
+    return account
+
+
+# Для вызовов без expected_lsn: версия читается заново на каждой попытке, гонка повторяется, а не уходит клиенту
+handle_optimistic = retry_on_conflict()(handle_cas)
@@ -1,11 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from application.account.cqs.queries.load import load_account
+from application.account.cqs.queries.load import LoadByAccountCodeQuery, LoadByAccountIDQuery
+from application.account.errors import AccountNotFoundError
 from application.account.schemas.model import (
     SchemaAccountBalance,
 )
-from domain.account.events import AccountEvent
-from domain.account.model import Account
+from application.account.storage.ledger import load_ledger_account
+from application.account.storage.mutations import AccountMutation, mutate_account
+from domain.account.events import AccountEvent, BalanceAdjustmentPayload, EnumAccountEvent
+from domain.account.model import Account, EnumAccountBalanceMode
+from domain.user.model import User
 from shared.cqs.command import CommandBase
 from shared.cqs.parser import auto_parse_kwargs
 
@@ -14,27 +18,52 @@ class UpdateAccountBalanceCommand(CommandBase):
     balance: SchemaAccountBalance
 
 
-@load_account(for_update=True)
-@auto_parse_kwargs(command_type=UpdateAccountBalanceCommand)
+@auto_parse_kwargs(
+    command_type=UpdateAccountBalanceCommand,
+    query_types=[LoadByAccountIDQuery | LoadByAccountCodeQuery],
+)
 async def handle(
     *,
-    account: Account,
     db_session: AsyncSession,
     command: UpdateAccountBalanceCommand,
-    **_,  # cur_user, code или account_id
+    queries: list[LoadByAccountIDQuery | LoadByAccountCodeQuery],
+    account: Account | None = None,
+    cur_user: User | None = None,
+    **_,
 ) -> Account:
-    if account.balance == command.balance:
-        return account
-
-    db_session.add(
-        AccountEvent.balance_adjustment(
-            account=account,
-            old_balance=account.balance,
-            new_balance=command.balance,
-        )
+    """
+    Сравнение, UPDATE и событие BALANCE_ADJUSTMENT одним запросом, см. mutate_account.
+    Счету в режиме LEDGER дописывается дельта до нового баланса под блокировкой журнала.
+    """
+
+    where = [query.render_filter() for query in queries]
+    if account is not None:
+        where.append(Account.id == account.id)
+    if not where:
+        raise AccountNotFoundError('Account not found')
+    if cur_user is not None:
+        where.append(Account.user_id == cur_user.id)
+
+    balance = command.balance
+    mutation = AccountMutation(
+        changed=lambda old: old.balance != balance,
+        values=lambda old: {'balance': balance},
+        event=EnumAccountEvent.BALANCE_ADJUSTMENT,
+        payload=lambda old: BalanceAdjustmentPayload(old_balance=old.balance, new_balance=balance),
+        delta=lambda old: balance - old.balance,
     )
+    account = await mutate_account(db_session, [*where, Account.balance_mode == EnumAccountBalanceMode.ROW], mutation)
+    if account is None and (account := await load_ledger_account(db_session, where=where)) is not None:
+        if account.balance_mode == EnumAccountBalanceMode.ROW:
+            # Счет перевели в ROW после первой попытки, под блокировкой журнала режим уже не сменится
+            account = await mutate_account(db_session, [Account.id == account.id], mutation)
+        elif (old_balance := account.effective_balance) != balance:
+            event = AccountEvent.balance_adjustment(account=account, old_balance=old_balance, new_balance=balance)
+            event.apply_delta(account, balance - old_balance)
+            db_session.add(event)
+    if account is None:
+        raise AccountNotFoundError('Account not found')
 
-    account.balance = command.balance
     await db_session.commit()
 
     return account
@@ -0,0 +1,57 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.account.cqs.queries.load import LoadByAccountCodeQuery, LoadByAccountIDQuery
+from application.account.errors import AccountNotFoundError
+from application.account.schemas.model import SchemaAccountBalanceMode
+from application.account.storage.ledger import compact_ledger, lock_ledgers
+from domain.account.model import Account
+from domain.user.model import User
+from shared.cqs.command import CommandBase
+from shared.cqs.parser import auto_parse_kwargs
+
+
+class UpdateAccountBalanceModeCommand(CommandBase):
+    balance_mode: SchemaAccountBalanceMode
+
+
+@auto_parse_kwargs(
+    command_type=UpdateAccountBalanceModeCommand,
+    query_types=[LoadByAccountIDQuery | LoadByAccountCodeQuery],
+)
+async def handle(
+    *,
+    db_session: AsyncSession,
+    command: UpdateAccountBalanceModeCommand,
+    queries: list[LoadByAccountIDQuery | LoadByAccountCodeQuery],
+    account: Account | None = None,
+    cur_user: User | None = None,
+    **_,
+) -> Account:
+    """
+    Смена режима баланса. Под исключительной блокировкой журнала и строки счета дельты сворачиваются в снимок,
+    поэтому в обоих режимах Account.balance после смены - полный баланс.
+    """
+
+    where = [query.render_filter() for query in queries]
+    if account is not None:
+        where.append(Account.id == account.id)
+    if not where:
+        raise AccountNotFoundError('Account not found')
+    if cur_user is not None:
+        where.append(Account.user_id == cur_user.id)
+
+    statement = select(Account).where(*where)
+    if (account := await db_session.scalar(statement)) is None:
+        raise AccountNotFoundError('Account not found')
+
+    await lock_ledgers(db_session, exclusive=[account.id])
+    await compact_ledger(db_session, [account.id])
+    statement = statement.with_for_update().execution_options(populate_existing=True)
+    if (account := await db_session.scalar(statement)) is None:
+        raise AccountNotFoundError('Account not found')
+
+    account.balance_mode = command.balance_mode
+    await db_session.commit()
+
+    return account
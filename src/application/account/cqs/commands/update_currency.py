@@ -1,12 +1,16 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from application.account.cqs.queries.load import load_account
+from application.account.cqs.queries.load import LoadByAccountCodeQuery, LoadByAccountIDQuery
+from application.account.errors import AccountNotFoundError
 from application.account.schemas.model import (
     SchemaAccountCurrency,
     SchemaTransferRate,
 )
-from domain.account.events import AccountEvent
-from domain.account.model import Account
+from application.account.storage.ledger import compact_ledger, load_ledger_account
+from application.account.storage.mutations import AccountMutation, mutate_account
+from domain.account.events import EditCurrencyPayload, EnumAccountEvent
+from domain.account.model import Account, EnumAccountBalanceMode
+from domain.user.model import User
 from domain.vo.money import TransferRate
 from shared.cqs.command import CommandBase
 from shared.cqs.parser import auto_parse_kwargs
@@ -17,28 +21,51 @@ class UpdateAccountCurrencyCommand(CommandBase):
     transfer_rate: SchemaTransferRate = TransferRate(1)
 
 
-@load_account(for_update=True)
-@auto_parse_kwargs(command_type=UpdateAccountCurrencyCommand)
+@auto_parse_kwargs(
+    command_type=UpdateAccountCurrencyCommand,
+    query_types=[LoadByAccountIDQuery | LoadByAccountCodeQuery],
+)
 async def handle(
     *,
-    account: Account,
     db_session: AsyncSession,
     command: UpdateAccountCurrencyCommand,
-    **_,  # cur_user, code или account_id
+    queries: list[LoadByAccountIDQuery | LoadByAccountCodeQuery],
+    account: Account | None = None,
+    cur_user: User | None = None,
+    **_,
 ) -> Account:
-    if command.currency == account.currency:
-        return account
-
-    db_session.add(
-        AccountEvent.edit_currency(
-            account=account,
-            old_currency=account.currency,
-            new_currency=command.currency,
-            transfer_rate=command.transfer_rate,
-        )
+    """
+    Сравнение, пересчет баланса по курсу и событие EDIT_CURRENCY одним запросом, см. mutate_account.
+    Для счета в режиме LEDGER сначала сворачиваются дельты: исключительная блокировка журнала не пускает новые.
+    """
+
+    where = [query.render_filter() for query in queries]
+    if account is not None:
+        where.append(Account.id == account.id)
+    if not where:
+        raise AccountNotFoundError('Account not found')
+    if cur_user is not None:
+        where.append(Account.user_id == cur_user.id)
+
+    currency, transfer_rate = command.currency, command.transfer_rate
+    mutation = AccountMutation(
+        changed=lambda old: old.currency != currency,
+        # Как Account.update_currency
+        values=lambda old: {'currency': currency, 'balance': old.balance * transfer_rate},
+        event=EnumAccountEvent.EDIT_CURRENCY,
+        payload=lambda old: EditCurrencyPayload(
+            new_currency=currency, old_currency=old.currency, transfer_rate=transfer_rate
+        ),
     )
+    account = await mutate_account(db_session, [*where, Account.balance_mode == EnumAccountBalanceMode.ROW], mutation)
+    if account is None and (account := await load_ledger_account(db_session, where=where)) is not None:
+        # Счет могли перевести в ROW после первой попытки, тогда сворачивать нечего
+        if account.balance_mode == EnumAccountBalanceMode.LEDGER:
+            await compact_ledger(db_session, [account.id])
+        account = await mutate_account(db_session, [Account.id == account.id], mutation)
+    if account is None:
+        raise AccountNotFoundError('Account not found')
 
-    account.update_currency(command.currency, command.transfer_rate)
     await db_session.commit()
 
     return account
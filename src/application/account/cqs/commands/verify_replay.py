@@ -0,0 +1,102 @@
+import asyncio
+from collections.abc import Sequence
+
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from application.account.storage.replay import replay_accounts
+from domain.account.model import Account, AccountID
+from domain.vo.money import Currency, Money
+from shared.storage.dialect import get_dialect, snapshot_isolation_level
+
+VERIFY_BATCH_SIZE = 500
+VERIFY_CONCURRENCY = 4
+
+
+class AccountReplayMismatch(BaseModel):
+    account_id: AccountID
+    balance: Money
+    currency: Currency
+    replayed_balance: Money
+    replayed_currency: Currency | None  # None - у счета нет события CREATE, валюта не сверяется
+
+
+class VerifyReplayReport(BaseModel):
+    checked: int = 0
+    mismatched: list[AccountReplayMismatch] = Field(default_factory=list)
+
+
+async def verify_batch(
+    db_session: AsyncSession, account_ids: Sequence[AccountID]
+) -> tuple[int, list[AccountReplayMismatch]]:
+    """
+    Сверка пачки счетов: баланс, включая несвернутые дельты, и валюта против воспроизведенных.
+    Без блокировок, счета и события читаются в одном снимке - переводы по счетам пачки не ждут сверку.
+    Снимки воспроизведения не сохраняются: они верны только под блокировкой счета, см. replay_accounts.
+    Возвращает число проверенных счетов и расхождения.
+    """
+
+    if isolation_level := snapshot_isolation_level(get_dialect(db_session)):
+        await db_session.connection(execution_options={'isolation_level': isolation_level})
+
+    accounts = list(await db_session.scalars(select(Account).where(Account.id.in_(account_ids))))
+    states = await replay_accounts(db_session, [account.id for account in accounts], snapshot_every=None)
+    mismatched = [
+        AccountReplayMismatch(
+            account_id=account.id,
+            balance=account.effective_balance,
+            currency=account.currency,
+            replayed_balance=state.balance,
+            replayed_currency=state.currency,
+        )
+        for account in accounts
+        if (state := states[account.id]).balance != account.effective_balance
+        or state.currency not in (None, account.currency)
+    ]
+    await db_session.rollback()
+
+    return len(accounts), mismatched
+
+
+async def handle(
+    *,
+    async_session_maker: async_sessionmaker[AsyncSession],
+    batch_size: int = VERIFY_BATCH_SIZE,
+    concurrency: int = VERIFY_CONCURRENCY,
+    **_,
+) -> VerifyReplayReport:
+    """
+    Сверка всех счетов по их событиям: пачки по batch_size счетов в порядке id, до concurrency пачек одновременно,
+    каждая в своей сессии и транзакции.
+    """
+
+    report = VerifyReplayReport()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def verify(account_ids: list[AccountID]) -> None:
+        try:
+            async with async_session_maker() as db_session:
+                checked, mismatched = await verify_batch(db_session, account_ids)
+            report.checked += checked
+            report.mismatched.extend(mismatched)
+        finally:
+            semaphore.release()
+
+    last_id: AccountID | None = None
+    async with asyncio.TaskGroup() as group:
+        while True:
+            statement = select(Account.id).order_by(Account.id).limit(batch_size)
+            if last_id is not None:
+                statement = statement.where(Account.id > last_id)
+            async with async_session_maker() as db_session:
+                account_ids = list(await db_session.scalars(statement))
+            if not account_ids:
+                break
+
+            await semaphore.acquire()
+            group.create_task(verify(account_ids))
+            last_id = account_ids[-1]
+
+    report.mismatched.sort(key=lambda mismatch: mismatch.account_id)
+    return report
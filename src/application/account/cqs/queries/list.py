@@ -1,6 +1,6 @@
 from typing import Literal
 
-from sqlalchemy import ColumnElement, not_, select
+from sqlalchemy import ColumnElement, select
 
 from application.account.cqs.queries.load import AccountsIsolateByUser
 from application.account.schemas.model import (
@@ -9,8 +9,10 @@ from application.account.schemas.model import (
     SchemaAccountTags,
     SchemaAccountType,
 )
+from application.tag.storage.tags import render_tags_filter
 from application.user.schemas.model import SchemaUserID
 from domain.account.model import Account, EnumAccountStatus
+from domain.tag.model import AccountTag
 from shared.cqs.generator import generate_list_handle
 from shared.cqs.query import QueryFilterBase
 
@@ -56,17 +58,7 @@ class AccountTagsQuery(QueryFilterBase):
     filter_type: Literal['HAVE_ANY', 'HAVE_ALL', 'HAVE_NOTHING', 'HAVE_EXACTLY'] = 'HAVE_ALL'
 
     def render_filter(self) -> ColumnElement[bool]:
-        match self.filter_type:
-            case 'HAVE_ALL':
-                return Account.tags.contains(self.tags)
-            case 'HAVE_ANY':
-                return Account.tags.overlap(self.tags)
-            case 'HAVE_NOTHING':
-                return not_(Account.tags.overlap(self.tags))
-            case 'HAVE_EXACTLY':
-                return Account.tags == self.tags
-
-        raise ValueError(f'Unknown filter_type={self.filter_type}')
+        return render_tags_filter(AccountTag, Account.id, self.tags, self.filter_type)
 
 
 handle = generate_list_handle(
@@ -1,36 +1,103 @@
-from sqlalchemy import ColumnElement, Select, and_, select
+from pydantic import AwareDatetime
+from sqlalchemy import ColumnElement, Select, and_, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from application.account.cqs.queries.load import AccountsIsolateByUser
-from application.account.schemas.model import SchemaAccountCode, SchemaAccountID
+from application.account.schemas.model import SchemaAccountCode, SchemaAccountEventType, SchemaAccountID
+from application.account.storage.archive import AccountEventHistory, may_touch_archive
 from application.account.storage.repository import AccountEventRepository
 from domain.account.events import AccountEvent
 from domain.account.model import Account
-from shared.cqs.generator import generate_list_handle_with_cursor
-from shared.cqs.query import QueryFilterBase, QueryStatementBase
+from domain.user.model import User
+from shared.cqs.parser import auto_parse_kwargs
+from shared.cqs.plans import register_handle
+from shared.cqs.query import QueryFilterBase, QueryStatementBase, apply_queries
 
 
 class EventsIsolateByAccountID(QueryFilterBase):
     account_id: SchemaAccountID
 
     def render_filter(self) -> ColumnElement[bool]:
-        return AccountEvent.account_id == self.account_id
+        return AccountEventHistory.account_id == self.account_id
 
 
 class EventsIsolateByAccountCode(QueryStatementBase):
     code: SchemaAccountCode
 
     def apply_query(self, statement: Select) -> Select:
-        return statement.join(Account, and_(Account.id == AccountEvent.account_id, Account.code == self.code))
+        return statement.join(
+            Account,
+            and_(
+                Account.id == AccountEventHistory.account_id,
+                Account.user_id == AccountEventHistory.user_id,
+                Account.code == self.code,
+            ),
+        )
 
 
 EventsIsolateByAccount = EventsIsolateByAccountID | EventsIsolateByAccountCode
 
 
-handle = generate_list_handle_with_cursor(
-    base_statement=select(AccountEvent).order_by(AccountEvent.serial.desc()),
-    query_types=[
-        EventsIsolateByAccount,  # Изолируем по аккаунту если пробросили айдишник
-        AccountsIsolateByUser,  # Изолируем по пользователю если пробросили cur_user
-    ],
-    entity_repository_cls=AccountEventRepository,
+class EventsCreatedAtRangeQuery(QueryFilterBase):
+    """Полуинтервал [min_created_at, max_created_at): месяцы и дни стыкуются без пересечений"""
+
+    min_created_at: AwareDatetime | None = None
+    max_created_at: AwareDatetime | None = None
+
+    def render_filter(self) -> ColumnElement[bool]:
+        filters = []
+        if self.min_created_at:
+            filters.append(AccountEventHistory.created_at >= self.min_created_at)
+        if self.max_created_at:
+            filters.append(AccountEventHistory.created_at < self.max_created_at)
+        return and_(true(), *filters)
+
+
+class EventsTypeQuery(QueryFilterBase):
+    event: SchemaAccountEventType | list[SchemaAccountEventType]
+
+    def render_filter(self) -> ColumnElement[bool]:
+        if isinstance(self.event, list):
+            return AccountEventHistory.event.in_(self.event)
+        return AccountEventHistory.event == self.event
+
+
+ListEventsQuery = EventsIsolateByAccount | EventsCreatedAtRangeQuery | EventsTypeQuery
+
+
+# Keyset-пагинация по (created_at, serial): диапазон дат и страница - один range scan индекса счета или пользователя
+base_statement = select(AccountEventHistory).order_by(
+    AccountEventHistory.created_at.desc(), AccountEventHistory.serial.desc()
+)
+
+register_handle(
+    'list',
+    base_statement.limit(AccountEventRepository.config.default_limit),
+    [EventsIsolateByAccount, EventsCreatedAtRangeQuery, EventsTypeQuery],
 )
+
+
+@auto_parse_kwargs(query_types=[EventsIsolateByAccount, EventsCreatedAtRangeQuery, EventsTypeQuery])
+async def handle(
+    *,
+    db_session: AsyncSession,
+    queries: list[ListEventsQuery],
+    cur_user: User | None = None,
+    cursor: str | None = None,
+    **_,
+) -> tuple[list[AccountEvent], str | None]:
+    """События счета или пользователя из горячей таблицы и архива, архив не читается, если в нем нечего искать"""
+
+    account_event_repo = AccountEventRepository(db_session)
+
+    statement = apply_queries(base_statement, *queries)
+    if cur_user is not None:
+        # Изолируем по пользователю если пробросили cur_user
+        statement = statement.where(AccountEventHistory.user_id == cur_user.id)
+
+    min_created_at = next(
+        (query.min_created_at for query in queries if isinstance(query, EventsCreatedAtRangeQuery)), None
+    )
+    statement = statement.params(include_archive=may_touch_archive(min_created_at))
+
+    items, next_cursor = await account_event_repo.list_cursor(statement, cursor)
+    return items, next_cursor and account_event_repo.dumps_cursor(statement, next_cursor)
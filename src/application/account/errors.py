@@ -1,4 +1,4 @@
-from shared.errors.application import ApplicationError, IntegrityError, NotFoundError
+from shared.errors.application import ApplicationError, IntegrityError, NotFoundError, VersionConflictError
 
 
 class AccountNotFoundError(NotFoundError):
@@ -14,3 +14,8 @@ class AccountIntegrityError(IntegrityError):
 class AccountNotEnoughBalanceError(ApplicationError):
     code = 'ACCOUNT_NOT_ENOUGH_BALANCE_ERROR'
     message = 'Account balance is not enough to perform the operation'
+
+
+class AccountVersionConflictError(VersionConflictError):
+    code = 'ACCOUNT_VERSION_CONFLICT_ERROR'
+    message = 'Account was modified by another request'
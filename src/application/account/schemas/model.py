@@ -1,16 +1,18 @@
 import datetime as dt
 from typing import Annotated
 
-from pydantic import AfterValidator, Field
+from pydantic import AfterValidator, AliasChoices, Field
 from pydantic_extra_types.currency_code import Currency as SchemaCurrency
 
 from application.user.schemas.model import SchemaUserID
+from domain.account.events import EnumAccountEvent
 from domain.account.model import (
     AccountCode,
     AccountDescription,
     AccountID,
     AccountTags,
     AccountTitle,
+    EnumAccountBalanceMode,
     EnumAccountStatus,
     EnumAccountType,
 )
@@ -25,6 +27,8 @@ type SchemaAccountType = Annotated[EnumAccountType, Field(default=EnumAccountTyp
 type SchemaAccountStatus = Annotated[EnumAccountStatus, Field(default=EnumAccountStatus.ACTIVE)]
 type SchemaAccountTags = Annotated[AccountTags, Field(default_factory=list)]
 type SchemaAccountCurrency = Annotated[SchemaCurrency, Field(default='RUB')]
+type SchemaAccountBalanceMode = Annotated[EnumAccountBalanceMode, Field(default=EnumAccountBalanceMode.ROW)]
+type SchemaAccountEventType = EnumAccountEvent
 type SchemaTransferRate = Annotated[TransferRate, Field(ge=0)]
 type SchemaAccountBalance = Annotated[
     Money,
@@ -51,7 +55,9 @@ class AccountSchema(SchemaBase):
     tags: SchemaAccountTags
 
     currency: SchemaAccountCurrency
-    balance: SchemaAccountBalance
+    # У счета в режиме LEDGER - снимок плюс несвернутые дельты
+    balance: Annotated[SchemaAccountBalance, Field(validation_alias=AliasChoices('effective_balance', 'balance'))]
+    balance_mode: SchemaAccountBalanceMode
 
     updated_at: dt.datetime
     created_at: dt.datetime
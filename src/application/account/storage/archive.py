@@ -0,0 +1,65 @@
+import datetime as dt
+from collections.abc import Collection
+
+from sqlalchemy import Boolean, bindparam, delete, false, insert, null, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from domain.account.archive import AccountEventArchive
+from domain.account.events import AccountEvent
+from shared.storage.dialect import get_dialect, supports_data_modifying_cte
+from shared.utils import now
+
+# События старше срока хранения переносятся в архив.
+# В архиве только created_at < момент переноса - ARCHIVE_RETENTION, на этом держится include_archive
+ARCHIVE_RETENTION = dt.timedelta(days=90)
+
+# Переносятся только свернутые и перенесенные в колонки события
+ARCHIVABLE = (~AccountEvent.pending, AccountEvent.data.is_(None))
+
+# False - ветка архива не выполняется: в Postgres это One-Time Filter над ней, а не фильтр по строкам
+include_archive = bindparam('include_archive', True, type_=Boolean)
+
+
+def archive_horizon(at: dt.datetime | None = None) -> dt.datetime:
+    return (at or now()) - ARCHIVE_RETENTION
+
+
+def may_touch_archive(min_created_at: dt.datetime | None) -> bool:
+    """Могут ли события от min_created_at и позже лежать в архиве"""
+
+    return min_created_at is None or min_created_at < archive_horizon()
+
+
+def _render_history():
+    hot, cold = AccountEvent.__table__, AccountEventArchive.__table__
+    absent = {'data': null(), 'pending': false()}
+    archived = select(*(cold.c[column.name] if column.name in cold.c else absent[column.name] for column in hot.c))
+    return select(hot).union_all(archived.where(include_archive)).subquery('account_event_history')
+
+
+# События горячей таблицы и архива, загружаются как AccountEvent.
+# Фильтры внешнего запроса Postgres опускает в обе ветки UNION ALL, индексы работают в каждой
+AccountEventHistory = aliased(AccountEvent, _render_history(), name='AccountEventHistory')
+
+
+async def archive_events(db_session: AsyncSession, serials: Collection[int]) -> int:
+    """
+    Переносит события из account_events в архив. Несвернутые и еще не перенесенные в колонки события остаются.
+    Возвращает число перенесенных. Коммит за вызывающим.
+    """
+
+    hot, cold = AccountEvent.__table__, AccountEventArchive.__table__
+    columns = [column.name for column in cold.c]
+    movable = (hot.c.serial.in_(serials), *ARCHIVABLE)
+
+    if supports_data_modifying_cte(get_dialect(db_session)):
+        # Один запрос: удаленные строки сразу вставляются в архив
+        moved = delete(hot).where(*movable).returning(*(hot.c[column] for column in columns)).cte('moved')
+        statement = insert(cold).from_select(columns, select(*moved.c)).returning(cold.c.serial)
+        return len((await db_session.scalars(statement)).all())
+
+    statement = insert(cold).from_select(columns, select(*(hot.c[column] for column in columns)).where(*movable))
+    await db_session.execute(statement)
+    result = await db_session.execute(delete(hot).where(*movable))
+    return result.rowcount
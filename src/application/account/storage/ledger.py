@@ -0,0 +1,119 @@
+from collections import defaultdict
+from collections.abc import Collection, Iterable, Sequence
+from contextlib import AsyncExitStack
+
+from sqlalchemy import ColumnElement, bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.account.storage.repository import AccountRepository
+from domain.account.events import AccountEvent
+from domain.account.model import Account, AccountID, EnumAccountBalanceMode
+from domain.user.model import UserID
+from domain.vo.money import Money
+from shared.storage.advisory_lock import advisory_lock
+from shared.storage.dialect import get_dialect
+
+# Счета в режиме LEDGER не блокируют строку на запись. Вместо этого на время транзакции берется advisory блокировка
+# журнала счета: разделяемая для зачислений, исключительная для списаний, корректировок и смены валюты.
+# Зачисления идут параллельно, а проверка баланса при списании видит все дельты, закоммиченные до нее.
+# Строку счета меняет только сворачивание дельт, оно не меняет итоговый баланс и блокировку журнала не берет.
+
+
+async def lock_ledgers(
+    db_session: AsyncSession,
+    *,
+    exclusive: Iterable[AccountID] = (),
+    shared: Iterable[AccountID] = (),
+) -> None:
+    """Блокировки журналов счетов до конца транзакции, в порядке id"""
+
+    if get_dialect(db_session).name != 'postgresql':
+        return  # В SQLite пишущие транзакции и так сериализованы блокировкой базы
+
+    exclusive = set(exclusive)
+    async with AsyncExitStack() as stack:
+        for account_id in sorted({*exclusive, *shared}):
+            await stack.enter_async_context(
+                advisory_lock(f'account_ledger-{account_id}', db_session=db_session, shared=account_id not in exclusive)
+            )
+
+
+async def lock_accounts(
+    db_session: AsyncSession,
+    *,
+    debit_ids: Collection[AccountID],
+    credit_ids: Collection[AccountID],
+    user_id: UserID | None = None,
+) -> dict[AccountID, Account]:
+    """
+    Счета для изменения баланса: строки счетов ROW под FOR UPDATE, журналы счетов LEDGER под advisory блокировкой.
+    Строки блокируются раньше журналов, всеми командами в одном порядке.
+    """
+
+    repository = AccountRepository(db_session)
+    accounts = await repository.lock_many(*debit_ids, *credit_ids, user_id=user_id)
+    ledger_ids = [account.id for account in accounts.values() if account.balance_mode == EnumAccountBalanceMode.LEDGER]
+    if not ledger_ids:
+        return accounts
+
+    await lock_ledgers(db_session, exclusive=set(debit_ids).intersection(ledger_ids), shared=ledger_ids)
+    # Дельты, закоммиченные до блокировки. Счет могли перевести в ROW, пока ждали блокировку - тогда блокируем строку
+    accounts.update(await repository.lock_many(*ledger_ids, user_id=user_id))
+    return accounts
+
+
+async def load_ledger_account(db_session: AsyncSession, *, where: Sequence[ColumnElement[bool]]) -> Account | None:
+    """
+    Счет под исключительной блокировкой журнала, режим и дельты перечитаны после блокировки.
+    Режим меняется только под этой блокировкой: пока ждали, счет могли перевести в ROW, но до коммита уже не переведут.
+    Вызывающий проверяет balance_mode и счет в режиме ROW меняет по строке.
+    """
+
+    if (account := await db_session.scalar(select(Account).where(*where))) is None:
+        return None
+
+    await lock_ledgers(db_session, exclusive=[account.id])
+    statement = select(Account).where(Account.id == account.id).execution_options(populate_existing=True)
+    return await db_session.scalar(statement)
+
+
+async def compact_ledger(
+    db_session: AsyncSession,
+    account_ids: Collection[AccountID] | None = None,
+    *,
+    limit: int | None = None,
+) -> int:
+    """
+    Сворачивает несвернутые дельты в Account.balance: сбрасывает pending событий и прибавляет их сумму к балансу.
+    UPDATE событий и счета в одной транзакции, читатели видят либо дельты, либо новый снимок. limit - событий за вызов.
+    Коммит за вызывающим. Возвращает число свернутых событий.
+    """
+
+    pending = select(AccountEvent.serial).where(AccountEvent.pending)
+    if account_ids is not None:
+        pending = pending.where(AccountEvent.account_id.in_(account_ids))
+    if limit is not None:
+        pending = pending.order_by(AccountEvent.serial).limit(limit)
+
+    statement = (
+        update(AccountEvent)
+        .where(AccountEvent.serial.in_(pending), AccountEvent.pending)
+        .values(pending=False)
+        .returning(AccountEvent.account_id, AccountEvent.delta)
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await db_session.execute(statement)).all()
+
+    deltas = defaultdict[AccountID, Money](Money)
+    for account_id, delta in rows:
+        deltas[account_id] += delta
+    if deltas:
+        table = Account.__table__
+        await db_session.execute(
+            update(table)
+            .where(table.c.id == bindparam('account_id'))
+            .values(balance=table.c.balance + bindparam('delta')),
+            [{'account_id': account_id, 'delta': deltas[account_id]} for account_id in sorted(deltas)],
+        )
+
+    return len(rows)
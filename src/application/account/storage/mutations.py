@@ -0,0 +1,97 @@
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import ColumnElement, Text, exists, insert, literal, null, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from domain.account.events import AccountEvent, AccountEventPayload, EnumAccountEvent
+from domain.account.model import Account
+from shared.storage.dialect import get_dialect, supports_data_modifying_cte
+
+# Старая строка счета: колонки CTE в Postgres, загруженный счет в остальных СУБД.
+# Поэтому changed, values, payload и delta пишутся выражениями, которые имеют смысл для обоих.
+type AccountRow = Any
+
+
+def _event_value(column: str, value: Any) -> ColumnElement:
+    if isinstance(value, ColumnElement):
+        return value
+    return literal(value, AccountEvent.__table__.c[column].type)
+
+
+@dataclass(slots=True, frozen=True)
+class AccountMutation:
+    """Изменение счета по старой строке: changed - менять ли, values - новые значения, payload и delta - событие"""
+
+    changed: Callable[[AccountRow], Any]
+    values: Callable[[AccountRow], Mapping[str, Any]]
+    event: EnumAccountEvent
+    payload: Callable[[AccountRow], AccountEventPayload]
+    delta: Callable[[AccountRow], Any] | None = None
+
+
+def render_account_mutation(where: Sequence[ColumnElement[bool]], mutation: AccountMutation):
+    """
+    Один запрос из изменяющих CTE:
+    old - строка счета под FOR UPDATE, upd - UPDATE при changed, ev - INSERT события по измененной строке.
+    Возвращает новую строку или, если менять нечего, текущую.
+    """
+
+    table = Account.__table__
+    old = select(table).where(*where).with_for_update().cte('old')
+    upd = (
+        update(table)
+        .where(table.c.id == old.c.id, mutation.changed(old.c))
+        .values(mutation.values(old.c))
+        .returning(*table.c)
+        .cte('upd')
+    )
+    event, delta = mutation.event, mutation.delta
+    columns = mutation.payload(old.c).to_columns(event)
+    ev = insert(AccountEvent).from_select(
+        ['user_id', 'account_id', 'event', *columns, 'delta'],
+        select(
+            upd.c.user_id,
+            upd.c.id,
+            literal(str(event), Text),
+            *(_event_value(column, value) for column, value in columns.items()),
+            null() if delta is None else delta(old.c),
+        ).join_from(upd, old, old.c.id == upd.c.id),
+    )
+    unchanged = select(*(old.c[column.name] for column in table.c)).where(~exists(select(upd.c.id)))
+    statement = select(*(upd.c[column.name] for column in table.c)).add_cte(ev.cte('ev')).union_all(unchanged)
+    # Через алиас, а не from_statement: column_property счета (pending_balance) считаются по новой строке
+    return select(aliased(Account, statement.subquery('account')))
+
+
+async def mutate_account(
+    db_session: AsyncSession, where: Sequence[ColumnElement[bool]], mutation: AccountMutation
+) -> Account | None:
+    """
+    Изменение счета и запись события: в Postgres один запрос, строка заблокирована только на время запроса.
+    None - счета нет. Коммит за вызывающим.
+    """
+
+    if supports_data_modifying_cte(get_dialect(db_session)):
+        statement = render_account_mutation(where, mutation)
+        return await db_session.scalar(statement.execution_options(populate_existing=True))
+
+    # Без изменяющих CTE: чтение, UPDATE ... RETURNING и INSERT события в одной транзакции.
+    # В SQLite запись сериализуется блокировкой базы, старая строка не устареет до UPDATE
+    statement = select(Account).where(*where).execution_options(populate_existing=True)
+    if (account := await db_session.scalar(statement)) is None or not mutation.changed(account):
+        return account
+
+    payload = mutation.payload(account)
+    delta = None if mutation.delta is None else mutation.delta(account)
+    account = await db_session.scalar(
+        update(Account)
+        .where(Account.id == account.id)
+        .values(mutation.values(account))
+        .returning(Account)
+        .execution_options(populate_existing=True, synchronize_session=False)
+    )
+    db_session.add(AccountEvent.from_payload(account=account, event=mutation.event, payload=payload, delta=delta))
+    return account
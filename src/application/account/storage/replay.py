@@ -0,0 +1,68 @@
+from collections.abc import Collection
+
+from sqlalchemy import Subquery, and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.account.storage.archive import AccountEventHistory
+from domain.account.events import PAYLOAD_COLUMNS, decode_payload
+from domain.account.model import AccountID
+from domain.account.replay import AccountState
+from domain.account.snapshot import AccountSnapshot
+
+# Снимок после каждых SNAPSHOT_EVERY событий счета
+SNAPSHOT_EVERY = 1000
+REPLAY_FETCH_SIZE = 5000
+
+
+def render_latest_snapshots(account_ids: Collection[AccountID]) -> Subquery:
+    return (
+        select(AccountSnapshot.account_id, func.max(AccountSnapshot.serial).label('serial'))
+        .where(AccountSnapshot.account_id.in_(account_ids))
+        .group_by(AccountSnapshot.account_id)
+        .subquery('latest')
+    )
+
+
+async def replay_accounts(
+    db_session: AsyncSession,
+    account_ids: Collection[AccountID],
+    *,
+    snapshot_every: int | None = SNAPSHOT_EVERY,
+) -> dict[AccountID, AccountState]:
+    """
+    Сворачивает события счетов, начиная от последнего снимка каждого. При snapshot_every добавляет в сессию
+    снимки после каждых snapshot_every событий. Снимок верен, только если незакоммиченных событий счета нет:
+    иначе такое событие получит serial меньше снимка и не попадет ни в него, ни в последующее воспроизведение.
+    Поэтому при snapshot_every вызывающий держит блокировки счетов (lock_accounts). Коммит за вызывающим.
+    """
+
+    latest = render_latest_snapshots(account_ids)
+    states = {account_id: AccountState() for account_id in account_ids}
+    statement = select(AccountSnapshot).join(
+        latest, and_(AccountSnapshot.account_id == latest.c.account_id, AccountSnapshot.serial == latest.c.serial)
+    )
+    for snapshot in await db_session.scalars(statement):
+        states[snapshot.account_id] = AccountState.from_snapshot(snapshot)
+
+    # С архивом: события до снимка могли из него уйти, а без снимка воспроизведение начинается с CREATE
+    events = AccountEventHistory
+    statement = (
+        select(
+            events.account_id,
+            events.serial,
+            events.event,
+            events.data,
+            *(getattr(events, column) for column in PAYLOAD_COLUMNS),
+        )
+        .outerjoin(latest, latest.c.account_id == events.account_id)
+        .where(events.account_id.in_(account_ids), events.serial > func.coalesce(latest.c.serial, 0))
+        .order_by(events.account_id, events.serial)
+    )
+    result = await db_session.stream(statement.execution_options(yield_per=REPLAY_FETCH_SIZE))
+    async for row in result:
+        state = states[row.account_id]
+        state.apply(serial=row.serial, event=row.event, payload=decode_payload(row))
+        if snapshot_every and state.applied % snapshot_every == 0:
+            db_session.add(state.to_snapshot(row.account_id))
+
+    return states
@@ -2,11 +2,12 @@ import functools
 from typing import ClassVar
 from uuid import UUID
 
-from sqlalchemy import Select
+from sqlalchemy import Select, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from domain.account.events import AccountEvent
-from domain.account.model import Account
+from domain.account.model import Account, AccountID, EnumAccountBalanceMode
+from domain.user.model import UserID
 from shared.storage.filters import FilterHandler, UseInForArrays
 from shared.storage.repository import RepositoryBase, RepositoryConfig
 
@@ -33,7 +34,26 @@ class AccountRepository(
         filter_handlers=[AccountUseInForArrays, AccountFilterHandler],
     ),
 ):
-    pass
+    async def lock_many(self, *account_ids: AccountID, user_id: UserID | None = None) -> dict[AccountID, Account]:
+        """
+        Блокирует счета одним SELECT ... FOR UPDATE в порядке id.
+        Любые блокирующие счета команды берут строки в одном порядке, поэтому встречные переводы не взаимоблокируются.
+        Счета в режиме LEDGER загружаются без блокировки строки: их изменения дописываются событиями,
+        см. application.account.storage.ledger.lock_accounts. Значения перечитываются, даже если счет уже в сессии.
+        """
+
+        account_ids = sorted(set(account_ids))
+        statement = select(Account).where(Account.id.in_(account_ids))
+        if user_id is not None:
+            statement = statement.where(Account.user_id == user_id)
+        statement = statement.order_by(Account.id).execution_options(populate_existing=True)
+
+        locked = statement.where(Account.balance_mode == EnumAccountBalanceMode.ROW).with_for_update()
+        accounts = {account.id: account for account in await self.db_session.scalars(locked)}
+        if len(accounts) < len(account_ids):
+            ledger = statement.where(Account.balance_mode == EnumAccountBalanceMode.LEDGER)
+            accounts.update((account.id, account) for account in await self.db_session.scalars(ledger))
+        return accounts
 
 
 def provide_account_repo(func):
@@ -9,7 +9,9 @@ from application.category.schemas.model import (
     SchemaCategoryTags,
     SchemaCategoryTitle,
 )
+from application.tag.storage.tags import sync_tags
 from domain.category.model import Category
+from domain.tag.model import CategoryTag
 from domain.user.model import User
 from shared.cqs.command import CommandBase
 from shared.cqs.parser import auto_parse_kwargs
@@ -42,6 +44,8 @@ async def handle(
     db_session.add(category)
 
     try:
+        await db_session.flush()
+        await sync_tags(db_session, CategoryTag, {category.id: category.tags})
         await db_session.commit()
     except sqlalchemy.exc.IntegrityError as exc:
         raise CategoryIntegrityError from exc
@@ -2,60 +2,78 @@ from typing import Any, get_args
 
 import asyncpg
 import sqlalchemy.exc
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from application.category.cqs.queries.load import load_category
-from application.category.errors import CategoryConflictError, CategoryNotFoundError
+from application.category.errors import (
+    CategoryConflictError,
+    CategoryNotFoundError,
+    CategoryVersionConflictError,
+)
 from application.category.schemas.model import (
     SchemaCategoryCode,
     SchemaCategoryDescription,
+    SchemaCategoryID,
     SchemaCategoryStatus,
     SchemaCategoryTags,
     SchemaCategoryTitle,
 )
+from application.category.storage.repository import CategoryRepository
+from application.tag.storage.tags import sync_tags
 from domain.category.model import Category
+from domain.tag.model import CategoryTag
+from domain.user.model import User
 from shared.cqs.command import CommandBase
 from shared.cqs.parser import auto_parse_kwargs
+from shared.cqs.retry import retry_on_conflict
 
 
-class UpdateCategoryCodeCommand(CommandBase):
-    code: SchemaCategoryCode
+class UpdateCategoryCommandBase(CommandBase):
+    def render_values(self) -> dict[str, Any]:
+        """Значения колонок: для загруженной сущности и для UPDATE ... WHERE lsn"""
+
+        raise NotImplementedError
 
     def apply(self, category: Category) -> Category:
-        category.code = self.code
+        for key, value in self.render_values().items():
+            setattr(category, key, value)
         return category
 
 
-class UpdateCategoryTitleCommand(CommandBase):
+class UpdateCategoryCodeCommand(UpdateCategoryCommandBase):
+    code: SchemaCategoryCode
+
+    def render_values(self) -> dict[str, Any]:
+        return {'code': self.code}
+
+
+class UpdateCategoryTitleCommand(UpdateCategoryCommandBase):
     title: SchemaCategoryTitle
 
-    def apply(self, category: Category) -> Category:
-        category.title = self.title
-        return category
+    def render_values(self) -> dict[str, Any]:
+        return {'title': self.title}
 
 
-class UpdateCategoryDescriptionCommand(CommandBase):
+class UpdateCategoryDescriptionCommand(UpdateCategoryCommandBase):
     description: SchemaCategoryDescription
 
-    def apply(self, category: Category) -> Category:
-        category.description = self.description
-        return category
+    def render_values(self) -> dict[str, Any]:
+        return {'description': self.description}
 
 
-class UpdateCategoryTagsCommand(CommandBase):
+class UpdateCategoryTagsCommand(UpdateCategoryCommandBase):
     tags: SchemaCategoryTags
 
-    async def apply(self, category: Category) -> Category:
-        category.tags = self.tags
-        return category
+    def render_values(self) -> dict[str, Any]:
+        return {'tags': self.tags}
 
 
-class UpdateCategoryStatusCommand(CommandBase):
+class UpdateCategoryStatusCommand(UpdateCategoryCommandBase):
     status: SchemaCategoryStatus
 
-    def apply(self, category: Category) -> Category:
-        category.status = self.status
-        return category
+    def render_values(self) -> dict[str, Any]:
+        return {'status': self.status}
 
 
 UpdateCategoryCommand = (
@@ -71,18 +89,18 @@ UpdateCategoryCommand = (
 @auto_parse_kwargs(command_types=get_args(UpdateCategoryCommand))
 async def handle(
     *,
-    category: Category | None,
+    category: Category,
     db_session: AsyncSession,
     commands: list[UpdateCategoryCommand],
     **_,
 ) -> Category:
-    if category is None:
-        raise CategoryNotFoundError
-
+    old_tags = list(category.tags)
     for command in commands:
         command.apply(category)
 
     try:
+        if category.tags != old_tags:
+            await sync_tags(db_session, CategoryTag, {category.id: category.tags})
         await db_session.commit()
     except sqlalchemy.exc.IntegrityError as exc:
         if isinstance(exc.orig, asyncpg.UniqueViolationError):
@@ -92,5 +110,59 @@ async def handle(
     return category
 
 
+@auto_parse_kwargs(command_types=get_args(UpdateCategoryCommand))
+async def handle_cas(
+    *,
+    category_id: SchemaCategoryID,
+    db_session: AsyncSession,
+    commands: list[UpdateCategoryCommand],
+    expected_lsn: int | None = None,
+    cur_user: User | None = None,
+    **_,
+) -> Category:
+    """
+    Изменение без блокировки: UPDATE ... WHERE id = :id AND lsn = :expected_lsn RETURNING *.
+    expected_lsn - версия, которую видел клиент, без него берется текущая.
+    Если категорию успели изменить, CategoryVersionConflictError.
+    """
+
+    where = [Category.user_id == cur_user.id] if cur_user is not None else []
+    # Строки, вставленные до умолчания lsn и ни разу не изменявшиеся, хранят NULL - это не отсутствие строки
+    current = select(Category.id, Category.lsn).where(Category.id == category_id, *where)
+
+    if expected_lsn is None:
+        if (row := (await db_session.execute(current)).one_or_none()) is None:
+            raise CategoryNotFoundError
+        expected_lsn = row.lsn
+
+    values = dict[str, Any]()
+    for command in commands:
+        values.update(command.render_values())
+
+    try:
+        category = await CategoryRepository(db_session).compare_and_swap(
+            category_id, expected_lsn=expected_lsn, values=values, where=where
+        )
+        if category is None:
+            # Повторное чтение только на неудаче: категории нет или версия другая
+            if (row := (await db_session.execute(current)).one_or_none()) is None:
+                raise CategoryNotFoundError
+            raise CategoryVersionConflictError(details={'expected_lsn': expected_lsn, 'lsn': row.lsn})
+
+        if 'tags' in values:
+            await sync_tags(db_session, CategoryTag, {category.id: category.tags})
+        await db_session.commit()
+    except sqlalchemy.exc.IntegrityError as exc:
+        if isinstance(exc.orig, asyncpg.UniqueViolationError):
+            raise CategoryConflictError from exc
+        raise
+
+    return category
+
+
+# Для вызовов без expected_lsn: версия читается заново на каждой попытке, гонка повторяется, а не уходит клиенту
+handle_optimistic = retry_on_conflict()(handle_cas)
+
+
 async def auto_handle(**kwargs: Any) -> Category:
     return await handle(**kwargs)
@@ -1,6 +1,6 @@
 from typing import Literal
 
-from sqlalchemy import ColumnElement, not_
+from sqlalchemy import ColumnElement
 
 from application.category.cqs.queries.load import CategoryIsolateByUser
 from application.category.schemas.model import (
@@ -10,8 +10,10 @@ from application.category.schemas.model import (
     SchemaCategoryStatus,
     SchemaCategoryTags,
 )
+from application.tag.storage.tags import render_tags_filter
 from application.user.schemas.model import SchemaUserID
 from domain.category.model import Category
+from domain.tag.model import CategoryTag
 from shared.cqs.generator import generate_list_handle
 from shared.cqs.query import QueryFilterBase
 
@@ -68,17 +70,7 @@ class CategoryTagsQuery(QueryFilterBase):
     filter_type: Literal['HAVE_ANY', 'HAVE_ALL', 'HAVE_NOTHING', 'HAVE_EXACTLY'] = 'HAVE_ALL'
 
     def render_filter(self) -> ColumnElement[bool]:
-        match self.filter_type:
-            case 'HAVE_ALL':
-                return Category.tags.contains(self.tags)
-            case 'HAVE_ANY':
-                return Category.tags.overlap(self.tags)
-            case 'HAVE_NOTHING':
-                return not_(Category.tags.overlap(self.tags))
-            case 'HAVE_EXACTLY':
-                return Category.tags == self.tags
-
-        raise ValueError(f'Unknown filter_type={self.filter_type}')
+        return render_tags_filter(CategoryTag, Category.id, self.tags, self.filter_type)
 
 
 handle = generate_list_handle(
@@ -1,11 +1,10 @@
-import functools
-
 from sqlalchemy import ColumnElement, Select, select
 
+from application.category.errors import CategoryNotFoundError
 from application.category.schemas.model import SchemaCategoryCode, SchemaCategoryID
 from domain.category.model import Category
 from domain.user.model import User
-from shared.cqs.generator import generate_load_handle
+from shared.cqs.generator import generate_load_decorator, generate_load_handle
 from shared.cqs.query import QueryFilterBase, QueryStatementBase
 
 
@@ -47,15 +46,5 @@ handle = generate_load_handle(
         CategoryIsolateByUser,  # Изолируем по пользователю если пробросили cur_user
     ],
 )
-
-
-def load_category(for_update: bool = False):
-    def decorator(func):
-        @functools.wraps(func)
-        async def wrapper(**kwargs):
-            kwargs['category'] = await handle(**kwargs, for_update=for_update)
-            return await func(**kwargs)
-
-        return wrapper
-
-    return decorator
+# Как load_account: отсутствующая категория - CategoryNotFoundError, обработчик не вызывается с None
+load_category = generate_load_decorator(handle, 'category', CategoryNotFoundError('Category not found'))
@@ -1,4 +1,4 @@
-from shared.errors.application import IntegrityError, NotFoundError
+from shared.errors.application import ConflictError, IntegrityError, NotFoundError, VersionConflictError
 
 
 class CategoryNotFoundError(NotFoundError):
@@ -9,3 +9,13 @@ class CategoryNotFoundError(NotFoundError):
 class CategoryIntegrityError(IntegrityError):
     code = 'CATEGORY_INTEGRITY_ERROR'
     message = 'Category integrity violation'
+
+
+class CategoryConflictError(ConflictError):
+    code = 'CATEGORY_CONFLICT_ERROR'
+    message = 'Category with this code already exists'
+
+
+class CategoryVersionConflictError(VersionConflictError):
+    code = 'CATEGORY_VERSION_CONFLICT_ERROR'
+    message = 'Category was modified by another request'
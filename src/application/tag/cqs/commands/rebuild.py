@@ -0,0 +1,28 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.tag.storage.tags import sync_tags
+from domain.account.model import Account
+from domain.category.model import Category
+from domain.tag.model import AccountTag, CategoryTag, TransactionTag
+from domain.transaction.model import Transaction
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+async def handle(*, db_session: AsyncSession, chunk_size: int = DEFAULT_CHUNK_SIZE, **_) -> int:
+    """Пересобирает связи тегов по колонкам tags: первичное заполнение и исправление расхождений"""
+
+    synced = 0
+    for entity_cls, link_cls in ((Transaction, TransactionTag), (Account, AccountTag), (Category, CategoryTag)):
+        statement = select(entity_cls.id, entity_cls.tags).order_by(entity_cls.id).limit(chunk_size)
+        last_id = None
+        while rows := (
+            await db_session.execute(statement if last_id is None else statement.where(entity_cls.id > last_id))
+        ).all():
+            await sync_tags(db_session, link_cls, dict(rows))
+            await db_session.commit()
+            synced += len(rows)
+            last_id = rows[-1].id
+
+    return synced
@@ -0,0 +1,85 @@
+import itertools
+from collections.abc import Collection, Mapping
+from typing import Literal
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, and_, delete, exists, func, insert, not_, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.tag.model import EntityTag, Tag, TagID, TagName
+from shared.storage.dialect import dialect_insert, get_dialect, get_max_bind_params
+
+type TagsFilterType = Literal['HAVE_ANY', 'HAVE_ALL', 'HAVE_NOTHING', 'HAVE_SAME', 'HAVE_EXACTLY']
+
+
+async def intern_tags(db_session: AsyncSession, names: Collection[TagName]) -> dict[TagName, TagID]:
+    """Добавляет недостающие теги в словарь, возвращает имя -> id"""
+
+    if not names:
+        return {}
+
+    dialect = get_dialect(db_session)
+    statement = dialect_insert(dialect, Tag).on_conflict_do_nothing(index_elements=['name'])  # type: ignore
+
+    tag_ids = dict[TagName, TagID]()
+    for chunk in itertools.batched(sorted(names), get_max_bind_params(dialect)):
+        await db_session.execute(statement, [{'name': name} for name in chunk])
+        tag_ids.update((await db_session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(chunk)))).all())
+    return tag_ids
+
+
+async def sync_tags(
+    db_session: AsyncSession, link_cls: type[EntityTag], tags_by_entity: Mapping[UUID, Collection[TagName]]
+) -> None:
+    """
+    Приводит связи тегов к tags_by_entity для всех переданных сущностей сразу:
+    один словарный запрос на пачку, удаление старых связей и многострочная вставка новых.
+    Пустой список тегов удаляет связи сущности.
+    """
+
+    if not tags_by_entity:
+        return
+
+    tag_ids = await intern_tags(db_session, {name for tags in tags_by_entity.values() for name in tags})
+    max_bind_params = get_max_bind_params(get_dialect(db_session))
+
+    for chunk in itertools.batched(tags_by_entity, max_bind_params):
+        await db_session.execute(delete(link_cls).where(link_cls.entity_id.in_(chunk)))
+
+    rows = [
+        {'tag_id': tag_ids[name], 'entity_id': entity_id}
+        for entity_id, tags in tags_by_entity.items()
+        for name in set(tags)
+    ]
+    if rows:
+        # executemany: многострочные INSERT собирает insertmanyvalues
+        await db_session.execute(insert(link_cls), rows)
+
+
+def render_tags_filter(
+    link_cls: type[EntityTag], entity_id: ColumnElement, tags: Collection[TagName], filter_type: TagsFilterType
+) -> ColumnElement[bool]:
+    """Фильтр по тегам полусоединением по таблице связей, читаются только индексы (tag_id, entity_id)"""
+
+    names = sorted(set(tags))
+    tag_ids = select(Tag.id).where(Tag.name.in_(names))
+    have_any = exists().where(link_cls.entity_id == entity_id, link_cls.tag_id.in_(tag_ids))
+
+    match filter_type:
+        case 'HAVE_ANY':
+            return have_any
+        case 'HAVE_NOTHING':
+            return not_(have_any)
+        case 'HAVE_ALL' | 'HAVE_SAME' | 'HAVE_EXACTLY':
+            have_all = true()
+            if names:
+                # Коррелированный подсчет: по индексу читаются связи только текущей сущности
+                linked = select(func.count()).where(link_cls.entity_id == entity_id, link_cls.tag_id.in_(tag_ids))
+                have_all = linked.scalar_subquery() == len(names)
+            if filter_type == 'HAVE_ALL':
+                return have_all
+            # Ровно эти теги: все есть и нет других
+            have_other = exists().where(link_cls.entity_id == entity_id, link_cls.tag_id.not_in(tag_ids))
+            return and_(have_all, not_(have_other))
+
+    raise ValueError(f'Unknown filter_type={filter_type}')
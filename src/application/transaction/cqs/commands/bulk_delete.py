@@ -0,0 +1,33 @@
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.tag.storage.tags import sync_tags
+from application.transaction.cqs.commands.bulk_update import render_matched
+from application.transaction.cqs.queries.list import ListTransactionQuery, list_transaction_query_types
+from application.transaction.storage.rollup import ROLLUP_FIELDS, RollupDelta, apply_rollup_deltas
+from domain.tag.model import TransactionTag
+from domain.transaction.model import Transaction, TransactionID
+from domain.user.model import User
+from shared.cqs.parser import auto_parse_kwargs
+
+
+@auto_parse_kwargs(query_types=list_transaction_query_types)
+async def handle(
+    *, cur_user: User, db_session: AsyncSession, queries: list[ListTransactionQuery], **_
+) -> list[TransactionID]:
+    """Удаление всех транзакций под фильтрами одним DELETE ... RETURNING, дневные суммы вычитаются"""
+
+    matched = render_matched(cur_user=cur_user, queries=queries)
+    statement = (
+        delete(Transaction)
+        .where(Transaction.id.in_(matched.select().with_only_columns(matched.c.id)))
+        .returning(Transaction.id, *(getattr(Transaction, name) for name in ROLLUP_FIELDS))
+    )
+    rows = (await db_session.execute(statement, execution_options={'synchronize_session': False})).all()
+
+    await apply_rollup_deltas(db_session, (RollupDelta(tuple(row[1:-1]), -row[-1], -1) for row in rows))  # type: ignore
+    # Связи удаляются после транзакций: фильтр по тегам читает их в том же DELETE
+    await sync_tags(db_session, TransactionTag, {row[0]: () for row in rows})
+    await db_session.commit()
+
+    return [row[0] for row in rows]
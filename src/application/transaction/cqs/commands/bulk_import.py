@@ -0,0 +1,256 @@
+import csv
+import datetime as dt
+import hashlib
+import inspect
+import itertools
+import json
+from collections import Counter
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.account.schemas.model import SchemaAccountCode
+from application.account.storage.repository import AccountRepository
+from application.category.schemas.model import SchemaCategoryCode
+from application.category.storage.repository import CategoryRepository
+from application.tag.storage.tags import sync_tags
+from application.transaction.schemas.model import (
+    SchemaTransactionAmount,
+    SchemaTransactionDescription,
+    SchemaTransactionTags,
+    SchemaTransactionType,
+)
+from application.transaction.storage.rollup import ROLLUP_DIMENSIONS, RollupDelta, apply_rollup_deltas
+from domain.tag.model import TransactionTag
+from domain.transaction.model import Transaction
+from domain.user.model import User
+from shared.storage.dialect import dialect_insert, get_dialect
+from shared.utils import uuid7
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+class ImportTransactionRow(BaseModel):
+    date: dt.date
+    type: SchemaTransactionType
+    amount: SchemaTransactionAmount
+    account_code: SchemaAccountCode
+    category_code: SchemaCategoryCode
+    description: SchemaTransactionDescription
+    tags: SchemaTransactionTags
+
+    @field_validator('description', mode='before')
+    @classmethod
+    def empty_description(cls, value: Any) -> Any:
+        return value or None
+
+    @field_validator('tags', mode='before')
+    @classmethod
+    def parse_tags(cls, value: Any) -> Any:
+        # В CSV теги - JSON-массив, как в выгрузке, или список через ;
+        if not isinstance(value, str):
+            return value
+        if value.startswith('['):
+            return json.loads(value)
+        return [tag for tag in value.split(';') if tag]
+
+    def content_hash(self, occurrence: int) -> str:
+        """occurrence - номер одинаковой строки в импорте, одинаковые покупки за день не схлопываются"""
+
+        content = '|'.join(
+            (
+                self.date.isoformat(),
+                self.type,
+                f'{self.amount:.5f}',
+                self.account_code,
+                self.category_code,
+                self.description or '',
+                str(occurrence),
+            )
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
+
+
+# Один адаптер на модуль: схема валидации собирается один раз
+_rows_adapter = TypeAdapter(list[ImportTransactionRow])
+
+
+class ImportRowError(BaseModel):
+    row: int  # Номер записи во входных данных, с 1
+    field: str | None = None
+    message: str
+
+
+class ImportReport(BaseModel):
+    processed: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    errors: list[ImportRowError] = Field(default_factory=list)
+
+
+type ImportProgressCallback = Callable[[ImportReport], Awaitable[None] | None]
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[dict[str, str]]:
+    """Записи CSV, первая строка - заголовок, например read_csv(io.TextIOWrapper(upload.file))"""
+
+    return csv.DictReader(lines)
+
+
+@dataclass(slots=True)
+class _Importer:
+    cur_user: User
+    db_session: AsyncSession
+    report: ImportReport
+    # Счетчик одинакового содержимого на весь импорт, не на пачку
+    occurrences: Counter[tuple]
+
+    def validate(self, offset: int, records: list[Mapping[str, Any]]) -> list[tuple[int, ImportTransactionRow]]:
+        try:
+            rows = _rows_adapter.validate_python(records)
+        except ValidationError as exc:
+            failed = set[int]()
+            for error in exc.errors():
+                index, *loc = error['loc']
+                failed.add(int(index))
+                field = '.'.join(map(str, loc)) or None
+                self.report.errors.append(
+                    ImportRowError(row=offset + int(index) + 1, field=field, message=error['msg'])
+                )
+            valid = [i for i in range(len(records)) if i not in failed]
+            # Повторная проверка только корректных записей, тоже одним вызовом
+            rows = _rows_adapter.validate_python([records[i] for i in valid])
+            return list(zip((offset + i + 1 for i in valid), rows))
+        return list(zip(range(offset + 1, offset + len(rows) + 1), rows))
+
+    async def resolve_codes(self, rows: list[tuple[int, ImportTransactionRow]]) -> list[tuple[int, dict[str, Any]]]:
+        """Коды счетов и категорий в id одним запросом на пачку для каждого вида"""
+
+        accounts = await AccountRepository(self.db_session).load_many_by(
+            'code', {row.account_code for _, row in rows}, user_id=self.cur_user.id
+        )
+        categories = await CategoryRepository(self.db_session).load_many_by(
+            'code', {row.category_code for _, row in rows}, user_id=self.cur_user.id
+        )
+        account_ids = {account.code: account.id for account in accounts if account is not None}
+        category_ids = {category.code: category.id for category in categories if category is not None}
+
+        resolved = []
+        for number, row in rows:
+            if (account_id := account_ids.get(row.account_code)) is None:
+                self.report.errors.append(ImportRowError(row=number, field='account_code', message='Account not found'))
+                continue
+            if (category_id := category_ids.get(row.category_code)) is None:
+                self.report.errors.append(
+                    ImportRowError(row=number, field='category_code', message='Category not found')
+                )
+                continue
+
+            key = (row.date, row.type, row.amount, row.account_code, row.category_code, row.description)
+            self.occurrences[key] += 1
+            resolved.append(
+                (
+                    number,
+                    {
+                        'id': uuid7(),
+                        'date': row.date,
+                        'description': row.description,
+                        'tags': row.tags,
+                        'type': row.type,
+                        'user_id': self.cur_user.id,
+                        'amount': row.amount,
+                        'account_id': account_id,
+                        'category_id': category_id,
+                        'import_hash': row.content_hash(self.occurrences[key]),
+                    },
+                )
+            )
+        return resolved
+
+    async def insert(self, rows: list[dict[str, Any]]) -> None:
+        """Пачка в одной транзакции: вставка без дублей, дневные суммы и теги только для вставленных строк"""
+
+        existing = set(
+            await self.db_session.scalars(
+                select(Transaction.import_hash).where(
+                    Transaction.user_id == self.cur_user.id,
+                    Transaction.import_hash.in_([row['import_hash'] for row in rows]),
+                )
+            )
+        )
+        new_rows = {row['id']: row for row in rows if row['import_hash'] not in existing}
+
+        # DO NOTHING закрывает гонку с параллельным импортом той же выписки.
+        # Возвращаются только id: сущности в сессию не загружаются, суммы и теги берутся из входных строк
+        statement = (
+            dialect_insert(get_dialect(self.db_session), Transaction.__table__)
+            .on_conflict_do_nothing(index_elements=['user_id', 'import_hash'])  # type: ignore
+            .returning(Transaction.id)
+        )
+        inserted = list[dict[str, Any]]()
+        if new_rows:
+            # executemany: insertmanyvalues сам собирает многострочные INSERT, компиляция из кэша
+            result = await self.db_session.execute(statement, list(new_rows.values()))
+            inserted = [new_rows[id_] for id_ in result.scalars()]
+
+        await apply_rollup_deltas(
+            self.db_session,
+            (RollupDelta(tuple(row[name] for name in ROLLUP_DIMENSIONS), row['amount'], 1) for row in inserted),
+        )
+        await sync_tags(self.db_session, TransactionTag, {row['id']: row['tags'] for row in inserted if row['tags']})
+        await self.db_session.commit()
+
+        self.report.imported += len(inserted)
+        self.report.duplicates += len(rows) - len(inserted)
+
+    async def process(self, offset: int, records: list[Mapping[str, Any]]) -> None:
+        if rows := self.validate(offset, records):
+            if resolved := await self.resolve_codes(rows):
+                await self.insert([row for _, row in resolved])
+        self.report.processed += len(records)
+
+
+async def _batched(
+    records: Iterable[Mapping[str, Any]] | AsyncIterable[Mapping[str, Any]], batch_size: int
+) -> AsyncIterator[list[Mapping[str, Any]]]:
+    if isinstance(records, AsyncIterable):
+        batch = []
+        async for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    else:
+        for batch in itertools.batched(records, batch_size):
+            yield list(batch)
+
+
+async def handle(
+    *,
+    cur_user: User,
+    db_session: AsyncSession,
+    records: Iterable[Mapping[str, Any]] | AsyncIterable[Mapping[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: ImportProgressCallback | None = None,
+    **_,
+) -> ImportReport:
+    """
+    Импорт транзакций пачками по batch_size: проверка пачки одним вызовом TypeAdapter,
+    коды счетов и категорий одним запросом, отсев уже импортированных строк по хэшу,
+    многострочная вставка и коммит на пачку. Ошибочные строки не останавливают импорт и попадают в отчет.
+    """
+
+    importer = _Importer(cur_user, db_session, ImportReport(), Counter())
+    async for batch in _batched(records, batch_size):
+        await importer.process(importer.report.processed, batch)
+        if progress is not None and inspect.isawaitable(result := progress(importer.report)):
+            await result
+
+    importer.report.errors.sort(key=lambda error: error.row)
+    return importer.report
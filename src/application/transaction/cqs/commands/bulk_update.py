@@ -0,0 +1,90 @@
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any
+
+from sqlalchemy import Subquery, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.tag.storage.tags import sync_tags
+from application.transaction.cqs.commands.update import UpdateTransactionCommand
+from application.transaction.cqs.queries.list import ListTransactionQuery, list_transaction_query_types
+from application.transaction.storage.rollup import ROLLUP_FIELDS, RollupDelta, apply_rollup_deltas
+from domain.tag.model import TransactionTag
+from domain.transaction.model import Transaction, TransactionID
+from domain.user.model import User
+from shared.cqs.parser import auto_parse_kwargs
+from shared.cqs.query import apply_queries
+from shared.storage.dialect import get_dialect, supports_returning_from
+
+
+def render_matched(*, cur_user: User, queries: list[ListTransactionQuery]) -> Subquery:
+    """Транзакции пользователя под фильтрами и их значения до изменения, строки блокируются"""
+
+    statement = select(Transaction.id, *(getattr(Transaction, name) for name in ROLLUP_FIELDS))
+    statement = apply_queries(statement, *queries).where(Transaction.user_id == cur_user.id)
+    # Фильтры по кодам присоединяют счета и категории, их не блокируем
+    return statement.with_for_update(of=Transaction).subquery('matched')
+
+
+def _iter_deltas(rows: Iterable[Sequence[Any]], size: int) -> Iterator[RollupDelta]:
+    """Строки (новые ROLLUP_FIELDS..., старые ROLLUP_FIELDS...) в дельты дневных сумм"""
+
+    for row in rows:
+        new, old = row[:size], row[size:]
+        yield RollupDelta(tuple(old[:-1]), -old[-1], -1)  # type: ignore
+        yield RollupDelta(tuple(new[:-1]), new[-1], 1)  # type: ignore
+
+
+@auto_parse_kwargs(query_types=list_transaction_query_types)
+async def handle(
+    *,
+    cur_user: User,
+    db_session: AsyncSession,
+    commands: list[UpdateTransactionCommand],
+    queries: list[ListTransactionQuery],
+    **_,
+) -> list[TransactionID]:
+    """
+    Изменение всех транзакций под фильтрами одним UPDATE ... FROM ... RETURNING.
+    lsn и updated обновляются по onupdate колонок. Если меняются колонки дневных сумм,
+    RETURNING отдает старые и новые значения, по ним пересчитываются суммы. Теги перепривязываются одним sync_tags.
+    Команды передаются явно: поля команд и фильтров пересекаются (category_id, account_id).
+    """
+
+    if not commands:
+        return []
+
+    values = dict[str, Any]()
+    for command in commands:
+        values.update(command.render_values())
+
+    matched = render_matched(cur_user=cur_user, queries=queries)
+    new_columns = [getattr(Transaction, name) for name in ROLLUP_FIELDS]
+    statement = update(Transaction).values(values).execution_options(synchronize_session=False)
+
+    if values.keys().isdisjoint(ROLLUP_FIELDS):
+        statement = statement.where(Transaction.id.in_(select(matched.c.id))).returning(Transaction.id)
+        ids = list(await db_session.scalars(statement))
+    elif supports_returning_from(get_dialect(db_session)):
+        # Старые значения из FROM-подзапроса в RETURNING того же UPDATE
+        statement = statement.where(Transaction.id == matched.c.id).returning(
+            Transaction.id, *new_columns, *(matched.c[name] for name in ROLLUP_FIELDS)
+        )
+        rows = (await db_session.execute(statement)).all()
+        ids = [row[0] for row in rows]
+        await apply_rollup_deltas(db_session, _iter_deltas((row[1:] for row in rows), len(ROLLUP_FIELDS)))
+    else:
+        # RETURNING видит только изменяемую таблицу: старые значения читаем до UPDATE в той же транзакции
+        old_rows = {row[0]: tuple(row[1:]) for row in await db_session.execute(select(matched))}
+        statement = statement.where(Transaction.id.in_(select(matched.c.id))).returning(Transaction.id, *new_columns)
+        rows = (await db_session.execute(statement)).all()
+        ids = [row[0] for row in rows]
+        await apply_rollup_deltas(
+            db_session, _iter_deltas((tuple(row[1:]) + old_rows[row[0]] for row in rows), len(ROLLUP_FIELDS))
+        )
+
+    if 'tags' in values:
+        await sync_tags(db_session, TransactionTag, dict.fromkeys(ids, values['tags']))
+
+    await db_session.commit()
+
+    return ids
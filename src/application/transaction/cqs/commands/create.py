@@ -4,12 +4,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from application.account.schemas.model import SchemaAccountID
 from application.category.schemas.model import SchemaCategoryID
+from application.tag.storage.tags import sync_tags
 from application.transaction.schemas.model import (
     SchemaTransactionAmount,
     SchemaTransactionDescription,
     SchemaTransactionTags,
     SchemaTransactionType,
 )
+from application.transaction.storage.rollup import RollupDelta, apply_rollup_deltas
+from domain.tag.model import TransactionTag
 from domain.transaction.model import Transaction
 from domain.user.model import UserID
 from shared.cqs.command import CommandBase
@@ -39,6 +42,10 @@ async def handle(*, command: CreateTransactionCommand, db_session: AsyncSession,
     )
 
     db_session.add(transaction)
+    # id нужен связям тегов
+    await db_session.flush()
+    await apply_rollup_deltas(db_session, [RollupDelta.of(transaction, 1)])
+    await sync_tags(db_session, TransactionTag, {transaction.id: transaction.tags})
     await db_session.commit()
 
     return transaction
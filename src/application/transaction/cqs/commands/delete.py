@@ -1,9 +1,24 @@
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from application.tag.storage.tags import sync_tags
+from application.transaction.storage.rollup import ROLLUP_FIELDS, RollupDelta, apply_rollup_deltas
+from domain.tag.model import TransactionTag
 from domain.transaction.model import Transaction
 
 
 async def handle(*, transaction: Transaction, db_session: AsyncSession, **_) -> None:
-    db_session.add(transaction)
-    await db_session.delete(transaction)
+    """
+    DELETE ... RETURNING: дневные суммы вычитаются по значениям удаленной строки, не по переданной сущности.
+    Повторное удаление не находит строку и суммы не меняет.
+    """
+
+    statement = (
+        delete(Transaction)
+        .where(Transaction.id == transaction.id)
+        .returning(*(getattr(Transaction, name) for name in ROLLUP_FIELDS))
+    )
+    if (row := (await db_session.execute(statement)).one_or_none()) is not None:
+        await apply_rollup_deltas(db_session, [RollupDelta(tuple(row[:-1]), -row[-1], -1)])  # type: ignore
+        await sync_tags(db_session, TransactionTag, {transaction.id: ()})
     await db_session.commit()
@@ -0,0 +1,29 @@
+from sqlalchemy import delete, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.transaction.storage.rollup import ROLLUP_DIMENSIONS, render_rollup_source
+from domain.transaction.rollup import TransactionDailyRollup
+from domain.user.model import UserID
+from shared.storage.dialect import get_dialect
+
+
+async def handle(*, db_session: AsyncSession, user_id: UserID | None = None, **_) -> int:
+    """Пересчитывает дневные суммы по транзакциям: первичное заполнение и исправление расхождений"""
+
+    if get_dialect(db_session).name == 'postgresql':
+        # Команды транзакций ждут окончания пересчета, иначе их дельты потеряются или задвоятся
+        await db_session.execute(text(f'LOCK TABLE {TransactionDailyRollup.__tablename__} IN EXCLUSIVE MODE'))
+
+    delete_statement = delete(TransactionDailyRollup)
+    if user_id is not None:
+        delete_statement = delete_statement.where(TransactionDailyRollup.user_id == user_id)
+    await db_session.execute(delete_statement)
+
+    result = await db_session.execute(
+        insert(TransactionDailyRollup).from_select(
+            [*ROLLUP_DIMENSIONS, 'amount', 'count'], render_rollup_source(user_id=user_id)
+        )
+    )
+    await db_session.commit()
+
+    return result.rowcount  # type: ignore
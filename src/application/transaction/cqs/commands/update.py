@@ -1,78 +1,82 @@
 import datetime as dt
+from typing import Any
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from application.account.schemas.model import SchemaAccountID
 from application.category.schemas.model import SchemaCategoryID
+from application.tag.storage.tags import sync_tags
 from application.transaction.schemas.model import (
     SchemaTransactionAmount,
     SchemaTransactionDescription,
     SchemaTransactionTags,
     SchemaTransactionType,
 )
+from application.transaction.storage.rollup import RollupDelta, apply_rollup_deltas
+from domain.tag.model import TransactionTag
 from domain.transaction.model import Transaction
 from shared.cqs.command import CommandBase
 
 
 class UpdateTransactionCommandBase(CommandBase):
-    def apply(self, transaction: Transaction) -> Transaction:
+    def render_values(self) -> dict[str, Any]:
+        """Значения колонок: для загруженной сущности и для UPDATE по запросу"""
+
         raise NotImplementedError
 
+    def apply(self, transaction: Transaction) -> Transaction:
+        for key, value in self.render_values().items():
+            setattr(transaction, key, value)
+        return transaction
+
 
 class UpdateTransactionDateCommand(UpdateTransactionCommandBase):
     date: dt.date
 
-    def apply(self, transaction: Transaction) -> Transaction:
-        transaction.date = self.date
-        return transaction
+    def render_values(self) -> dict[str, Any]:
+        return {'date': self.date}
 
 
 class UpdateTransactionDescriptionCommand(UpdateTransactionCommandBase):
     description: SchemaTransactionDescription
 
-    def apply(self, transaction: Transaction) -> Transaction:
-        transaction.description = self.description
-        return transaction
+    def render_values(self) -> dict[str, Any]:
+        return {'description': self.description}
 
 
 class UpdateTransactionTagsCommand(UpdateTransactionCommandBase):
     tags: SchemaTransactionTags
 
-    def apply(self, transaction: Transaction) -> Transaction:
-        transaction.tags = self.tags
-        return transaction
+    def render_values(self) -> dict[str, Any]:
+        return {'tags': self.tags}
 
 
 class UpdateTransactionTypeCommand(UpdateTransactionCommandBase):
     type: SchemaTransactionType
 
-    def apply(self, transaction: Transaction) -> Transaction:
-        transaction.type = self.type
-        return transaction
+    def render_values(self) -> dict[str, Any]:
+        return {'type': self.type}
 
 
 class UpdateTransactionCategoryCommand(UpdateTransactionCommandBase):
     category_id: SchemaCategoryID
 
-    def apply(self, transaction: Transaction) -> Transaction:
-        transaction.category_id = self.category_id
-        return transaction
+    def render_values(self) -> dict[str, Any]:
+        return {'category_id': self.category_id}
 
 
 class UpdateTransactionAccountCommand(UpdateTransactionCommandBase):
     account_id: SchemaAccountID
 
-    def apply(self, transaction: Transaction) -> Transaction:
-        transaction.account_id = self.account_id
-        return transaction
+    def render_values(self) -> dict[str, Any]:
+        return {'account_id': self.account_id}
 
 
 class UpdateTransactionAmountCommand(UpdateTransactionCommandBase):
     amount: SchemaTransactionAmount
 
-    def apply(self, transaction: Transaction) -> Transaction:
-        transaction.amount = self.amount
-        return transaction
+    def render_values(self) -> dict[str, Any]:
+        return {'amount': self.amount}
 
 
 type UpdateTransactionCommand = (
@@ -93,11 +97,18 @@ async def handle(
         return transaction
 
     db_session.add(transaction)
+    # Старые значения из БД под блокировкой строки до коммита: переданная сущность может быть устаревшей
+    await db_session.refresh(transaction, with_for_update=True)
+    old_delta = RollupDelta.of(transaction, -1)
+    old_tags = list(transaction.tags)
 
     for command in commands:
         command.apply(transaction)
 
     transaction.updated = dt.datetime.now(dt.UTC)
+    await apply_rollup_deltas(db_session, [old_delta, RollupDelta.of(transaction, 1)])
+    if transaction.tags != old_tags:
+        await sync_tags(db_session, TransactionTag, {transaction.id: transaction.tags})
 
     await db_session.commit()
 
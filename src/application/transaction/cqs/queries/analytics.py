@@ -2,59 +2,82 @@ import datetime as dt
 from collections import defaultdict
 
 from pydantic import BaseModel, Field
-from shared.cqs.query.handler import QueryHandlerABC
-from sqlalchemy import select
+from sqlalchemy import Select, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from application.account.schemas.model import SchemaAccountID
 from application.category.schemas.model import SchemaCategoryID
-from application.transaction.cqs.queries.list import ListTransactionQuery
-from application.transaction.cqs.queries.load import load_query_parse
+from application.transaction.cqs.queries.list import ListTransactionQuery, list_transaction_query_types
+from application.transaction.storage.rollup import NotExpressibleOnRollup, to_rollup_statement
 from domain.transaction.model import EnumTransactionType, Transaction
+from domain.user.model import User
 from domain.vo.money import Money
+from shared.cqs.parser import parse_kwargs_many
+from shared.cqs.query import apply_queries
+from shared.storage.functions import EnumDateGranularity, date_bucket
 
 
 class AnalyticsByDay(BaseModel):
-    date: dt.date
+    date: dt.date  # Начало периода для гранулярности крупнее дня
     by_accounts: dict[SchemaAccountID, Money] = Field(default_factory=lambda: defaultdict(Money))
     by_categories: dict[SchemaCategoryID, Money] = Field(default_factory=lambda: defaultdict(Money))
 
 
 class Analytics(BaseModel):
+    granularity: EnumDateGranularity = EnumDateGranularity.DAY
     income: list[AnalyticsByDay]
     expense: list[AnalyticsByDay]
 
 
-class AnalyticsHandler(QueryHandlerABC):
-    async def handle(self, *, db_session: AsyncSession, queries: list[ListTransactionQuery], **_) -> Analytics:
-        transactions_stream = await db_session.stream(
-            self.render_statement(
-                queries,  # pyright: ignore[reportArgumentType]
-                select(
-                    Transaction.date,
-                    Transaction.type,
-                    Transaction.amount,
-                    Transaction.account_id,
-                    Transaction.category_id,
-                ),
-            ).order_by(Transaction.date)
-        )
+def render_statement(
+    *,
+    cur_user: User,
+    queries: list[ListTransactionQuery],
+    granularity: EnumDateGranularity = EnumDateGranularity.DAY,
+) -> Select:
+    """Суммы считаются в БД: одна строка на (период, тип, счет, категория)"""
 
-        income_analytics = []
-        expense_analytics = []
+    bucket = date_bucket(granularity, Transaction.date)
+    group_by = (bucket, Transaction.type, Transaction.account_id, Transaction.category_id)
+    statement = apply_queries(select(*group_by, func.sum(Transaction.amount)), *queries)
+    return statement.where(Transaction.user_id == cur_user.id).group_by(*group_by).order_by(bucket)
 
-        async for date, type, amount, account_id, category_id in transactions_stream:
-            analytics = expense_analytics
-            if type == EnumTransactionType.INCOME:
-                analytics = income_analytics
 
-            if not analytics or analytics[-1].date != date:
-                analytics.append(AnalyticsByDay(date=date))
+async def handle(
+    *,
+    cur_user: User,
+    db_session: AsyncSession,
+    queries: list[ListTransactionQuery] | None = None,
+    granularity: EnumDateGranularity = EnumDateGranularity.DAY,
+    use_rollup: bool = True,
+    **kwargs,
+) -> Analytics:
+    statement = render_statement(
+        cur_user=cur_user,
+        queries=[*(queries or []), *parse_kwargs_many(kwargs, list_transaction_query_types)],
+        granularity=EnumDateGranularity(granularity),
+    )
 
-            analytics[-1].by_accounts[account_id] += amount
-            analytics[-1].by_categories[category_id] += amount
+    # Если фильтры выражаются через измерения дневных сумм - читаем их вместо транзакций,
+    # крупные периоды при этом собираются из дневных сумм
+    if use_rollup:
+        try:
+            statement = to_rollup_statement(statement)
+        except NotExpressibleOnRollup:
+            pass
 
-        return Analytics(income=income_analytics, expense=expense_analytics)
+    income_analytics = list[AnalyticsByDay]()
+    expense_analytics = list[AnalyticsByDay]()
 
+    for date, type, account_id, category_id, amount in await db_session.execute(statement):
+        analytics = expense_analytics
+        if type == EnumTransactionType.INCOME:
+            analytics = income_analytics
 
-handler = AnalyticsHandler(Transaction, load_query_parse)
+        if not analytics or analytics[-1].date != date:
+            analytics.append(AnalyticsByDay(date=date))
+
+        analytics[-1].by_accounts[account_id] += amount
+        analytics[-1].by_categories[category_id] += amount
+
+    return Analytics(granularity=granularity, income=income_analytics, expense=expense_analytics)
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import zlib
+from collections.abc import AsyncIterator, Iterable, Sequence
+from enum import StrEnum
+from typing import Any
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
+from sqlalchemy.orm import aliased
+
+from application.transaction.cqs.queries.list import ListTransactionQuery, list_transaction_query_types
+from domain.account.model import Account
+from domain.category.model import Category
+from domain.transaction.model import Transaction
+from domain.user.model import User
+from shared.cqs.parser import auto_parse_kwargs
+from shared.cqs.query import QueryBase, apply_queries
+
+
+class EnumExportFormat(StrEnum):
+    CSV = 'CSV'
+    NDJSON = 'NDJSON'
+
+
+EXPORT_FIELDS = (
+    'id',
+    'date',
+    'type',
+    'status',
+    'amount',
+    'account_code',
+    'category_code',
+    'description',
+    'tags',
+)
+
+DEFAULT_FETCH_SIZE = 1000
+
+
+class ExportOptionsQuery(QueryBase):
+    format: EnumExportFormat = EnumExportFormat.CSV
+    compress: bool = False
+    fetch_size: int = DEFAULT_FETCH_SIZE
+
+
+def render_statement(*, cur_user: User, queries: Sequence[ListTransactionQuery]) -> Select:
+    """Только нужные колонки, коды счета и категории соединением - без загрузки сущностей"""
+
+    # Алиасы: фильтры по кодам сами присоединяют Account и Category
+    account, category = aliased(Account), aliased(Category)
+    statement = (
+        select(
+            Transaction.id,
+            Transaction.date,
+            Transaction.type,
+            Transaction.status,
+            Transaction.amount,
+            account.code.label('account_code'),
+            category.code.label('category_code'),
+            Transaction.description,
+            Transaction.tags,
+        )
+        .join(account, account.id == Transaction.account_id)
+        .join(category, category.id == Transaction.category_id)
+    )
+    statement = apply_queries(statement, *queries)
+    return statement.where(Transaction.user_id == cur_user.id).order_by(Transaction.date, Transaction.id)
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _json_default(value: Any) -> str:
+    # Decimal строкой - без потери точности
+    return str(value)
+
+
+class _CSVEncoder:
+    def __init__(self) -> None:
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def header(self) -> str:
+        return self.encode([EXPORT_FIELDS])
+
+    def encode(self, rows: Iterable[Sequence[Any]]) -> str:
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.writer.writerows([_csv_value(value) for value in row] for row in rows)
+        return self.buffer.getvalue()
+
+
+class _NDJSONEncoder:
+    def header(self) -> str:
+        return ''
+
+    def encode(self, rows: Iterable[Sequence[Any]]) -> str:
+        return ''.join(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), default=_json_default, ensure_ascii=False) + '\n' for row in rows
+        )
+
+
+_ENCODERS = {
+    EnumExportFormat.CSV: _CSVEncoder,
+    EnumExportFormat.NDJSON: _NDJSONEncoder,
+}
+
+
+async def encode_rows(
+    result: AsyncResult[Any], format: EnumExportFormat, compress: bool = False
+) -> AsyncIterator[bytes]:
+    """Кодирует результат пачками по yield_per, в памяти одна пачка строк и байты этой пачки"""
+
+    encoder = _ENCODERS[format]()
+    # wbits=MAX_WBITS | 16 - формат gzip
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+
+    def to_bytes(text: str) -> bytes:
+        data = text.encode()
+        return compressor.compress(data) if compressor is not None else data
+
+    try:
+        if data := to_bytes(encoder.header()):
+            yield data
+        async for partition in result.partitions():
+            if data := to_bytes(encoder.encode(partition)):
+                yield data
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        await result.close()
+
+
+@auto_parse_kwargs(query_type=ExportOptionsQuery, query_types=list_transaction_query_types)
+async def handle(
+    *,
+    cur_user: User,
+    db_session: AsyncSession,
+    queries: list[ListTransactionQuery],
+    query: ExportOptionsQuery | None = None,
+    **_,
+) -> AsyncIterator[bytes]:
+    """
+    Выгрузка всей истории транзакций серверным курсором, память не зависит от размера истории.
+    Сессия должна жить, пока итератор не дочитан, например StreamingResponse(await handle(...)).
+    """
+
+    options = query or ExportOptionsQuery()
+    statement = render_statement(cur_user=cur_user, queries=queries)
+    result = await db_session.stream(statement.execution_options(yield_per=options.fetch_size))
+    return encode_rows(result, options.format, options.compress)
@@ -1,21 +1,27 @@
 import datetime as dt
 from typing import Literal, get_args
 
-from sqlalchemy import ColumnElement, Select, not_, select, true
+from sqlalchemy import ColumnElement, Select, bindparam, select, true
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from application.account.schemas.model import SchemaAccountID, SchemaAccountName
-from application.category.schemas.model import SchemaCategoryID, SchemaCategoryName
+from application.account.schemas.model import SchemaAccountCode, SchemaAccountID
+from application.category.schemas.model import SchemaCategoryCode, SchemaCategoryID
+from application.tag.storage.tags import render_tags_filter
 from application.transaction.schemas.model import (
     SchemaTransactionID,
     SchemaTransactionStatus,
     SchemaTransactionType,
 )
+from application.transaction.storage.repository import TransactionRepository
 from domain.account.model import Account
 from domain.category.model import Category
+from domain.tag.model import TransactionTag
 from domain.transaction.model import Transaction
 from domain.user.model import User
-from shared.cqs.query import QueryFilterBase, QueryStatementBase, apply_queries, parse_query_kwargs
+from domain.vo.money import Money
+from shared.cqs.parser import auto_parse_kwargs
+from shared.cqs.plans import register_handle
+from shared.cqs.query import QueryFilterBase, QueryStatementBase, apply_queries
 
 
 class TransactionDateRangeQuery(QueryFilterBase):
@@ -33,8 +39,8 @@ class TransactionDateRangeQuery(QueryFilterBase):
 
 
 class TransactionAmountQuery(QueryFilterBase):
-    min_amount: dt.date | None
-    max_amount: dt.date | None
+    min_amount: Money | None
+    max_amount: Money | None
 
     def render_filter(self) -> ColumnElement[bool]:
         if self.min_amount and self.max_amount:
@@ -51,17 +57,7 @@ class TransactionTagsQuery(QueryFilterBase):
     filter_type: Literal['HAVE_ANY', 'HAVE_ALL', 'HAVE_NOTHING', 'HAVE_SAME'] = 'HAVE_ALL'
 
     def render_filter(self) -> ColumnElement[bool]:
-        match self.filter_type:
-            case 'HAVE_ALL':
-                return Transaction.tags.contains(self.tags)
-            case 'HAVE_ANY':
-                return Transaction.tags.overlap(self.tags)
-            case 'HAVE_NOTHING':
-                return not_(Transaction.tags.overlap(self.tags))
-            case 'HAVE_SAME':
-                return Transaction.tags == self.tags
-
-        raise ValueError(f'Unknown filter_type={self.filter_type}')
+        return render_tags_filter(TransactionTag, Transaction.id, self.tags, self.filter_type)
 
 
 class TransactionTypeQuery(QueryFilterBase):
@@ -82,25 +78,25 @@ class TransactionStatusQuery(QueryFilterBase):
         return Transaction.status == self.status
 
 
-class TransactionAccountNameQuery(QueryFilterBase):
-    account_name: SchemaAccountName | list[SchemaAccountName]
+class TransactionAccountCodeQuery(QueryStatementBase):
+    account_code: SchemaAccountCode | list[SchemaAccountCode]
 
-    def process_statement(self, statement: Select) -> Select:
+    def apply_query(self, statement: Select) -> Select:
         return statement.join(Account, Transaction.account_id == Account.id).where(
-            Account.code.in_(self.account_name)
-            if isinstance(self.account_name, list)
-            else Account.code == self.account_name
+            Account.code.in_(self.account_code)
+            if isinstance(self.account_code, list)
+            else Account.code == self.account_code
         )
 
 
-class TransactionCategoryNameQuery(QueryStatementBase):
-    category_name: SchemaCategoryName | list[SchemaCategoryName]
+class TransactionCategoryCodeQuery(QueryStatementBase):
+    category_code: SchemaCategoryCode | list[SchemaCategoryCode]
 
-    def process_statement(self, statement: Select) -> Select:
+    def apply_query(self, statement: Select) -> Select:
         return statement.join(Category, Transaction.category_id == Category.id).where(
-            Category.name.in_(self.category_name)
-            if isinstance(self.category_name, list)
-            else Category.name == self.category_name
+            Category.code.in_(self.category_code)
+            if isinstance(self.category_code, list)
+            else Category.code == self.category_code
         )
 
 
@@ -131,11 +127,11 @@ class TransactionCategoryIDQuery(QueryFilterBase):
         return Transaction.category_id == self.category_id
 
 
-class TransactionCursorQuery(QueryFilterBase):
+class TransactionCursorQuery(QueryStatementBase):
     cursor: str
 
-    def render_filter(self) -> ColumnElement[bool]:
-        return super().render_filter()
+    def apply_query(self, statement: Select) -> Select:
+        return TransactionRepository.apply_cursor(statement, self.cursor)
 
 
 ListTransactionQuery = (
@@ -144,8 +140,8 @@ ListTransactionQuery = (
     | TransactionTagsQuery
     | TransactionTypeQuery
     | TransactionStatusQuery
-    | TransactionAccountNameQuery
-    | TransactionCategoryNameQuery
+    | TransactionAccountCodeQuery
+    | TransactionCategoryCodeQuery
     | TransactionIDQuery
     | TransactionAccountIDQuery
     | TransactionCategoryIDQuery
@@ -153,16 +149,31 @@ ListTransactionQuery = (
 list_transaction_query_types = get_args(ListTransactionQuery)
 
 
+# Keyset-пагинация по (date, id): страница стоит O(limit) независимо от глубины
+base_statement = select(Transaction).order_by(Transaction.date.desc(), Transaction.id.desc())
+
+# Для проверки планов: страница пользователя с каждым из фильтров
+register_handle(
+    'list',
+    base_statement.where(Transaction.user_id == bindparam('cur_user_id')).limit(
+        TransactionRepository.config.default_limit
+    ),
+    [ListTransactionQuery],
+)
+
+
+@auto_parse_kwargs(query_types=[*list_transaction_query_types, TransactionCursorQuery])
 async def handle(
     *,
     cur_user: User,
     db_session: AsyncSession,
-    queries: list[ListTransactionQuery] | None = None,
-    **kwargs,
-) -> list[Transaction]:
-    statement = apply_queries(
-        select(Transaction),
-        *(queries or []),
-        *parse_query_kwargs(kwargs, list_transaction_query_types),
-    )
-    return list(await db_session.scalars(statement.where(Transaction.user_id == cur_user.id)))
+    queries: list[ListTransactionQuery | TransactionCursorQuery],
+    limit: int | None = None,
+    **_,
+) -> tuple[list[Transaction], str | None]:
+    transaction_repo = TransactionRepository(db_session)
+
+    statement = apply_queries(base_statement, *queries).where(Transaction.user_id == cur_user.id)
+
+    items, next_cursor = await transaction_repo.list_cursor(statement, limit=limit)
+    return items, next_cursor and transaction_repo.dumps_cursor(statement, next_cursor)
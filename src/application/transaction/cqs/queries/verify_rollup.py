@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+from sqlalchemy import except_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.transaction.storage.rollup import ROLLUP_DIMENSIONS, RollupKey, render_rollup_source
+from domain.transaction.rollup import TransactionDailyRollup
+from domain.user.model import UserID
+from domain.vo.money import Money
+
+
+class RollupDrift(BaseModel):
+    key: RollupKey
+    expected_amount: Money = Money()
+    expected_count: int = 0
+    actual_amount: Money = Money()
+    actual_count: int = 0
+
+
+async def handle(*, db_session: AsyncSession, user_id: UserID | None = None, **_) -> list[RollupDrift]:
+    """Сравнивает дневные суммы и пересчет по транзакциям, возвращает расходящиеся ключи"""
+
+    expected = render_rollup_source(user_id=user_id)
+    actual = select(
+        *(getattr(TransactionDailyRollup, dimension) for dimension in ROLLUP_DIMENSIONS),
+        TransactionDailyRollup.amount,
+        TransactionDailyRollup.count,
+    ).where(TransactionDailyRollup.count != 0)
+    if user_id is not None:
+        actual = actual.where(TransactionDailyRollup.user_id == user_id)
+
+    drifts = dict[RollupKey, RollupDrift]()
+    for *key, amount, count in await db_session.execute(except_(expected, actual)):
+        drift = drifts.setdefault(tuple(key), RollupDrift(key=tuple(key)))  # type: ignore
+        drift.expected_amount, drift.expected_count = amount, count
+    for *key, amount, count in await db_session.execute(except_(actual, expected)):
+        drift = drifts.setdefault(tuple(key), RollupDrift(key=tuple(key)))  # type: ignore
+        drift.actual_amount, drift.actual_count = amount, count
+
+    return list(drifts.values())
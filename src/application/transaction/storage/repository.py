@@ -0,0 +1,47 @@
+import functools
+from typing import ClassVar
+from uuid import UUID
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.transaction.model import Transaction
+from shared.storage.filters import FilterHandler, UseInForArrays
+from shared.storage.repository import RepositoryBase, RepositoryConfig
+
+
+class TransactionUseInForArrays(UseInForArrays[Transaction]):
+    blacklist: ClassVar = {Transaction.tags}
+
+
+class TransactionFilterHandler(FilterHandler[Transaction]):
+    @classmethod
+    def transaction_id(
+        cls, entity_cls: type[Transaction], statement: Select[tuple[Transaction]], value: list[UUID] | UUID
+    ) -> Select[tuple[Transaction]]:
+        if isinstance(value, list | tuple):
+            return statement.where(Transaction.id.in_(value))
+        return statement.where(Transaction.id == value)
+
+
+class TransactionRepository(
+    RepositoryBase[Transaction],
+    config=RepositoryConfig(
+        entity_cls=Transaction,
+        primary_key=Transaction.id,
+        filter_handlers=[TransactionUseInForArrays, TransactionFilterHandler],
+        default_limit=100,
+        max_limit=500,
+    ),
+):
+    pass
+
+
+def provide_transaction_repo(func):
+    @functools.wraps(func)
+    async def wrapper(*, db_session: AsyncSession, **kwargs):
+        if 'transaction_repo' not in kwargs:
+            kwargs['transaction_repo'] = TransactionRepository(db_session)
+        return await func(db_session=db_session, **kwargs)
+
+    return wrapper
@@ -0,0 +1,112 @@
+import datetime as dt
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from sqlalchemy import ColumnElement, Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import functions, visitors
+
+from domain.account.model import AccountID
+from domain.category.model import CategoryID
+from domain.transaction.model import EnumTransactionType, Transaction
+from domain.transaction.rollup import TransactionDailyRollup
+from domain.user.model import UserID
+from domain.vo.money import Money
+from shared.storage.dialect import dialect_insert, get_dialect
+
+type RollupKey = tuple[UserID, dt.date, EnumTransactionType, AccountID, CategoryID]
+
+ROLLUP_DIMENSIONS = ('user_id', 'date', 'type', 'account_id', 'category_id')
+# Колонки транзакции, от которых зависят дневные суммы: измерения и сумма последней
+ROLLUP_FIELDS = (*ROLLUP_DIMENSIONS, 'amount')
+
+
+@dataclass(slots=True)
+class RollupDelta:
+    key: RollupKey
+    amount: Money
+    count: int
+
+    @classmethod
+    def of(cls, transaction: Transaction, sign: int) -> 'RollupDelta':
+        """sign=1 - транзакция добавлена, sign=-1 - удалена (или старое значение при изменении)"""
+
+        key = tuple(getattr(transaction, dimension) for dimension in ROLLUP_DIMENSIONS)
+        return cls(key, transaction.amount * sign, sign)  # type: ignore
+
+
+def merge_deltas(deltas: Iterable[RollupDelta]) -> list[RollupDelta]:
+    merged = dict[RollupKey, RollupDelta]()
+    for delta in deltas:
+        if (current := merged.get(delta.key)) is None:
+            merged[delta.key] = RollupDelta(delta.key, delta.amount, delta.count)
+        else:
+            current.amount += delta.amount
+            current.count += delta.count
+    return [delta for delta in merged.values() if delta.amount or delta.count]
+
+
+async def apply_rollup_deltas(db_session: AsyncSession, deltas: Iterable[RollupDelta]) -> None:
+    """Прибавляет дельты к дневным суммам многострочным INSERT ... ON CONFLICT DO UPDATE"""
+
+    if not (deltas := merge_deltas(deltas)):
+        return
+
+    statement = dialect_insert(get_dialect(db_session), TransactionDailyRollup)
+    statement = statement.on_conflict_do_update(  # type: ignore
+        index_elements=ROLLUP_DIMENSIONS,
+        set_={
+            'amount': TransactionDailyRollup.amount + statement.excluded.amount,  # type: ignore
+            'count': TransactionDailyRollup.count + statement.excluded.count,  # type: ignore
+        },
+    )
+    # executemany: insertmanyvalues делит строки на пачки по лимиту параметров, компиляция из кэша
+    await db_session.execute(
+        statement,
+        [dict(zip(ROLLUP_DIMENSIONS, delta.key), amount=delta.amount, count=delta.count) for delta in deltas],
+    )
+
+
+_rollup_columns = {name: TransactionDailyRollup.__table__.c[name] for name in ROLLUP_DIMENSIONS}  # type: ignore
+
+
+def _is_transaction_column(element: ColumnElement) -> bool:
+    return getattr(element, 'table', None) is Transaction.__table__
+
+
+def _is_transaction_amount(*elements: ColumnElement) -> bool:
+    return len(elements) == 1 and _is_transaction_column(elements[0]) and elements[0].key == 'amount'
+
+
+class NotExpressibleOnRollup(Exception):
+    """Запрос использует колонки транзакций, которых нет в дневных суммах"""
+
+
+def to_rollup_statement(statement: Select) -> Select:
+    """
+    Переводит агрегирующий запрос по транзакциям на дневные суммы: колонки измерений
+    заменяются колонками rollup, SUM(amount) по транзакциям становится SUM по дневным суммам.
+    """
+
+    def replace(element: ColumnElement) -> ColumnElement | None:
+        if isinstance(element, functions.sum) and _is_transaction_amount(*element.clauses):
+            return func.sum(TransactionDailyRollup.__table__.c.amount)  # type: ignore
+        if _is_transaction_column(element):
+            if (column := _rollup_columns.get(element.key)) is None:  # type: ignore
+                raise NotExpressibleOnRollup(element)
+            return column
+        return None
+
+    return visitors.replacement_traverse(statement, {}, replace).where(  # type: ignore
+        TransactionDailyRollup.count > 0
+    )
+
+
+def render_rollup_source(*, user_id: UserID | None = None) -> Select:
+    """Дневные суммы, посчитанные по транзакциям - источник для rebuild/verify"""
+
+    group_by = [getattr(Transaction, dimension) for dimension in ROLLUP_DIMENSIONS]
+    statement = select(*group_by, func.sum(Transaction.amount), func.count()).group_by(*group_by)
+    if user_id is not None:
+        statement = statement.where(Transaction.user_id == user_id)
+    return statement
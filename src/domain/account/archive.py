@@ -0,0 +1,42 @@
+import datetime as dt
+
+from sqlalchemy import UUID as SQLAlchemyUUID
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Numeric, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from domain.account.events import AccountEventEvent
+from domain.account.model import AccountID
+from domain.base import Entity
+from domain.user.model import UserID
+from domain.vo.money import Currency, Money, TransferRate
+
+
+class AccountEventArchive(Entity):
+    """
+    События старше срока хранения, перенесенные из account_events без смены serial.
+    Только свернутые (не pending) и перенесенные в колонки (без data), поэтому этих колонок здесь нет.
+    """
+
+    __tablename__ = 'account_events_archive'
+
+    serial: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True))
+
+    user_id: Mapped[UserID] = mapped_column(SQLAlchemyUUID, ForeignKey('users.id'))
+    account_id: Mapped[AccountID] = mapped_column(SQLAlchemyUUID, ForeignKey('accounts.id'))
+
+    event: Mapped[AccountEventEvent] = mapped_column(Text)
+    amount: Mapped[Money | None] = mapped_column(Numeric(19, 4))
+    transfer_rate: Mapped[TransferRate | None] = mapped_column(Numeric)
+    counterparty_id: Mapped[AccountID | None] = mapped_column(SQLAlchemyUUID)
+    old_balance: Mapped[Money | None] = mapped_column(Numeric(19, 4))
+    new_balance: Mapped[Money | None] = mapped_column(Numeric(19, 4))
+    old_currency: Mapped[Currency | None] = mapped_column(Text)
+    new_currency: Mapped[Currency | None] = mapped_column(Text)
+    delta: Mapped[Money | None] = mapped_column(Numeric(19, 4))
+
+    __table_args__ = (
+        # Только индексы выдачи истории, фильтр по типу события в архиве - перебором диапазона счета
+        Index('ix_account_events_archive_account_id_created_at', account_id, created_at, serial),
+        Index('ix_account_events_archive_user_id_created_at', user_id, created_at, serial),
+    )
@@ -1,17 +1,35 @@
 import datetime as dt
+from dataclasses import dataclass, fields
 from enum import StrEnum
+from typing import Any
+from uuid import UUID
 
-from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Text, func
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Numeric,
+    Text,
+    case,
+    false,
+    func,
+    select,
+    text,
+)
 from sqlalchemy import UUID as SQLAlchemyUUID
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, column_property, mapped_column
 
-from domain.account.model import Account, AccountID
+from domain.account.model import Account, AccountID, EnumAccountBalanceMode
 from domain.base import Entity
 from domain.user.model import UserID
 from domain.vo.money import Currency, Money, TransferRate
 
 
 class EnumAccountEvent(StrEnum):
+    CREATE = 'CREATE'
     EDIT_CURRENCY = 'EDIT_CURRENCY'
 
     TRANSFER_MONEY_SRC = 'TRANSFER_MONEY_SRC'
@@ -24,6 +42,123 @@ type AccountEventEvent = str
 type AccountEventData = dict
 
 
+def _from_data[P](payload_cls: type[P], data: AccountEventData) -> P:
+    # Значения из JSON: деньги и курсы строками, id счетов строками с дефисами
+    values = dict[str, Any]()
+    for payload_field in fields(payload_cls):  # type: ignore
+        value = data[payload_field.name]
+        if payload_field.type is Money:
+            value = Money(str(value))
+        elif payload_field.type is AccountID:
+            value = UUID(str(value))
+        values[payload_field.name] = value
+    return payload_cls(**values)
+
+
+@dataclass(slots=True, frozen=True)
+class CreatePayload:
+    balance: Money
+    currency: Currency
+
+    def to_columns(self, event: AccountEventEvent) -> dict[str, Any]:
+        return {'new_balance': self.balance, 'new_currency': self.currency}
+
+    @classmethod
+    def from_columns(cls, row: Any) -> 'CreatePayload':
+        return cls(balance=row.new_balance, currency=row.new_currency)
+
+
+@dataclass(slots=True, frozen=True)
+class TransferPayload:
+    amount: Money
+    src_account_id: AccountID
+    dst_account_id: AccountID
+    transfer_rate: TransferRate
+
+    def to_columns(self, event: AccountEventEvent) -> dict[str, Any]:
+        # Один из счетов - account_id события, хранится только второй
+        if event == EnumAccountEvent.TRANSFER_MONEY_SRC:
+            counterparty_id = self.dst_account_id
+        else:
+            counterparty_id = self.src_account_id
+        return {'amount': self.amount, 'transfer_rate': self.transfer_rate, 'counterparty_id': counterparty_id}
+
+    @classmethod
+    def from_columns(cls, row: Any) -> 'TransferPayload':
+        if row.event == EnumAccountEvent.TRANSFER_MONEY_SRC:
+            src_account_id, dst_account_id = row.account_id, row.counterparty_id
+        else:
+            src_account_id, dst_account_id = row.counterparty_id, row.account_id
+        return cls(
+            amount=row.amount,
+            src_account_id=src_account_id,
+            dst_account_id=dst_account_id,
+            transfer_rate=row.transfer_rate,
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class BalanceAdjustmentPayload:
+    old_balance: Money
+    new_balance: Money
+
+    def to_columns(self, event: AccountEventEvent) -> dict[str, Any]:
+        return {'old_balance': self.old_balance, 'new_balance': self.new_balance}
+
+    @classmethod
+    def from_columns(cls, row: Any) -> 'BalanceAdjustmentPayload':
+        return cls(old_balance=row.old_balance, new_balance=row.new_balance)
+
+
+@dataclass(slots=True, frozen=True)
+class EditCurrencyPayload:
+    new_currency: Currency
+    old_currency: Currency
+    transfer_rate: TransferRate
+
+    def to_columns(self, event: AccountEventEvent) -> dict[str, Any]:
+        return {
+            'new_currency': self.new_currency,
+            'old_currency': self.old_currency,
+            'transfer_rate': self.transfer_rate,
+        }
+
+    @classmethod
+    def from_columns(cls, row: Any) -> 'EditCurrencyPayload':
+        return cls(new_currency=row.new_currency, old_currency=row.old_currency, transfer_rate=row.transfer_rate)
+
+
+type AccountEventPayload = CreatePayload | TransferPayload | BalanceAdjustmentPayload | EditCurrencyPayload
+
+PAYLOAD_TYPES: dict[AccountEventEvent, type[AccountEventPayload]] = {
+    EnumAccountEvent.CREATE: CreatePayload,
+    EnumAccountEvent.TRANSFER_MONEY_SRC: TransferPayload,
+    EnumAccountEvent.TRANSFER_MONEY_DST: TransferPayload,
+    EnumAccountEvent.BALANCE_ADJUSTMENT: BalanceAdjustmentPayload,
+    EnumAccountEvent.EDIT_CURRENCY: EditCurrencyPayload,
+}
+# Колонки полей всех типов событий
+PAYLOAD_COLUMNS = (
+    'amount',
+    'transfer_rate',
+    'counterparty_id',
+    'old_balance',
+    'new_balance',
+    'old_currency',
+    'new_currency',
+)
+
+
+def decode_payload(row: Any) -> AccountEventPayload:
+    """Поля события из колонок строки: событие или строка запроса, где есть event, account_id, data и PAYLOAD_COLUMNS"""
+
+    payload_cls = PAYLOAD_TYPES[row.event]
+    if row.data is not None:
+        # Событие еще не перенесено из JSON в колонки, см. migrate_event_payloads
+        return _from_data(payload_cls, row.data)
+    return payload_cls.from_columns(row)
+
+
 class AccountEvent(Entity):
     __tablename__ = 'account_events'
 
@@ -33,8 +168,81 @@ class AccountEvent(Entity):
     user_id: Mapped[UserID] = mapped_column(SQLAlchemyUUID, ForeignKey('users.id'))
     account_id: Mapped[AccountID] = mapped_column(SQLAlchemyUUID, ForeignKey('accounts.id'))
 
-    data: Mapped[AccountEventData] = mapped_column(JSON)
     event: Mapped[AccountEventEvent] = mapped_column(Text)
+    # Поля событий в типизированных колонках, у каждого типа свое подмножество, см. PAYLOAD_TYPES.
+    # Пустые колонки - NULL, в строке это бит, а не повтор имени ключа как в JSON
+    amount: Mapped[Money | None] = mapped_column(Numeric(19, 4), default=None)
+    transfer_rate: Mapped[TransferRate | None] = mapped_column(Numeric, default=None)
+    counterparty_id: Mapped[AccountID | None] = mapped_column(SQLAlchemyUUID, default=None)
+    old_balance: Mapped[Money | None] = mapped_column(Numeric(19, 4), default=None)
+    new_balance: Mapped[Money | None] = mapped_column(Numeric(19, 4), default=None)
+    old_currency: Mapped[Currency | None] = mapped_column(Text, default=None)
+    new_currency: Mapped[Currency | None] = mapped_column(Text, default=None)
+    # Поля событий до перехода на колонки, новые события пишут NULL
+    data: Mapped[AccountEventData | None] = mapped_column(JSON(none_as_null=True), default=None)
+
+    # Изменение баланса счета по событию. pending - дельта счета в режиме LEDGER, еще не свернутая в Account.balance
+    delta: Mapped[Money | None] = mapped_column(Numeric(19, 4), default=None)
+    pending: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false())
+
+    __table_args__ = (
+        # Воспроизведение счета в порядке serial
+        Index('ix_account_events_account_id_serial', account_id, serial),
+        # Выдача истории счета и пользователя по (created_at, serial), в том числе диапазоном дат и по типу события
+        Index('ix_account_events_account_id_created_at', account_id, created_at, serial),
+        Index('ix_account_events_account_id_event_created_at', account_id, event, created_at, serial),
+        Index('ix_account_events_user_id_created_at', user_id, created_at, serial),
+        # Несвернутые дельты: баланс счетов в режиме LEDGER и очередь сворачивания
+        Index(
+            'ix_account_events_account_id_pending',
+            account_id,
+            postgresql_where=text('pending'),
+            sqlite_where=text('pending'),
+        ),
+    )
+
+    @classmethod
+    def from_payload(
+        cls,
+        *,
+        account: Account,
+        event: EnumAccountEvent,
+        payload: AccountEventPayload,
+        **kwargs: Any,
+    ) -> 'AccountEvent':
+        return cls(
+            account_id=account.id,
+            user_id=account.user_id,
+            event=event,
+            **payload.to_columns(event),
+            **kwargs,
+        )
+
+    @property
+    def payload(self) -> AccountEventPayload:
+        return decode_payload(self)
+
+    def apply_delta(self, account: Account, delta: Money) -> None:
+        """Изменение баланса счета по событию: в строку счета или, в режиме LEDGER, дельтой в самом событии"""
+
+        self.delta = delta
+        self.pending = account.balance_mode == EnumAccountBalanceMode.LEDGER
+        if self.pending:
+            account.pending_balance += delta
+        else:
+            account.balance += delta
+
+    @classmethod
+    def create(cls, *, account: Account) -> 'AccountEvent':
+        """Начальное состояние счета, отсюда начинается воспроизведение событий"""
+
+        return cls.from_payload(
+            account=account,
+            event=EnumAccountEvent.CREATE,
+            payload=CreatePayload(balance=account.balance, currency=account.currency),
+            delta=account.balance,
+            pending=False,
+        )
 
     @classmethod
     def transfer_money(
@@ -45,26 +253,15 @@ class AccountEvent(Entity):
         dst_account: Account,
         transfer_rate: TransferRate,
     ) -> tuple['AccountEvent', 'AccountEvent']:
-        return cls(
-            account_id=src_account.id,
-            user_id=src_account.user_id,
-            event=EnumAccountEvent.TRANSFER_MONEY_SRC,
-            data={
-                'amount': amount,
-                'src_account_id': src_account.id,
-                'dst_account_id': dst_account.id,
-                'transfer_rate': transfer_rate,
-            },
-        ), cls(
-            account_id=dst_account.id,
-            user_id=dst_account.user_id,
-            event=EnumAccountEvent.TRANSFER_MONEY_DST,
-            data={
-                'amount': amount,
-                'src_account_id': src_account.id,
-                'dst_account_id': dst_account.id,
-                'transfer_rate': transfer_rate,
-            },
+        payload = TransferPayload(
+            amount=amount,
+            src_account_id=src_account.id,
+            dst_account_id=dst_account.id,
+            transfer_rate=transfer_rate,
+        )
+        return (
+            cls.from_payload(account=src_account, event=EnumAccountEvent.TRANSFER_MONEY_SRC, payload=payload),
+            cls.from_payload(account=dst_account, event=EnumAccountEvent.TRANSFER_MONEY_DST, payload=payload),
         )
 
     @classmethod
@@ -75,14 +272,10 @@ class AccountEvent(Entity):
         old_balance: Money,
         new_balance: Money,
     ) -> 'AccountEvent':
-        return cls(
-            account_id=account.id,
-            user_id=account.user_id,
+        return cls.from_payload(
+            account=account,
             event=EnumAccountEvent.BALANCE_ADJUSTMENT,
-            data={
-                'old_balance': old_balance,
-                'new_balance': new_balance,
-            },
+            payload=BalanceAdjustmentPayload(old_balance=old_balance, new_balance=new_balance),
         )
 
     @classmethod
@@ -94,13 +287,26 @@ class AccountEvent(Entity):
         old_currency: Currency,
         transfer_rate: TransferRate,
     ) -> 'AccountEvent':
-        return cls(
-            account_id=account.id,
-            user_id=account.user_id,
+        return cls.from_payload(
+            account=account,
             event=EnumAccountEvent.EDIT_CURRENCY,
-            data={
-                'new_currency': new_currency,
-                'old_currency': old_currency,
-                'transfer_rate': transfer_rate,
-            },
+            payload=EditCurrencyPayload(
+                new_currency=new_currency,
+                old_currency=old_currency,
+                transfer_rate=transfer_rate,
+            ),
         )
+
+
+# Только для счетов в режиме LEDGER, по частичному индексу несвернутых дельт
+Account.pending_balance = column_property(
+    case(
+        (
+            Account.balance_mode == EnumAccountBalanceMode.LEDGER,
+            select(func.coalesce(func.sum(AccountEvent.delta), 0))
+            .where(AccountEvent.account_id == Account.id, AccountEvent.pending)
+            .scalar_subquery(),
+        ),
+        else_=0,
+    )
+)
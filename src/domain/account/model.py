@@ -1,8 +1,9 @@
 import datetime as dt
 from enum import StrEnum
+from typing import TYPE_CHECKING
 from uuid import UUID
 
-from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Numeric, Text, UniqueConstraint, func
+from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Index, Numeric, Text, UniqueConstraint, func, text
 from sqlalchemy import UUID as SQLAlchemyUUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -17,6 +18,11 @@ class EnumAccountStatus(StrEnum):
     DISABLED = 'DISABLED'
 
 
+class EnumAccountBalanceMode(StrEnum):
+    ROW = 'ROW'  # Изменения баланса пишутся в строку счета под блокировкой
+    LEDGER = 'LEDGER'  # Изменения дописываются дельтами в события, строку счета обновляет только сворачивание
+
+
 class EnumAccountType(StrEnum):
     GOAL = 'GOAL'
     LOAN = 'LOAN'
@@ -48,13 +54,35 @@ class Account(Entity):
 
     balance: Mapped[Money] = mapped_column(Numeric(19, 4), default=Money())
     currency: Mapped[Currency] = mapped_column(Text, default='RUB')
+    # В режиме LEDGER balance - снимок на момент последнего сворачивания дельт
+    balance_mode: Mapped[EnumAccountBalanceMode] = mapped_column(default=EnumAccountBalanceMode.ROW)
 
-    lsn: Mapped[int] = mapped_column(BigInteger, onupdate=func.next_val())
+    lsn: Mapped[int] = mapped_column(BigInteger, server_default=func.next_val(), onupdate=func.next_val())
     serial: Mapped[int] = mapped_column(BigInteger, server_default=func.next_val())
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now())
 
-    __table_args__ = (UniqueConstraint(user_id, code),)
+    __table_args__ = (
+        UniqueConstraint(user_id, code),
+        # Списки активных счетов пользователя
+        Index(
+            'ix_accounts_user_id_id_active',
+            user_id,
+            id,
+            postgresql_where=text("status = 'ACTIVE'"),
+            sqlite_where=text("status = 'ACTIVE'"),
+        ),
+    )
+
+    if TYPE_CHECKING:
+        # Сумма несвернутых дельт, column_property объявлен в domain.account.events
+        pending_balance: Money
+
+    @property
+    def effective_balance(self) -> Money:
+        if self.balance_mode == EnumAccountBalanceMode.LEDGER:
+            return self.balance + self.pending_balance
+        return self.balance
 
     def update_currency(self, currency: Currency, transfer_rate: TransferRate) -> None:
         self.currency = currency
@@ -0,0 +1,54 @@
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP
+
+from domain.account.events import (
+    AccountEventPayload,
+    BalanceAdjustmentPayload,
+    CreatePayload,
+    EditCurrencyPayload,
+    EnumAccountEvent,
+    TransferPayload,
+)
+from domain.account.model import AccountID
+from domain.account.snapshot import AccountSnapshot
+from domain.vo.money import Currency, Money
+
+# Точность Account.balance, Numeric(19, 4): база округляет каждое сохраненное значение
+BALANCE_QUANTUM = Money('1.0000')
+
+
+@dataclass(slots=True)
+class AccountState:
+    """Баланс и валюта счета, свернутые из событий"""
+
+    balance: Money = field(default_factory=Money)
+    currency: Currency | None = None  # None - событие CREATE не встречалось
+    serial: int = 0  # Последнее примененное событие
+    applied: int = 0  # Событий после снимка, с которого начали
+
+    @classmethod
+    def from_snapshot(cls, snapshot: AccountSnapshot) -> 'AccountState':
+        return cls(balance=snapshot.balance, currency=snapshot.currency, serial=snapshot.serial)
+
+    def apply(self, *, serial: int, event: str, payload: AccountEventPayload) -> None:
+        """Применяет событие в порядке serial"""
+
+        match payload:
+            case CreatePayload():
+                self.balance, self.currency = payload.balance, payload.currency
+            case TransferPayload() if event == EnumAccountEvent.TRANSFER_MONEY_SRC:
+                self.balance -= payload.amount
+            case TransferPayload():
+                self.balance += payload.amount * payload.transfer_rate
+            case BalanceAdjustmentPayload():
+                self.balance = payload.new_balance
+            case EditCurrencyPayload():
+                self.balance *= payload.transfer_rate
+                self.currency = payload.new_currency
+
+        self.balance = self.balance.quantize(BALANCE_QUANTUM, ROUND_HALF_UP)
+        self.serial = serial
+        self.applied += 1
+
+    def to_snapshot(self, account_id: AccountID) -> AccountSnapshot:
+        return AccountSnapshot(account_id=account_id, serial=self.serial, balance=self.balance, currency=self.currency)
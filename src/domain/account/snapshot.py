@@ -0,0 +1,22 @@
+import datetime as dt
+
+from sqlalchemy import UUID as SQLAlchemyUUID
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Numeric, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from domain.account.model import AccountID
+from domain.base import Entity
+from domain.vo.money import Currency, Money
+
+
+class AccountSnapshot(Entity):
+    """Состояние счета после события serial: воспроизведение идет от последнего снимка, не от первого события"""
+
+    __tablename__ = 'account_snapshots'
+
+    account_id: Mapped[AccountID] = mapped_column(SQLAlchemyUUID, ForeignKey('accounts.id'), primary_key=True)
+    serial: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+
+    balance: Mapped[Money] = mapped_column(Numeric(19, 4))
+    currency: Mapped[Currency | None] = mapped_column(Text)  # None - до снимка не было события CREATE
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -2,7 +2,7 @@ import datetime as dt
 from enum import StrEnum
 from uuid import UUID
 
-from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Text, UniqueConstraint, func
+from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Index, Text, UniqueConstraint, func, text
 from sqlalchemy import UUID as SQLAlchemyUUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -40,9 +40,19 @@ class Category(Entity):
     parent: Mapped['Category | None'] = relationship('Category', back_populates='children', remote_side=[id])
     children: Mapped[list['Category']] = relationship('Category', back_populates='parent')
 
-    lsn: Mapped[int] = mapped_column(BigInteger, onupdate=func.next_val())
+    lsn: Mapped[int] = mapped_column(BigInteger, server_default=func.next_val(), onupdate=func.next_val())
     serial: Mapped[int] = mapped_column(BigInteger, server_default=func.next_val())
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now())
 
-    __table_args__ = (UniqueConstraint(user_id, code),)
+    __table_args__ = (
+        UniqueConstraint(user_id, code),
+        Index(
+            'ix_categories_user_id_id_active',
+            user_id,
+            id,
+            postgresql_where=text("status = 'ACTIVE'"),
+            sqlite_where=text("status = 'ACTIVE'"),
+        ),
+        Index('ix_categories_parent_id', parent_id),
+    )
@@ -0,0 +1,53 @@
+from sqlalchemy import BigInteger, ForeignKey, Index, Integer, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from domain.account.model import Account, AccountID
+from domain.base import Entity
+from domain.category.model import Category, CategoryID
+from domain.transaction.model import Transaction, TransactionID
+
+type TagID = int
+type TagName = str
+
+
+class Tag(Entity):
+    """Словарь тегов: имя тега хранится один раз, связи ссылаются на id"""
+
+    __tablename__ = 'tags'
+
+    # В sqlite автоинкремент только у INTEGER PRIMARY KEY
+    id: Mapped[TagID] = mapped_column(BigInteger().with_variant(Integer(), 'sqlite'), primary_key=True)
+    name: Mapped[TagName] = mapped_column(Text, unique=True)
+
+
+# Связи (tag_id, entity_id) - обратный индекс: по тегу находим сущности без чтения JSON
+
+
+class TransactionTag(Entity):
+    __tablename__ = 'transaction_tags'
+
+    tag_id: Mapped[TagID] = mapped_column(BigInteger, ForeignKey('tags.id'), primary_key=True)
+    entity_id: Mapped[TransactionID] = mapped_column(ForeignKey(Transaction.id, ondelete='CASCADE'), primary_key=True)
+
+    __table_args__ = (Index('ix_transaction_tags_entity_id', entity_id),)
+
+
+class AccountTag(Entity):
+    __tablename__ = 'account_tags'
+
+    tag_id: Mapped[TagID] = mapped_column(BigInteger, ForeignKey('tags.id'), primary_key=True)
+    entity_id: Mapped[AccountID] = mapped_column(ForeignKey(Account.id, ondelete='CASCADE'), primary_key=True)
+
+    __table_args__ = (Index('ix_account_tags_entity_id', entity_id),)
+
+
+class CategoryTag(Entity):
+    __tablename__ = 'category_tags'
+
+    tag_id: Mapped[TagID] = mapped_column(BigInteger, ForeignKey('tags.id'), primary_key=True)
+    entity_id: Mapped[CategoryID] = mapped_column(ForeignKey(Category.id, ondelete='CASCADE'), primary_key=True)
+
+    __table_args__ = (Index('ix_category_tags_entity_id', entity_id),)
+
+
+type EntityTag = TransactionTag | AccountTag | CategoryTag
@@ -2,7 +2,7 @@ import datetime as dt
 from enum import StrEnum
 from uuid import UUID
 
-from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Numeric, Text, func
+from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Index, Numeric, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from domain.account.model import Account, AccountID
@@ -48,7 +48,18 @@ class Transaction(Entity):
     category_id: Mapped[CategoryID] = mapped_column(ForeignKey('categories.id'))
     category: Mapped[Category] = relationship()
 
+    # Хэш содержимого строки импорта, повторный импорт той же выписки не создает дублей
+    import_hash: Mapped[str | None] = mapped_column(Text, default=None)
+
     lsn: Mapped[int] = mapped_column(BigInteger, onupdate=func.next_val())
     serial: Mapped[int] = mapped_column(BigInteger, server_default=func.next_val())
     created: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Лента пользователя по дате с курсором (date, id) и диапазоны аналитики
+        Index('ix_transactions_user_id_date_id', user_id, date, id),
+        Index('ix_transactions_account_id_date', account_id, date),
+        Index('ix_transactions_category_id_date', category_id, date),
+        Index('ux_transactions_user_id_import_hash', user_id, import_hash, unique=True),
+    )
@@ -0,0 +1,27 @@
+import datetime as dt
+
+from sqlalchemy import UUID as SQLAlchemyUUID
+from sqlalchemy import BigInteger, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+
+from domain.account.model import AccountID
+from domain.base import Entity
+from domain.category.model import CategoryID
+from domain.transaction.model import EnumTransactionType
+from domain.user.model import UserID
+from domain.vo.money import Money
+
+
+class TransactionDailyRollup(Entity):
+    """Суммы транзакций по дням, поддерживается командами транзакций в той же транзакции БД"""
+
+    __tablename__ = 'transaction_daily_rollup'
+
+    user_id: Mapped[UserID] = mapped_column(SQLAlchemyUUID, primary_key=True)
+    date: Mapped[dt.date] = mapped_column(primary_key=True)
+    type: Mapped[EnumTransactionType] = mapped_column(primary_key=True)
+    account_id: Mapped[AccountID] = mapped_column(SQLAlchemyUUID, primary_key=True)
+    category_id: Mapped[CategoryID] = mapped_column(SQLAlchemyUUID, primary_key=True)
+
+    amount: Mapped[Money] = mapped_column(Numeric(19, 5), default=Money())
+    count: Mapped[int] = mapped_column(BigInteger, default=0)
@@ -1,9 +1,12 @@
 import functools
 
 from dependency_injector.containers import DeclarativeContainer
-from dependency_injector.providers import Configuration, Singleton
+from dependency_injector.providers import Configuration, Resource, Singleton
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from shared.storage.cursor import set_cursor_secret
+from shared.storage.json import json_serializer
+
 
 class DatabaseContainer(DeclarativeContainer):
     config = Configuration()
@@ -12,6 +15,7 @@ class DatabaseContainer(DeclarativeContainer):
         create_async_engine,
         config.async_url,
         echo=config.debug_sql,
+        json_serializer=json_serializer,
     )
     async_session_maker = Singleton(
         async_sessionmaker[AsyncSession],
@@ -19,6 +23,8 @@ class DatabaseContainer(DeclarativeContainer):
         expire_on_commit=False,
         class_=AsyncSession,
     )
+    # Ключ подписи курсоров, общий для всех процессов сервиса: без него init_resources падает на старте
+    cursor_secret = Resource(set_cursor_secret, config.cursor_secret.required())
 
 
 postgres_container = DatabaseContainer()
@@ -1,6 +1,18 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from infra.di.database import postgres_container
 from infra.fastapi.account import account_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    postgres_container.config.cursor_secret.from_env('CURSOR_SECRET', required=True)
+    postgres_container.init_resources()
+    yield
+    postgres_container.shutdown_resources()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(account_router)
@@ -3,12 +3,15 @@ from types import UnionType
 from typing import Any
 
 from sqlalchemy import Select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncScalarResult, AsyncSession
 
+from shared.cqs.loader import load_coalesced, split_key_filter
 from shared.cqs.parser import auto_parse_kwargs, parse_kwargs_many
-from shared.cqs.query import QueryBase, apply_queries
+from shared.cqs.plans import register_handle
+from shared.cqs.query import QueriesTemplate, QueryBase, QueryFilterBase, apply_queries, get_queries_shape
 from shared.errors.application import NotFoundError
 from shared.storage.repository import RepositoryBase
+from shared.storage.statement_cache import StatementCache
 
 
 def generate_load_handle[T](
@@ -17,25 +20,47 @@ def generate_load_handle[T](
     query_types: list[type[QueryBase] | UnionType],
 ):
     query_type, *additional_query_types = query_types
+    register_handle('load', base_statement, query_types)
+    # Шаблоны запроса по форме запросов: на горячем пути не строим select и фильтры заново
+    templates = StatementCache[QueriesTemplate[T]]()
 
     @auto_parse_kwargs(query_type=query_type)
     async def handle_load(
         *,
         query: QueryBase,
         db_session: AsyncSession,
+        batch: bool = False,
         **kwargs,
     ) -> T | None:
         queries = parse_kwargs_many(kwargs, additional_query_types)
-        return await db_session.scalar(apply_queries(base_statement, query, *queries))
 
+        if batch and isinstance(query, QueryFilterBase) and (key_filter := split_key_filter(query.render_filter())):
+            return await load_coalesced(db_session, apply_queries(base_statement, *queries), *key_filter)
+
+        queries = [query, *queries]
+        if (shape := get_queries_shape(queries)) is not None:
+            template = templates.get(shape, lambda: QueriesTemplate.build(base_statement, queries))
+            if template is not None:
+                return await db_session.scalar(template.statement, template.render_params(queries))
+
+        return await db_session.scalar(apply_queries(base_statement, *queries))
+
+    handle_load.statement_cache = templates  # type: ignore
     return handle_load
 
 
+DEFAULT_FETCH_SIZE = 1000
+
+
 def generate_list_handle[T](
     *,
     base_statement: Select[tuple[T]],
     query_types: list[Any],
+    stream: bool = False,
+    fetch_size: int = DEFAULT_FETCH_SIZE,
 ):
+    register_handle('list', base_statement, query_types)
+
     @auto_parse_kwargs(query_types=query_types)
     async def handle_list(
         *,
@@ -45,7 +70,19 @@ def generate_list_handle[T](
     ) -> list[T]:
         return list(await db_session.scalars(apply_queries(base_statement, *queries)))
 
-    return handle_list
+    # stream=True отдает серверный курсор, в памяти не больше fetch_size сущностей
+    @auto_parse_kwargs(query_types=query_types)
+    async def handle_stream(
+        *,
+        queries: list[QueryBase],
+        db_session: AsyncSession,
+        fetch_size: int = fetch_size,
+        **_,
+    ) -> AsyncScalarResult[T]:
+        statement = apply_queries(base_statement, *queries).execution_options(yield_per=fetch_size)
+        return await db_session.stream_scalars(statement)
+
+    return handle_stream if stream else handle_list
 
 
 def generate_list_handle_with_cursor[T](
@@ -54,6 +91,8 @@ def generate_list_handle_with_cursor[T](
     query_types: list[Any],
     entity_repository_cls: type[RepositoryBase[T]],
 ):
+    register_handle('list', base_statement.limit(entity_repository_cls.config.default_limit), query_types)
+
     @auto_parse_kwargs(query_types=query_types)
     async def handle_list(
         *,
@@ -65,10 +104,9 @@ def generate_list_handle_with_cursor[T](
         entity_repository = entity_repository_cls(db_session)
 
         statement = apply_queries(base_statement, *queries)
-        statement = entity_repository.apply_cursor(statement, cursor)
 
         items, new_cursor = await entity_repository.list_cursor(statement, cursor)
-        return items, new_cursor and new_cursor.dumps()
+        return items, new_cursor and entity_repository.dumps_cursor(statement, new_cursor)
 
     return handle_list
 
@@ -77,12 +115,13 @@ DEFAULT_NOT_FOUND_ERROR = NotFoundError('Object not found')
 
 
 def generate_load_decorator(handle, pass_as: str, not_found_error: NotFoundError = DEFAULT_NOT_FOUND_ERROR):
-    def generator(for_update: bool = False, raise_error: bool = True):
+    # batch=True объединяет загрузки одной формы из конкурентных обработчиков одного тика в один запрос
+    def generator(for_update: bool = False, raise_error: bool = True, batch: bool = False):
         def decorator(func):
             @functools.wraps(func)
             async def wrapper(**kwargs):
                 if kwargs.get(pass_as) is None:
-                    kwargs[pass_as] = await handle(**kwargs, for_update=for_update)
+                    kwargs[pass_as] = await handle(**kwargs, for_update=for_update, batch=batch)
 
                 if raise_error and kwargs[pass_as] is None:
                     raise not_found_error
@@ -0,0 +1,107 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import BinaryExpression, BindParameter, ColumnElement, Select, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+
+PENDING_KEY = 'cqs_load_pending'
+MEMO_KEY = 'cqs_load_memo'
+
+
+@dataclass(slots=True)
+class LoadBatch:
+    statement: Select
+    key_column: ColumnElement
+    futures: dict[Any, asyncio.Future] = field(default_factory=dict)
+    task: asyncio.Task | None = None
+
+
+def split_key_filter(clause: ColumnElement[bool]) -> tuple[ColumnElement, Any] | None:
+    """Разбирает фильтр вида `column == value`, остальные фильтры не батчим"""
+
+    if (
+        isinstance(clause, BinaryExpression)
+        and clause.operator is operators.eq
+        and isinstance(clause.right, BindParameter)
+        and getattr(clause.left, 'key', None) is not None
+    ):
+        return clause.left, clause.right.effective_value
+    return None
+
+
+def get_statement_shape(statement: Select, key_column: ColumnElement) -> tuple | None:
+    """Форма запроса: структура SQL + значения параметров, без значения ключа"""
+
+    if (cache_key := statement._generate_cache_key()) is None:
+        return None
+
+    shape = (cache_key.key, tuple(param.effective_value for param in cache_key.bindparams), key_column.key)
+    try:
+        hash(shape)
+    except TypeError:
+        return None
+    return shape
+
+
+async def load_coalesced[T](
+    db_session: AsyncSession, statement: Select[tuple[T]], key_column: ColumnElement, key_value: Any
+) -> T | None:
+    """
+    Загружает одну сущность, объединяя загрузки одной формы, запрошенные
+    в рамках одного тика event loop, в один запрос `key IN (...)`.
+    Результаты запоминаются до конца транзакции (кроме FOR UPDATE).
+    """
+
+    if (shape := get_statement_shape(statement, key_column)) is None:
+        return await db_session.scalar(statement.where(key_column == key_value))
+
+    use_memo = statement._for_update_arg is None
+    memo = db_session.info.setdefault(MEMO_KEY, {})
+    if use_memo and (shape, key_value) in memo:
+        return memo[shape, key_value]
+
+    pending = db_session.info.setdefault(PENDING_KEY, {})
+    if (batch := pending.get(shape)) is None:
+        batch = pending[shape] = LoadBatch(statement, key_column)
+        batch.task = asyncio.create_task(_dispatch(db_session, shape, batch, use_memo))
+
+    if (future := batch.futures.get(key_value)) is None:
+        future = batch.futures[key_value] = asyncio.get_running_loop().create_future()
+
+    return await asyncio.shield(future)
+
+
+async def _dispatch(db_session: AsyncSession, shape: tuple, batch: LoadBatch, use_memo: bool) -> None:
+    await asyncio.sleep(0)  # Даем остальным обработчикам текущего тика встать в очередь
+    db_session.info[PENDING_KEY].pop(shape, None)
+
+    try:
+        entities = await db_session.scalars(batch.statement.where(batch.key_column.in_(list(batch.futures))))
+        entities_by_key = dict[Any, Any]()
+        for entity in entities:
+            entities_by_key.setdefault(getattr(entity, batch.key_column.key), entity)
+    except asyncio.CancelledError:
+        for future in batch.futures.values():
+            future.cancel()
+        raise
+    except Exception as exc:
+        for future in batch.futures.values():
+            if not future.done():
+                future.set_exception(exc)
+        return
+
+    memo = db_session.info.setdefault(MEMO_KEY, {})
+    for key_value, future in batch.futures.items():
+        entity = entities_by_key.get(key_value)
+        if use_memo and entity is not None:
+            memo[shape, key_value] = entity
+        if not future.done():
+            future.set_result(entity)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _reset_load_memo(session: Session, _) -> None:
+    session.info.pop(MEMO_KEY, None)
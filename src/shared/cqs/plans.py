@@ -0,0 +1,150 @@
+import datetime as dt
+import enum
+import itertools
+import json
+import types
+import typing
+from collections.abc import Iterator
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any
+from uuid import UUID, uuid4
+
+from sqlalchemy import BindParameter, Select, bindparam
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.cqs.query import QueryBase, QueryStatementBase, apply_queries
+
+
+@dataclass(slots=True, frozen=True)
+class PlanProbe:
+    """Запрос сгенерированного обработчика для проверки плана, значения фильтров - bindparam"""
+
+    name: str
+    statement: Select
+
+
+@dataclass(slots=True, frozen=True)
+class RegisteredHandle:
+    kind: str
+    base_statement: Select
+    query_types: tuple[Any, ...]
+
+
+# Обработчики, созданные generate_*_handle, в порядке регистрации
+REGISTERED_HANDLES = list[RegisteredHandle]()
+
+
+def register_handle(kind: str, base_statement: Select, query_types: list[Any]) -> None:
+    REGISTERED_HANDLES.append(RegisteredHandle(kind, base_statement, tuple(query_types)))
+
+
+def _placeholder(name: str, annotation: Any) -> Any:
+    if typing.get_origin(annotation) is typing.Literal:
+        return typing.get_args(annotation)[0]
+    if annotation is bool:
+        return True
+    if (mapper := getattr(annotation, '__mapper__', None)) is not None:
+        # cur_user: User и подобные - обращения к полям сущности тоже становятся параметрами
+        return types.SimpleNamespace(**{attr.key: bindparam(f'{name}_{attr.key}') for attr in mapper.column_attrs})
+    return bindparam(name)
+
+
+def make_probe_query(query_type: type[QueryBase], statement: Select) -> QueryBase | None:
+    """Запрос, где вместо значений bindparam, None - запрос не строится без настоящих значений"""
+
+    values = {
+        name: field.default if not field.is_required() else _placeholder(name, field.annotation)
+        for name, field in query_type.model_fields.items()
+    }
+    query = query_type.model_construct(**values)
+    try:
+        if isinstance(query, QueryStatementBase):
+            query.apply_query(statement)
+        else:
+            query.render_filter()
+    except Exception:
+        return None
+    return query
+
+
+def make_probes(handle: RegisteredHandle) -> list[PlanProbe]:
+    """По пробе на каждый вариант union-типов запросов, в пробу входят все запросы обработчика"""
+
+    variants = [typing.get_args(tp) if isinstance(tp, types.UnionType) else (tp,) for tp in handle.query_types]
+    table = ','.join(from_.description for from_ in handle.base_statement.get_final_froms())
+
+    probes = []
+    for query_types in itertools.product(*variants):
+        queries = {tp: make_probe_query(tp, handle.base_statement) for tp in query_types}
+        # Непостроенные запросы помечаем в имени, чтобы пробы различались
+        names = (tp.__name__ if query is not None else f'-{tp.__name__}' for tp, query in queries.items())
+        statement = apply_queries(handle.base_statement, *(query for query in queries.values() if query is not None))
+        probes.append(PlanProbe(f'{handle.kind} {table} [{", ".join(names)}]', statement))
+    return probes
+
+
+def iter_probes() -> Iterator[PlanProbe]:
+    for handle in REGISTERED_HANDLES:
+        yield from make_probes(handle)
+
+
+_SAMPLE_VALUES = {
+    UUID: uuid4,
+    str: lambda: 'probe',
+    int: int,
+    Decimal: Decimal,
+    dt.date: dt.date.today,
+    dt.datetime: lambda: dt.datetime.now(dt.UTC),
+}
+
+
+def _sample_value(param: BindParameter) -> Any:
+    try:
+        python_type = param.type.python_type
+    except NotImplementedError:
+        return None
+
+    if issubclass(python_type, enum.Enum):
+        return next(iter(python_type))
+    if (factory := _SAMPLE_VALUES.get(python_type)) is not None:
+        return factory()
+    return None
+
+
+def render_probe(statement: Select) -> str:
+    """SQL пробы для postgresql, незаполненные параметры получают значения по типу"""
+
+    compiled = statement.compile(dialect=postgresql.dialect())
+    values = {
+        name: [_sample_value(param)] if param.expanding else _sample_value(param)
+        for name, param in compiled.binds.items()
+        if param.value is None and param.callable is None
+    }
+    statement = statement.params(values)
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+
+
+async def explain(db_session: AsyncSession, statement: Select) -> dict:
+    """План запроса без seq scan там, где есть хоть какой-то индекс"""
+
+    connection = await db_session.connection()
+    await connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    # Готовый SQL без параметров: в литералах встречаются приведения вида ::UUID
+    result = await connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + render_probe(statement))
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def find_seq_scans(plan: dict) -> list[str]:
+    """Таблицы, которые читаются последовательным сканированием"""
+
+    tables = []
+    if plan.get('Node Type') == 'Seq Scan':
+        tables.append(plan.get('Relation Name', '?'))
+    for sub_plan in plan.get('Plans', ()):
+        tables.extend(find_seq_scans(sub_plan))
+    return tables
@@ -1,5 +1,10 @@
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Literal, get_args, get_origin
+
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import ColumnElement, Select
+from sqlalchemy import BindParameter, ColumnElement, Select, bindparam, inspect
 
 
 class QueryBase(BaseModel):
@@ -26,3 +31,86 @@ def apply_queries[T](statement: Select[tuple[T]], *queries: QueryBase) -> Select
                 statement = query.apply_query(statement)
 
     return statement.where(*filters)
+
+
+_PARAM = ':param'
+
+
+def _is_shape_value(query: QueryBase, name: str, value: Any) -> bool:
+    """bool, None, перечисления и Literal-поля входят в форму как есть: от них обычно зависит структура запроса"""
+
+    if value is None or isinstance(value, bool | Enum):
+        return True
+    annotation = type(query).model_fields[name].annotation
+    return any(get_origin(arg) is Literal for arg in (annotation, *get_args(annotation)))
+
+
+def get_queries_shape(queries: Sequence[QueryBase]) -> tuple | None:
+    """Форма запросов для ключа кэша шаблонов: типы запросов и формы их полей. Массивы не кэшируются"""
+
+    shape = list[tuple[type[QueryBase], tuple]]()
+    for query in queries:
+        fields_shape = list[tuple[str, Any]]()
+        for name, value in query:
+            if _is_shape_value(query, name, value):
+                fields_shape.append((name, value))
+            elif isinstance(value, list | tuple | set | frozenset | dict):
+                return None
+            else:
+                fields_shape.append((name, _PARAM))
+        shape.append((type(query), tuple(fields_shape)))
+    return tuple(shape)
+
+
+@dataclass(slots=True)
+class _EntityPlaceholder:
+    """Сущность в поле шаблона: прочитанные атрибуты становятся bindparam и запоминаются"""
+
+    prefix: str
+    attrs: list[str] = field(default_factory=list)
+
+    def __getattr__(self, attr: str) -> BindParameter:
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        if attr not in self.attrs:
+            self.attrs.append(attr)
+        return bindparam(f'{self.prefix}_{attr}')
+
+
+@dataclass(slots=True)
+class QueriesTemplate[T]:
+    """Запрос, где вместо значений полей запросов bindparam, строится один раз на форму запросов"""
+
+    statement: Select[tuple[T]]
+    # (имя параметра, номер запроса, поле, атрибут сущности в поле или None)
+    params: list[tuple[str, int, str, str | None]]
+
+    @classmethod
+    def build(cls, statement: Select[tuple[T]], queries: Sequence[QueryBase]) -> 'QueriesTemplate[T]':
+        placeholders, params, entities = [], [], []
+        for index, query in enumerate(queries):
+            values = dict[str, Any]()
+            for name, value in query:
+                key = f'q{index}_{name}'
+                if _is_shape_value(query, name, value):
+                    values[name] = value
+                elif isinstance(value, BaseModel) or inspect(value, raiseerr=False) is not None:
+                    values[name] = placeholder = _EntityPlaceholder(key)
+                    entities.append((index, name, placeholder))
+                else:
+                    values[name] = bindparam(key)
+                    params.append((key, index, name, None))
+            # Без валидации: вместо значений bindparam
+            placeholders.append(type(query).model_construct(**values))
+
+        template = apply_queries(statement, *placeholders)
+        for index, name, placeholder in entities:
+            params.extend((f'{placeholder.prefix}_{attr}', index, name, attr) for attr in placeholder.attrs)
+        return cls(template, params)
+
+    def render_params(self, queries: Sequence[QueryBase]) -> dict[str, Any]:
+        params = dict[str, Any]()
+        for key, index, name, attr in self.params:
+            value = getattr(queries[index], name)
+            params[key] = value if attr is None else getattr(value, attr)
+        return params
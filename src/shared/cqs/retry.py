@@ -0,0 +1,35 @@
+import asyncio
+import functools
+import random
+
+from shared.errors.application import VersionConflictError
+from shared.errors.base import BaseError
+
+
+def retry_on_conflict(
+    attempts: int = 3,
+    backoff: float = 0.01,
+    errors: tuple[type[BaseError], ...] = (VersionConflictError,),
+):
+    """
+    Повторяет обработчик при конфликте версий не больше attempts раз, последняя ошибка пробрасывается.
+    Обработчик сам читает свежий lsn на каждой попытке, повтор при том же expected_lsn бессмыслен.
+    Пауза между попытками растет вдвое плюс случайный разброс, чтобы соперники не совпадали снова.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            for attempt in range(attempts):
+                try:
+                    return await func(**kwargs)
+                except errors:
+                    if attempt == attempts - 1:
+                        raise
+                    if (db_session := kwargs.get('db_session')) is not None:
+                        await db_session.rollback()
+                    await asyncio.sleep(backoff * 2**attempt * random.random())
+
+        return wrapper
+
+    return decorator
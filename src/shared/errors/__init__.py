@@ -1,6 +1,12 @@
-from shared.errors.application import AccessDeniedError, ApplicationError
+from shared.errors.application import (
+    AccessDeniedError,
+    ApplicationError,
+    ConflictError,
+    NotFoundError,
+    VersionConflictError,
+)
 from shared.errors.base import BaseError
-from shared.errors.domain import ConflictError, DomainError, NotFoundError
+from shared.errors.domain import DomainError
 
 __all__ = [
     'AccessDeniedError',
@@ -9,4 +15,5 @@ __all__ = [
     'ConflictError',
     'DomainError',
     'NotFoundError',
+    'VersionConflictError',
 ]
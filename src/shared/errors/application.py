@@ -16,6 +16,21 @@ class IntegrityError(ApplicationError):
     message = 'Violation of the integrity'
 
 
+class ConflictError(ApplicationError):
+    code = 'CONFLICT_ERROR'
+    message = 'Resource conflicts with the current state'
+
+
+class VersionConflictError(ConflictError):
+    code = 'VERSION_CONFLICT_ERROR'
+    message = 'Resource was modified by another request'
+
+
 class NotFoundError(ApplicationError):
     code = 'NOT_FOUND_ERROR'
     message = 'Resource not found'
+
+
+class InvalidCursorError(ApplicationError):
+    code = 'INVALID_CURSOR_ERROR'
+    message = 'Cursor is invalid or has been tampered with'
@@ -16,13 +16,15 @@ def get_lock_key(lock_name: str) -> int:
 
 
 @asynccontextmanager
-async def advisory_lock(lock_name: str, *, db_session: AsyncSession, lock_timeout=5000):
+async def advisory_lock(lock_name: str, *, db_session: AsyncSession, lock_timeout=5000, shared: bool = False):
     lock_key = get_lock_key(lock_name)
+    # Разделяемые блокировки совместимы между собой и ждут только исключительную
+    lock_function = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
 
     await db_session.execute(text('SET lock_timeout TO :lock_timeout').bindparams(lock_timeout=lock_timeout))
 
     try:
-        await db_session.execute(text('SELECT pg_advisory_xact_lock(:key)').bindparams(key=lock_key))
+        await db_session.execute(text(f'SELECT {lock_function}(:key)').bindparams(key=lock_key))
         yield
     except sqlalchemy.exc.OperationalError as exc:
         if isinstance(exc.orig, asyncpg.LockNotAvailableError):
@@ -1,8 +1,15 @@
 import base64
-import json
-from dataclasses import astuple, dataclass, field
+import datetime as dt
+import hashlib
+import hmac
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from decimal import Decimal
 from enum import StrEnum
-from typing import Any, Self
+from typing import Any
+from uuid import UUID
+
+from shared.errors.application import InvalidCursorError
 
 
 class EnumDirection(StrEnum):
@@ -21,9 +28,182 @@ class CursorValue:
 class Cursor:
     values: list[CursorValue] = field(default_factory=list)
 
-    def dumps(self):
-        return base64.b64encode(json.dumps([astuple(value) for value in self.values]).encode()).decode()
 
-    @classmethod
-    def loads(cls, cursor_str: str) -> Self:
-        return cls([CursorValue(*val) for val in json.loads(base64.b64decode(cursor_str).decode())])
+# Бинарный формат курсора:
+# version | (index, type, payload)* | tag
+# index - номер колонки в ORDER BY, tag - обрезанный HMAC от всего остального и формы ORDER BY
+
+CURSOR_VERSION = 1
+CURSOR_TAG_SIZE = 8
+
+# Общий для всех процессов сервиса ключ HMAC, задается при старте (infra.di.database)
+_cursor_secret: bytes | None = None
+
+
+def set_cursor_secret(secret: str | bytes) -> None:
+    global _cursor_secret
+    if not secret:
+        raise ValueError('Cursor secret is required')
+    _cursor_secret = secret.encode() if isinstance(secret, str) else secret
+
+
+class _Type:
+    NONE = 0
+    FALSE = 1
+    TRUE = 2
+    INT = 3
+    STR = 4
+    UUID = 5
+    DATE = 6
+    DATETIME = 7
+    DATETIME_TZ = 8
+    DECIMAL = 9
+
+
+# Младшие 7 бит байта varint - данные, старший - признак продолжения
+_VARINT_DATA = 0x7F
+_VARINT_MORE = 0x80
+
+_EPOCH = dt.datetime(1970, 1, 1)
+_EPOCH_TZ = dt.datetime(1970, 1, 1, tzinfo=dt.UTC)
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    value = value << 1 if value >= 0 else (-value << 1) - 1  # zigzag
+    while value > _VARINT_DATA:
+        buffer.append(value & _VARINT_DATA | _VARINT_MORE)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & _VARINT_DATA) << shift
+        if not byte & _VARINT_MORE:
+            return (result >> 1) ^ -(result & 1), pos
+        shift += 7
+
+
+def _timedelta_micros(delta: dt.timedelta) -> int:
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _write_value(buffer: bytearray, value: Any) -> None:
+    match value:
+        case None:
+            buffer.append(_Type.NONE)
+        case bool():
+            buffer.append(_Type.TRUE if value else _Type.FALSE)
+        case int():
+            buffer.append(_Type.INT)
+            _write_varint(buffer, value)
+        case str():
+            encoded = value.encode()
+            buffer.append(_Type.STR)
+            _write_varint(buffer, len(encoded))
+            buffer += encoded
+        case UUID():
+            buffer.append(_Type.UUID)
+            buffer += value.bytes
+        case dt.datetime() if value.tzinfo is None:
+            buffer.append(_Type.DATETIME)
+            _write_varint(buffer, _timedelta_micros(value - _EPOCH))
+        case dt.datetime():
+            buffer.append(_Type.DATETIME_TZ)
+            _write_varint(buffer, _timedelta_micros(value - _EPOCH_TZ))
+            _write_varint(buffer, _timedelta_micros(value.utcoffset() or dt.timedelta()) // 1_000_000)
+        case dt.date():
+            buffer.append(_Type.DATE)
+            _write_varint(buffer, value.toordinal())
+        case Decimal() if value.is_finite():
+            sign, digits, exponent = value.as_tuple()
+            coefficient = int(''.join(map(str, digits)) or '0')
+            buffer.append(_Type.DECIMAL)
+            _write_varint(buffer, coefficient << 1 | sign)  # знак отдельным битом, чтобы сохранить -0
+            _write_varint(buffer, exponent)  # type: ignore
+        case _:
+            raise TypeError(f'Unsupported cursor value type {type(value)}')
+
+
+def _read_value(data: bytes, pos: int) -> tuple[Any, int]:  # noqa: C901, PLR0911
+    value_type = data[pos]
+    pos += 1
+
+    match value_type:
+        case _Type.NONE:
+            return None, pos
+        case _Type.FALSE:
+            return False, pos
+        case _Type.TRUE:
+            return True, pos
+        case _Type.INT:
+            return _read_varint(data, pos)
+        case _Type.STR:
+            length, pos = _read_varint(data, pos)
+            return data[pos : pos + length].decode(), pos + length
+        case _Type.UUID:
+            return UUID(bytes=data[pos : pos + 16]), pos + 16
+        case _Type.DATE:
+            ordinal, pos = _read_varint(data, pos)
+            return dt.date.fromordinal(ordinal), pos
+        case _Type.DATETIME:
+            micros, pos = _read_varint(data, pos)
+            return _EPOCH + dt.timedelta(microseconds=micros), pos
+        case _Type.DATETIME_TZ:
+            micros, pos = _read_varint(data, pos)
+            offset, pos = _read_varint(data, pos)
+            tz = dt.timezone(dt.timedelta(seconds=offset))
+            return (_EPOCH_TZ + dt.timedelta(microseconds=micros)).astimezone(tz), pos
+        case _Type.DECIMAL:
+            coefficient, pos = _read_varint(data, pos)
+            exponent, pos = _read_varint(data, pos)
+            sign = '-' if coefficient & 1 else ''
+            return Decimal(f'{sign}{coefficient >> 1}E{exponent}'), pos
+
+    raise ValueError(f'Unknown cursor value type {value_type}')
+
+
+def _sign(payload: bytes, context: bytes) -> bytes:
+    if _cursor_secret is None:
+        raise RuntimeError('Cursor secret is not configured, see set_cursor_secret')
+    return hmac.digest(_cursor_secret, payload + context, hashlib.sha256)[:CURSOR_TAG_SIZE]
+
+
+def encode_cursor_values(values: Sequence[tuple[int, Any]], context: bytes = b'') -> str:
+    """Кодирует пары (номер колонки ORDER BY, значение) в короткий url-safe токен"""
+
+    buffer = bytearray([CURSOR_VERSION])
+    for index, value in values:
+        _write_varint(buffer, index)
+        _write_value(buffer, value)
+
+    payload = bytes(buffer)
+    return base64.urlsafe_b64encode(payload + _sign(payload, context)).rstrip(b'=').decode()
+
+
+def decode_cursor_values(token: str, context: bytes = b'') -> list[tuple[int, Any]]:
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    except ValueError as exc:
+        raise InvalidCursorError from exc
+
+    payload, tag = raw[:-CURSOR_TAG_SIZE], raw[-CURSOR_TAG_SIZE:]
+    if not payload or not hmac.compare_digest(tag, _sign(payload, context)):
+        raise InvalidCursorError
+    if payload[0] != CURSOR_VERSION:
+        raise InvalidCursorError('Unsupported cursor version')
+
+    values = list[tuple[int, Any]]()
+    pos = 1
+    try:
+        while pos < len(payload):
+            index, pos = _read_varint(payload, pos)
+            value, pos = _read_value(payload, pos)
+            values.append((index, value))
+    except (IndexError, ValueError) as exc:
+        raise InvalidCursorError from exc
+
+    return values
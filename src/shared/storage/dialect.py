@@ -0,0 +1,57 @@
+from typing import Any
+
+from sqlalchemy import Dialect, Insert, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Лимит параметров в одном запросе
+MAX_BIND_PARAMS = {
+    'postgresql': 32767,
+    'sqlite': 32766,
+}
+DEFAULT_MAX_BIND_PARAMS = 999
+
+
+def get_dialect(db_session: AsyncSession) -> Dialect:
+    return db_session.get_bind().dialect
+
+
+def get_max_bind_params(dialect: Dialect) -> int:
+    return MAX_BIND_PARAMS.get(dialect.name, DEFAULT_MAX_BIND_PARAMS)
+
+
+def dialect_insert(dialect: Dialect, entity_cls: Any) -> Insert:
+    """INSERT, поддерживающий ON CONFLICT для postgresql и sqlite"""
+
+    match dialect.name:
+        case 'postgresql':
+            return postgresql.insert(entity_cls)
+        case 'sqlite':
+            return sqlite.insert(entity_cls)
+    return insert(entity_cls)
+
+
+def supports_on_conflict(dialect: Dialect) -> bool:
+    return dialect.name in ('postgresql', 'sqlite')
+
+
+def supports_returning_from(dialect: Dialect) -> bool:
+    """RETURNING в UPDATE ... FROM может ссылаться на таблицы из FROM"""
+
+    return dialect.name == 'postgresql'
+
+
+def supports_data_modifying_cte(dialect: Dialect) -> bool:
+    """UPDATE и INSERT внутри WITH одного запроса"""
+
+    return dialect.name == 'postgresql'
+
+
+def supports_copy(dialect: Dialect) -> bool:
+    return dialect.name == 'postgresql' and dialect.driver == 'asyncpg'
+
+
+def snapshot_isolation_level(dialect: Dialect) -> str | None:
+    """Уровень изоляции, при котором все запросы транзакции читают один снимок, None - так уже по умолчанию"""
+
+    return 'REPEATABLE READ' if dialect.name == 'postgresql' else None
@@ -1,16 +1,36 @@
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from typing import Any, ClassVar
 
 from sqlalchemy import Select
 from sqlalchemy.orm import InstrumentedAttribute
 
+# (entity_cls, statement, value) -> statement, None - фильтр не подходит под значение
+type FilterCallable[T] = Callable[[type[T], Select[tuple[T]], Any], Select[tuple[T]] | None]
+
 
 class FilterHandler[T]:
+    # Имя фильтра -> обработчик, собирается при создании класса
+    filter_methods: ClassVar[dict[str, FilterCallable]] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.filter_methods = {
+            name: getattr(cls, name)
+            for name in dir(cls)
+            if not name.startswith('_') and name not in _SERVICE_NAMES and callable(getattr(cls, name, None))
+        }
+
+    @classmethod
+    def compile_filter(cls, entity_cls: type[T], filter_name: str) -> FilterCallable[T] | None:
+        return cls.filter_methods.get(filter_name)
+
     @classmethod
     def process_filters(
         cls, entity_cls: type[T], statement: Select[tuple[T]], filters: dict[str, Any]
     ) -> Select[tuple[T]]:
         for filter_name in list(filters):
-            if (handle := getattr(cls, filter_name, None)) is not None:
+            if (handle := cls.filter_methods.get(filter_name)) is not None:
                 statement = handle(entity_cls, statement, filters.pop(filter_name))
         return statement
 
@@ -21,16 +41,88 @@ class FilterHandler[T]:
         return statement
 
 
+_SERVICE_NAMES = frozenset(name for name in vars(FilterHandler) if name != 'for_update')
+FilterHandler.filter_methods = {'for_update': FilterHandler.for_update}
+
+
 class UseInForArrays[T](FilterHandler[T]):
     blacklist: ClassVar[set[InstrumentedAttribute]] = set()
 
+    @classmethod
+    def compile_filter(cls, entity_cls: type[T], filter_name: str) -> FilterCallable[T] | None:
+        # Методы подкласса с именем фильтра приоритетнее IN по полю
+        if (handle := super().compile_filter(entity_cls, filter_name)) is not None:
+            return handle
+
+        entity_field = getattr(entity_cls, filter_name, None)
+        if not entity_field or entity_field in cls.blacklist:
+            return None
+
+        def use_in(entity_cls: type[T], statement: Select[tuple[T]], value: Any) -> Select[tuple[T]] | None:
+            if isinstance(value, tuple | list):
+                return statement.where(entity_field.in_(value))
+            return None
+
+        return use_in
+
     @classmethod
     def process_filters(
         cls, entity_cls: type[T], statement: Select[tuple[T]], filters: dict[str, Any]
     ) -> Select[tuple[T]]:
+        statement = super().process_filters(entity_cls, statement, filters)
         for filter_name in list(filters):
             entity_field = getattr(entity_cls, filter_name, None)
             if entity_field and entity_field not in cls.blacklist and isinstance(filters[filter_name], tuple | list):
                 statement = statement.where(entity_field.in_(filters.pop(filter_name)))
 
         return statement
+
+
+@dataclass(slots=True)
+class FilterPlan[T]:
+    """
+    Сводный план фильтров репозитория: имя фильтра -> цепочка обработчиков в порядке filter_handlers.
+    Обработчик может отказаться от значения (вернуть None), тогда пробуется следующий,
+    если отказались все - сравнение по полю сущности. Цепочка собирается при первом использовании имени.
+    """
+
+    entity_cls: type[T]
+    handlers: list[type[FilterHandler[T]]]
+    default_filters: dict[str, Any] = field(default_factory=dict)
+    chains: dict[str, tuple[tuple[FilterCallable[T], ...], Any]] = field(default_factory=dict)
+
+    def get_chain(self, filter_name: str) -> tuple[tuple[FilterCallable[T], ...], Any]:
+        try:
+            return self.chains[filter_name]
+        except KeyError:
+            pass
+
+        handles = tuple(
+            handle
+            for handler in self.handlers
+            if (handle := handler.compile_filter(self.entity_cls, filter_name)) is not None
+        )
+        # Неизвестное имя: filter_by при применении выбросит понятную ошибку
+        chain = self.chains[filter_name] = (handles, getattr(self.entity_cls, filter_name, None))
+        return chain
+
+    def apply(self, statement: Select[tuple[T]], filters: dict[str, Any]) -> Select[tuple[T]]:
+        # default_filters перекрывают переданные фильтры
+        items = [(name, value) for name, value in filters.items() if name not in self.default_filters]
+        items.extend(self.default_filters.items())
+
+        # Сравнения с полями копят в один where - каждый where копирует запрос
+        clauses = []
+        for filter_name, value in items:
+            handles, entity_field = self.get_chain(filter_name)
+            for handle in handles:
+                if (new_statement := handle(self.entity_cls, statement, value)) is not None:
+                    statement = new_statement
+                    break
+            else:
+                if entity_field is None:
+                    statement = statement.filter_by(**{filter_name: value})
+                else:
+                    clauses.append(entity_field == value)
+
+        return statement.where(*clauses) if clauses else statement
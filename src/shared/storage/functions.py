@@ -0,0 +1,71 @@
+import datetime as dt
+from enum import StrEnum
+from typing import Any, ClassVar
+
+from sqlalchemy import ColumnElement, Date, Integer, cast, func, literal_column
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+
+class EnumDateGranularity(StrEnum):
+    DAY = 'DAY'
+    WEEK = 'WEEK'  # ISO неделя, начинается с понедельника
+    MONTH = 'MONTH'
+    QUARTER = 'QUARTER'
+    YEAR = 'YEAR'
+
+
+class date_bucket(FunctionElement[dt.date]):
+    """Начало периода, в который попадает дата"""
+
+    type = Date()
+    name = 'date_bucket'
+    inherit_cache = True
+    # Гранулярность меняет SQL, поэтому входит в ключ кэша запроса
+    _traverse_internals: ClassVar = [
+        *FunctionElement._traverse_internals,
+        ('granularity', InternalTraversal.dp_string),
+    ]
+
+    def __init__(self, granularity: EnumDateGranularity, date: ColumnElement[dt.date]) -> None:
+        self.granularity = EnumDateGranularity(granularity)
+        super().__init__(date)
+
+
+def _get_date(element: date_bucket) -> ColumnElement[dt.date]:
+    return element.clauses.clauses[0]  # type: ignore
+
+
+def _const(value: str | int) -> ColumnElement:
+    # Константы без bindparam: иначе выражение в SELECT и GROUP BY получает разные параметры
+    # и postgresql не считает их одним выражением
+    return literal_column(f"'{value}'" if isinstance(value, str) else str(value))
+
+
+@compiles(date_bucket)
+def _compile_default(element: date_bucket, compiler: SQLCompiler, **kw: Any) -> str:
+    date = _get_date(element)
+    if element.granularity == EnumDateGranularity.DAY:
+        return compiler.process(date, **kw)
+    return compiler.process(cast(func.date_trunc(_const(element.granularity.lower()), date), Date), **kw)
+
+
+@compiles(date_bucket, 'sqlite')
+def _compile_sqlite(element: date_bucket, compiler: SQLCompiler, **kw: Any) -> str:
+    date = _get_date(element)
+    match element.granularity:
+        case EnumDateGranularity.DAY:
+            expression = date
+        case EnumDateGranularity.WEEK:
+            # Ближайшее воскресенье не раньше даты, минус 6 дней - понедельник ISO недели
+            expression = func.date(date, _const('weekday 0'), _const('-6 days'))
+        case EnumDateGranularity.MONTH:
+            expression = func.date(date, _const('start of month'))
+        case EnumDateGranularity.QUARTER:
+            month = (cast(func.strftime(_const('%m'), date), Integer) - _const(1)) // 3 * 3 + 1
+            expression = func.printf(_const('%s-%02d-01'), func.strftime(_const('%Y'), date), month)
+        case EnumDateGranularity.YEAR:
+            expression = func.date(date, _const('start of year'))
+    return compiler.process(expression, **kw)
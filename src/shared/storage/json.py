@@ -0,0 +1,17 @@
+import json
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+
+def _default(value: Any) -> Any:
+    # Decimal строкой - без потери точности
+    if isinstance(value, Decimal | UUID):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def json_serializer(value: Any) -> str:
+    """Сериализатор JSON-колонок для create_async_engine: данные событий содержат Money и id"""
+
+    return json.dumps(value, default=_default, ensure_ascii=False)
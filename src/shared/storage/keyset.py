@@ -0,0 +1,128 @@
+import functools
+from collections.abc import Callable
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any
+
+from sqlalchemy import ColumnElement, UnaryExpression, and_, or_, tuple_
+from sqlalchemy.sql import operators
+
+from shared.errors.application import InvalidCursorError
+from shared.storage.cursor import Cursor, CursorValue, EnumDirection, decode_cursor_values, encode_cursor_values
+
+
+@dataclass(slots=True, frozen=True)
+class KeysetColumn:
+    name: str
+    direction: EnumDirection
+    expression: ColumnElement
+
+
+@dataclass(slots=True, frozen=True)
+class KeysetPlan:
+    """План keyset-пагинации: колонки запроса, чтение значений и подпись формы ORDER BY"""
+
+    columns: tuple[KeysetColumn, ...]
+    get_values: Callable[[Any], tuple]
+    signature: bytes
+
+    @property
+    def uniform_direction(self) -> EnumDirection | None:
+        directions = {column.direction for column in self.columns}
+        return directions.pop() if len(directions) == 1 else None
+
+    def make_cursor(self, item: Any) -> Cursor:
+        return Cursor(
+            [
+                CursorValue(column.name, column.direction, value)
+                for column, value in zip(self.columns, self.get_values(item))
+            ]
+        )
+
+    def dumps(self, cursor: Cursor) -> str:
+        self.check_cursor(cursor)
+        return encode_cursor_values(
+            [(index, cursor_value.value) for index, cursor_value in enumerate(cursor.values)], self.signature
+        )
+
+    def loads(self, cursor_str: str) -> Cursor:
+        values = decode_cursor_values(cursor_str, self.signature)
+        if [index for index, _ in values] != list(range(len(self.columns))):
+            raise InvalidCursorError('Cursor does not match statement order')
+
+        return Cursor(
+            [CursorValue(column.name, column.direction, value) for column, (_, value) in zip(self.columns, values)]
+        )
+
+    def check_cursor(self, cursor: Cursor) -> None:
+        if [(value.field_name, value.direction) for value in cursor.values] != [
+            (column.name, column.direction) for column in self.columns
+        ]:
+            raise InvalidCursorError('Cursor does not match statement order')
+
+    def render(self, cursor: Cursor) -> ColumnElement[bool]:
+        self.check_cursor(cursor)
+        values = [cursor_value.value for cursor_value in cursor.values]
+
+        if (direction := self.uniform_direction) is not None:
+            # (a, b) > (:a, :b) - индекс (a, b) используется как один range scan
+            if len(self.columns) == 1:
+                left, right = self.columns[0].expression, values[0]
+            else:
+                left, right = tuple_(*(column.expression for column in self.columns)), tuple(values)
+            return left > right if direction == EnumDirection.ASC else left < right
+
+        # Смешанные направления: a > :a OR (a = :a AND b < :b) ...
+        conditions = list[ColumnElement[bool]]()
+        for i, column in enumerate(self.columns):
+            eq_conditions = [prev.expression == value for prev, value in zip(self.columns[:i], values)]
+            if column.direction == EnumDirection.ASC:
+                conditions.append(and_(*eq_conditions, column.expression > values[i]))
+            else:
+                conditions.append(and_(*eq_conditions, column.expression < values[i]))
+        return or_(*conditions)
+
+
+def _source_name(expression: ColumnElement) -> str:
+    # Таблица, подзапрос или алиас колонки, у выражений без источника - пустая строка
+    return getattr(getattr(expression, 'table', None), 'name', None) or ''
+
+
+def _keyset_column(clause: ColumnElement) -> KeysetColumn:
+    if isinstance(clause, UnaryExpression):
+        if clause.modifier not in (operators.asc_op, operators.desc_op):
+            raise ValueError(f'Unsupported order by clause {clause}')
+        direction = EnumDirection.ASC if clause.modifier is operators.asc_op else EnumDirection.DESC
+        expression = clause.element
+    else:
+        # Plain column without explicit ordering
+        direction = EnumDirection.ASC
+        expression = clause
+
+    return KeysetColumn(expression.key, direction, expression)  # type: ignore
+
+
+type KeysetShape = tuple[tuple[str, str, EnumDirection], ...]
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_shape(shape: KeysetShape) -> tuple[Callable[[Any], tuple], bytes]:
+    getter = attrgetter(*(name for _, name, _ in shape))
+    get_values = (lambda item: (getter(item),)) if len(shape) == 1 else getter
+    # Подпись формы ORDER BY с таблицами колонок входит в HMAC курсора - курсор другого списка не подойдет,
+    # даже если имена и направления колонок совпадают
+    signature = ','.join(f'{source}.{name} {direction}' for source, name, direction in shape).encode()
+    return get_values, signature
+
+
+def compile_keyset(order_by: tuple[ColumnElement, ...]) -> KeysetPlan:
+    if not order_by:
+        raise ValueError('Order is required for cursor')
+
+    # Выражения ORDER BY свои у каждого запроса, кэш - по форме (таблица, колонка, направление),
+    # а не по объектам: он не держит запросы и попадает для ORDER BY, собранных заново
+    columns = tuple(_keyset_column(clause) for clause in order_by)
+    get_values, signature = _compile_shape(
+        tuple((_source_name(column.expression), column.name, column.direction) for column in columns)
+    )
+    return KeysetPlan(columns, get_values, signature)
@@ -1,14 +1,32 @@
-from collections.abc import AsyncIterable
+import asyncio
+from collections.abc import AsyncIterable, Callable, Iterable, Iterator, Mapping, Sequence
+from contextlib import aclosing
 from dataclasses import dataclass
+from itertools import batched, chain
 from typing import Any
 
-from sqlalchemy import Select, UnaryExpression, and_, or_, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import ColumnElement, Executable, Insert, Select, bindparam, inspect, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncScalarResult, AsyncSession
 from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.orm.util import identity_key
 
 from shared.errors.application import NotFoundError
-from shared.storage.cursor import Cursor, CursorValue, EnumDirection
-from shared.storage.filters import FilterHandler
+from shared.storage.cursor import Cursor
+from shared.storage.dialect import (
+    dialect_insert,
+    get_dialect,
+    get_max_bind_params,
+    supports_copy,
+    supports_on_conflict,
+)
+from shared.storage.filters import FilterHandler, FilterPlan
+from shared.storage.keyset import compile_keyset
+from shared.storage.statement_cache import (
+    StatementCache,
+    get_filters_shape,
+    make_filters_params,
+    make_filters_placeholders,
+)
 
 
 @dataclass(slots=True, init=False)
@@ -17,9 +35,14 @@ class RepositoryConfig[T]:
     primary_key: tuple[InstrumentedAttribute]
     filter_handlers: list[type[FilterHandler[T]]]
     default_limit: int
+    max_limit: int
     default_filters: dict[str, Any]
+    load_chunk_size: int
+    default_fetch_size: int
+    statement_cache_size: int
+    filter_plan: FilterPlan[T]
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         *,
         entity_cls: type[T],
@@ -27,12 +50,21 @@ class RepositoryConfig[T]:
         filter_handlers: list[type[FilterHandler[T]]] | None = None,
         default_filters: dict[str, Any] | None = None,
         default_limit: int = 100,
+        max_limit: int = 1000,
+        load_chunk_size: int = 1000,
+        default_fetch_size: int = 1000,
+        statement_cache_size: int = 128,
     ) -> None:
         self.entity_cls = entity_cls
         self.primary_key = primary_key if isinstance(primary_key, tuple) else (primary_key,)
         self.filter_handlers = filter_handlers or []
         self.default_filters = default_filters or {}
         self.default_limit = default_limit
+        self.max_limit = max_limit
+        self.load_chunk_size = load_chunk_size
+        self.default_fetch_size = default_fetch_size
+        self.statement_cache_size = statement_cache_size
+        self.filter_plan = FilterPlan(entity_cls, self.filter_handlers, self.default_filters)
 
 
 @dataclass(slots=True)
@@ -41,13 +73,11 @@ class RepositoryBase[T]:
 
     def __init_subclass__(cls, config: RepositoryConfig[T]) -> None:
         cls.config = config
+        cls.statement_cache = StatementCache[Executable](config.statement_cache_size)
 
     @classmethod
     def apply_filters(cls, statement: Select[tuple[T]], filters: dict[str, Any]) -> Select[tuple[T]]:
-        all_filters = filters | cls.config.default_filters
-        for custom_filter in cls.config.filter_handlers:
-            statement = custom_filter.process_filters(cls.config.entity_cls, statement, all_filters)
-        return statement.filter_by(**filters)
+        return cls.config.filter_plan.apply(statement, filters)
 
     @classmethod
     def select(cls, **filters) -> Select[tuple[T]]:
@@ -55,95 +85,385 @@ class RepositoryBase[T]:
             return cls.apply_filters(select(cls.config.entity_cls), filters)
         return select(cls.config.entity_cls)
 
+    @classmethod
+    def get_template(
+        cls, kind: str, filters: dict[str, Any], build: Callable[[Select[tuple[T]]], Executable]
+    ) -> tuple[Executable, dict[str, Any]]:
+        """
+        Возвращает запрос и параметры к нему. Запрос строится один раз на форму фильтров (kind + имена фильтров),
+        скалярные значения фильтров подставляются как bindparam.
+        """
+
+        if (shape := get_filters_shape(filters)) is not None:
+            template = cls.statement_cache.get(
+                (kind, shape), lambda: build(cls.select(**make_filters_placeholders(filters)))
+            )
+            if template is not None:
+                return template, make_filters_params(filters)
+
+        return build(cls.select(**filters)), {}
+
     async def load(self, *pkey: Any) -> T | None:
-        if len(pkey) != len(self.config.primary_key):
+        primary_key = self.config.primary_key
+        if len(pkey) != len(primary_key):
             raise ValueError
 
-        return await self.db_session.scalar(
-            self.select().where(*(attr == value for attr, value in zip(self.config.primary_key, pkey)))
+        statement = self.statement_cache.get(
+            ('load', ()),
+            lambda: self.select().where(*(attr == bindparam(f'pk_{i}') for i, attr in enumerate(primary_key))),
         )
+        return await self.db_session.scalar(statement, {f'pk_{i}': value for i, value in enumerate(pkey)})
+
+    async def load_many(self, *pkeys: Any) -> list[T | None]:
+        """
+        Загружает сущности по списку первичных ключей пачками.
+        Для составного ключа каждый элемент pkeys - кортеж значений.
+        Результат в порядке запроса, на месте отсутствующих None.
+        """
+        primary_key = self.config.primary_key
+        pkeys_norm = [pkey if isinstance(pkey, tuple) else (pkey,) for pkey in pkeys]
+        if any(len(pkey) != len(primary_key) for pkey in pkeys_norm):
+            raise ValueError
+
+        loaded = dict[tuple, T]()
+        to_fetch = list[tuple]()
+        for pkey in dict.fromkeys(pkeys_norm):
+            if (entity := self._from_identity_map(pkey)) is not None:
+                loaded[pkey] = entity
+            else:
+                to_fetch.append(pkey)
+
+        if len(primary_key) == 1:
+            pkey_column = primary_key[0]
+            values = [pkey for (pkey,) in to_fetch]
+            get_pkey = lambda entity: (getattr(entity, pkey_column.key),)  # noqa: E731
+        else:
+            pkey_column = tuple_(*primary_key)
+            values = to_fetch
+            get_pkey = lambda entity: tuple(getattr(entity, attr.key) for attr in primary_key)  # noqa: E731
+
+        for chunk in batched(values, self.config.load_chunk_size):
+            for entity in await self.db_session.scalars(self.select().where(pkey_column.in_(chunk))):
+                loaded[get_pkey(entity)] = entity
+
+        return [loaded.get(pkey) for pkey in pkeys_norm]
+
+    async def load_many_by(self, field: str, values: Iterable[Any], **filters) -> list[T | None]:
+        """
+        Загружает сущности по значениям поля field (например code) и дополнительным фильтрам.
+        Результат в порядке values, на месте отсутствующих None.
+        """
+        values = list(values)
+        entity_field = getattr(self.config.entity_cls, field)
+
+        loaded = dict[Any, T]()
+        for chunk in batched(dict.fromkeys(values), self.config.load_chunk_size):
+            statement = self.select(**filters).where(entity_field.in_(chunk))
+            for entity in await self.db_session.scalars(statement):
+                loaded.setdefault(getattr(entity, field), entity)
+
+        return [loaded.get(value) for value in values]
+
+    def _from_identity_map(self, pkey: tuple) -> T | None:
+        entity = self.db_session.identity_map.get(identity_key(self.config.entity_cls, pkey))
+        if entity is None or inspect(entity).expired_attributes:
+            return None
+        return entity
 
     async def load_by(self, **filters) -> T | None:
-        return await self.db_session.scalar(self.select(**filters))
+        statement, params = self.get_template('load_by', filters, lambda statement: statement)
+        return await self.db_session.scalar(statement, params)
 
     async def exists(self, **filters) -> bool:
-        return await self.db_session.scalar(self.select(**filters).exists().select())  # type: ignore
+        statement, params = self.get_template('exists', filters, lambda statement: statement.exists().select())
+        return await self.db_session.scalar(statement, params)  # type: ignore
 
     @classmethod
     def apply_cursor(cls, statement: Select[tuple[T]], cursor: Cursor | str | None = None) -> Select[tuple[T]]:
         if not cursor:
             return statement
 
+        keyset = compile_keyset(statement._order_by_clauses)
         if isinstance(cursor, str):
-            cursor = Cursor.loads(cursor)
-
-        conditions = list[Any]()
-        eq_conditions = list[Any]()
+            cursor = keyset.loads(cursor)
 
-        for cursor_value in cursor.values:
-            eq_conditions.append(getattr(cls.config.entity_cls, cursor_value.field_name) == cursor_value.value)
+        return statement.where(keyset.render(cursor))
 
-        for cursor_value in reversed(cursor.values):
-            eq_conditions.pop()
-
-            if cursor_value.direction == EnumDirection.ASC:
-                condition = getattr(cls.config.entity_cls, cursor_value.field_name) > cursor_value.value
-            else:
-                condition = getattr(cls.config.entity_cls, cursor_value.field_name) < cursor_value.value
-
-            conditions.append(and_(*eq_conditions, condition))
-
-        return statement.where(or_(*conditions))
+    @classmethod
+    def dumps_cursor(cls, statement: Select[tuple[T]], cursor: Cursor) -> str:
+        return compile_keyset(statement._order_by_clauses).dumps(cursor)
 
     async def list_cursor(
-        self, statement: Select[tuple[T]], cursor: Cursor | str | None = None
+        self, statement: Select[tuple[T]], cursor: Cursor | str | None = None, *, limit: int | None = None
     ) -> tuple[list[T], Cursor | None]:
-        if not statement._order_by_clauses:
-            raise ValueError('Order is required for cursor')
+        """
+        Страница keyset-пагинации, limit ограничен сверху max_limit.
+        Читается одна лишняя строка: курсор None - следующей страницы нет, в том числе на последней странице.
+        """
+
+        keyset = compile_keyset(statement._order_by_clauses)
 
         statement = self.apply_cursor(statement, cursor)
 
-        if statement._limit_clause is None:
-            statement = statement.limit(self.config.default_limit)
+        page_size = statement._limit
+        if limit is not None or page_size is None:
+            page_size = min(limit or self.config.default_limit, self.config.max_limit)
 
-        if not (items := list(await self.db_session.scalars(statement))):
+        items = list(await self.db_session.scalars(statement.limit(page_size + 1)))
+        if len(items) <= page_size:
             return items, None
 
-        cursor = Cursor()
-        for col in statement._order_by_clauses:
-            if isinstance(col, UnaryExpression):  # UGLY
-                direction = EnumDirection.ASC if col.modifier.__name__ == 'asc_op' else EnumDirection.DESC  # type: ignore
-                cursor.values.append(CursorValue(col.element.name, direction, getattr(items[-1], col.element.name)))  # type: ignore
-            else:
-                # Plain column without explicit ordering
-                cursor.values.append(CursorValue(col.name, EnumDirection.ASC, getattr(items[-1], col.name)))  # type: ignore
-
-        return items, cursor
-
-    async def ilist(self, statement: Select[tuple[T]], cursor: Cursor | str | None = None) -> AsyncIterable[T]:
-        while True:
-            items, cursor = await self.list_cursor(statement, cursor)
-            if not items:
-                return
-            for item in items:
-                yield item
-
-    async def ibatch(self, statement: Select[tuple[T]], cursor: Cursor | str | None = None) -> AsyncIterable[list[T]]:
-        while True:
-            items, cursor = await self.list_cursor(statement, cursor)
-            if not items:
-                return
-            yield items
+        del items[page_size:]
+        return items, keyset.make_cursor(items[-1])
+
+    async def ilist(
+        self, statement: Select[tuple[T]], cursor: Cursor | str | None = None, *, prefetch: int = 0
+    ) -> AsyncIterable[T]:
+        async with aclosing(self.ibatch(statement, cursor, prefetch=prefetch)) as batches:
+            async for items in batches:
+                for item in items:
+                    yield item
+
+    async def ibatch(
+        self, statement: Select[tuple[T]], cursor: Cursor | str | None = None, *, prefetch: int = 0
+    ) -> AsyncIterable[list[T]]:
+        """
+        Итерируется по страницам keyset-пагинации.
+        prefetch > 0 - сколько следующих страниц можно загрузить заранее, пока обрабатывается текущая.
+        При prefetch сессию нельзя использовать, пока идет итерация.
+        """
+
+        if prefetch <= 0:
+            while True:
+                items, cursor = await self.list_cursor(statement, cursor)
+                if items:
+                    yield items
+                if cursor is None:
+                    return
+
+        pages = asyncio.Queue[list[T] | BaseException | None]()
+        free_slots = asyncio.Semaphore(prefetch)
+        stop = asyncio.Event()
+        producer = asyncio.create_task(self._produce_pages(statement, cursor, pages, free_slots, stop))
+
+        try:
+            while (items := await pages.get()) is not None:
+                if isinstance(items, BaseException):
+                    raise items
+                # Слот освобождается до yield: следующая страница грузится, пока обрабатывается эта
+                free_slots.release()
+                yield items
+        finally:
+            # Не отменяем запрос на лету - это ломает транзакцию сессии, дожидаемся текущей страницы
+            stop.set()
+            free_slots.release()
+            await producer
+
+    async def _produce_pages(
+        self,
+        statement: Select[tuple[T]],
+        cursor: Cursor | str | None,
+        pages: asyncio.Queue[list[T] | BaseException | None],
+        free_slots: asyncio.Semaphore,
+        stop: asyncio.Event,
+    ) -> None:
+        try:
+            while True:
+                await free_slots.acquire()
+                if stop.is_set():
+                    return
+                items, cursor = await self.list_cursor(statement, cursor)
+                if items:
+                    pages.put_nowait(items)
+                if cursor is None:
+                    break
+        except Exception as exc:
+            pages.put_nowait(exc)
+        else:
+            pages.put_nowait(None)
 
     async def list_full(self, statement: Select[tuple[T]]) -> list[T]:
         return list(await self.db_session.scalars(statement))
 
+    async def stream(self, statement: Select[tuple[T]], fetch_size: int | None = None) -> AsyncScalarResult[T]:
+        """Серверный курсор: в памяти одновременно не больше fetch_size сущностей"""
+
+        return await self.db_session.stream_scalars(
+            statement.execution_options(yield_per=fetch_size or self.config.default_fetch_size)
+        )
+
     async def load_or_error(self, *pkey: Any) -> T:
         if entity := await self.load(*pkey):
             return entity
         raise NotFoundError
 
+    async def load_many_or_error(self, *pkeys: Any) -> list[T]:
+        entities = await self.load_many(*pkeys)
+        if missing := [pkey for pkey, entity in zip(pkeys, entities) if entity is None]:
+            raise NotFoundError(details={'missing': missing})
+        return entities  # type: ignore
+
     async def load_by_or_error(self, **filters) -> T:
         if entity := await self.load_by(**filters):
             return entity
         raise NotFoundError
+
+    async def compare_and_swap(
+        self,
+        *pkey: Any,
+        expected_lsn: int | None,
+        values: Mapping[str, Any],
+        where: Sequence[ColumnElement[bool]] = (),
+    ) -> T | None:
+        """
+        UPDATE ... WHERE pk = :pk AND lsn = :expected_lsn RETURNING * без предварительной блокировки.
+        expected_lsn=None - строка вставлена до появления умолчания lsn и ни разу не изменялась.
+        lsn и остальные onupdate-колонки обновляются тем же запросом, сущность в сессии перечитывается.
+        None - строки нет (учитывая where) или строку уже изменили, различить можно повторным чтением.
+        """
+
+        entity_cls = self.config.entity_cls
+        primary_key = self.config.primary_key
+        if len(pkey) != len(primary_key):
+            raise ValueError
+
+        statement = (
+            update(entity_cls)
+            .where(*(attr == value for attr, value in zip(primary_key, pkey)), *where)
+            .where(entity_cls.lsn == expected_lsn)  # type: ignore
+            .values(values)
+            .returning(entity_cls)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        return await self.db_session.scalar(statement)
+
+    async def insert_many(self, rows: Iterable[T | Mapping[str, Any]], *, returning: bool = True) -> list[T]:
+        """
+        Вставляет сущности или словари многострочными INSERT пачками по лимиту параметров драйвера.
+        Python-умолчания (uuid7) подставляются при вставке, серверные (serial, created_at) приходят из RETURNING.
+        Возвращает новые сущности в порядке rows, переданные сущности в сессию не добавляются.
+        """
+
+        dialect = get_dialect(self.db_session)
+        return await self._execute_insert(dialect_insert(dialect, self.config.entity_cls), rows, returning=returning)
+
+    async def upsert_many(
+        self,
+        rows: Iterable[T | Mapping[str, Any]],
+        *,
+        index_elements: Sequence[str] | None = None,
+        update_fields: Sequence[str] | None = None,
+        returning: bool = True,
+    ) -> list[T]:
+        """
+        INSERT ... ON CONFLICT (index_elements) DO UPDATE.
+        index_elements по умолчанию - первичный ключ,
+        update_fields - поля, переданные во всех строках, кроме index_elements.
+        Пустой update_fields - DO NOTHING, тогда RETURNING вернет только вставленные строки.
+        """
+
+        dialect = get_dialect(self.db_session)
+        if not supports_on_conflict(dialect):
+            raise NotImplementedError(f'ON CONFLICT is not supported by {dialect.name}')
+
+        rows = [self._to_mapping(row) for row in rows]
+        if not rows:
+            return []
+
+        if index_elements is None:
+            index_elements = [attr.key for attr in self.config.primary_key]
+        if update_fields is None:
+            update_fields = [key for key in rows[0] if key not in index_elements and all(key in row for row in rows)]
+
+        statement = dialect_insert(dialect, self.config.entity_cls)
+        if not update_fields:
+            statement = statement.on_conflict_do_nothing(index_elements=index_elements)  # type: ignore
+        else:
+            set_ = {field: statement.excluded[field] for field in update_fields}  # type: ignore
+            # Колонки с onupdate (lsn, updated_at) обновляем так же, как при обычном UPDATE
+            for column in self.config.entity_cls.__table__.columns:  # type: ignore
+                if column.onupdate is not None and column.onupdate.is_clause_element and column.key not in set_:
+                    set_[column.key] = column.onupdate.arg
+            statement = statement.on_conflict_do_update(index_elements=index_elements, set_=set_)  # type: ignore
+
+        statement = statement.execution_options(populate_existing=True)
+        return await self._execute_insert(statement, rows, returning=returning)
+
+    async def copy_many(self, rows: Iterable[T | Mapping[str, Any]]) -> int:
+        """
+        Вставка через COPY на asyncpg, без RETURNING и без прохода через ORM.
+        Поля берутся из первой строки, Python-умолчания остальных колонок вычисляются здесь,
+        серверные умолчания применяет БД. Другие драйверы - insert_many без RETURNING.
+        """
+
+        dialect = get_dialect(self.db_session)
+        mappings = map(self._to_mapping, rows)
+        if (first_row := next(mappings, None)) is None:
+            return 0
+
+        if not supports_copy(dialect):
+            count = 0
+            for chunk in batched(chain([first_row], mappings), self._get_insert_chunk_size()):
+                await self.insert_many(chunk, returning=False)
+                count += len(chunk)
+            return count
+
+        table = self.config.entity_cls.__table__  # type: ignore
+        columns = [
+            column
+            for column in table.columns
+            if column.key in first_row or (column.default is not None and not column.default.is_clause_element)
+        ]
+        processors = [column.type.dialect_impl(dialect).bind_processor(dialect) for column in columns]
+
+        count = 0
+
+        def iter_records(mappings: Iterator[dict[str, Any]]) -> Iterator[tuple]:
+            nonlocal count
+            for row in mappings:
+                count += 1
+                record = []
+                for column, processor in zip(columns, processors):
+                    if column.key in row:
+                        value = row[column.key]
+                    elif column.default.is_callable:
+                        value = column.default.arg(None)
+                    else:
+                        value = column.default.arg
+                    record.append(processor(value) if processor else value)
+                yield tuple(record)
+
+        await self.db_session.flush()
+        connection = await self.db_session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(  # type: ignore
+            table.name,
+            schema_name=table.schema,
+            columns=[column.name for column in columns],
+            records=iter_records(chain([first_row], mappings)),
+        )
+        return count
+
+    async def _execute_insert(
+        self, statement: Insert, rows: Iterable[T | Mapping[str, Any]], *, returning: bool
+    ) -> list[T]:
+        if returning:
+            statement = statement.returning(self.config.entity_cls, sort_by_parameter_order=True)
+
+        entities = list[T]()
+        for chunk in batched(map(self._to_mapping, rows), self._get_insert_chunk_size()):
+            result = await self.db_session.execute(statement, list(chunk))
+            if returning:
+                entities.extend(result.scalars())
+        return entities
+
+    def _get_insert_chunk_size(self) -> int:
+        columns_count = len(self.config.entity_cls.__table__.columns)  # type: ignore
+        return max(1, get_max_bind_params(get_dialect(self.db_session)) // columns_count)
+
+    @staticmethod
+    def _to_mapping(row: T | Mapping[str, Any]) -> dict[str, Any]:
+        if isinstance(row, Mapping):
+            return dict(row)
+        state = inspect(row)
+        return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import bindparam
+from sqlalchemy.exc import ArgumentError
+
+PARAM_PREFIX = 'f_'
+
+_PARAM = ':param'
+
+
+def get_filters_shape(filters: dict[str, Any]) -> tuple | None:
+    """
+    Форма фильтров для ключа кэша: имена фильтров и вид значения.
+    bool и None входят в форму как есть - от них обычно зависит структура запроса,
+    остальные скаляры становятся параметрами. Массивы не кэшируются.
+    """
+
+    shape = list[tuple[str, Any]]()
+    for name in sorted(filters):
+        value = filters[name]
+        if value is None or isinstance(value, bool):
+            shape.append((name, value))
+        elif isinstance(value, list | tuple | set | frozenset | dict):
+            return None
+        else:
+            shape.append((name, _PARAM))
+    return tuple(shape)
+
+
+def make_filters_placeholders(filters: dict[str, Any]) -> dict[str, Any]:
+    return {
+        name: value if value is None or isinstance(value, bool) else bindparam(PARAM_PREFIX + name)
+        for name, value in filters.items()
+    }
+
+
+def make_filters_params(filters: dict[str, Any]) -> dict[str, Any]:
+    return {
+        PARAM_PREFIX + name: value
+        for name, value in filters.items()
+        if value is not None and not isinstance(value, bool)
+    }
+
+
+@dataclass(slots=True)
+class StatementCache[V]:
+    """LRU-кэш шаблонов запросов, где вместо значений фильтров bindparam"""
+
+    max_size: int = 128
+    templates: OrderedDict[Hashable, V | None] = field(default_factory=OrderedDict)
+    hits: int = 0
+    misses: int = 0
+
+    def get(self, key: Hashable, build: Callable[[], V]) -> V | None:
+        """Возвращает шаблон по ключу, None - форма не поддерживает шаблоны"""
+
+        try:
+            template = self.templates[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            self.templates.move_to_end(key)
+            return template
+
+        self.misses += 1
+        try:
+            template = build()
+        except (TypeError, ArgumentError):
+            # Обработчик фильтра работает со значением напрямую и не принимает bindparam
+            template = None
+
+        self.templates[key] = template
+        if len(self.templates) > self.max_size:
+            self.templates.popitem(last=False)
+        return template
+
+    def clear(self) -> None:
+        self.templates.clear()
+        self.hits = self.misses = 0
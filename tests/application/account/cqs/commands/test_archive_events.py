@@ -0,0 +1,39 @@
+import datetime as dt
+
+from sqlalchemy import select, update
+
+from application.account.cqs.commands import replay
+from application.account.cqs.commands.archive_events import handle as archive
+from domain.account.archive import AccountEventArchive
+from domain.account.events import AccountEvent
+from domain.account.model import Account, EnumAccountBalanceMode
+from domain.vo.money import Money
+
+
+async def test_archive_events(dataset, session_maker):
+    """Тест переноса: несвернутые события остаются, воспроизведение читает архив и сходится с балансом счета"""
+
+    user = await dataset.user()
+    account = await dataset.account(user=user, balance=Money(100))
+    ledger = await dataset.account(user=user, balance=Money(5), balance_mode=EnumAccountBalanceMode.LEDGER)
+    async with session_maker() as db_session:
+        await db_session.execute(
+            update(AccountEvent)
+            .where(AccountEvent.account_id.in_([account.id, ledger.id]))
+            .values(created_at=dt.datetime(2020, 1, 1, tzinfo=dt.UTC))
+        )
+        await db_session.execute(update(AccountEvent).where(AccountEvent.account_id == ledger.id).values(pending=True))
+        await db_session.commit()
+
+    async with session_maker() as db_session:
+        await archive(db_session=db_session)
+
+    async with session_maker() as db_session:
+        statement = select(AccountEventArchive.account_id).where(AccountEventArchive.user_id == user.id)
+        assert list(await db_session.scalars(statement)) == [account.id]
+        hot = select(AccountEvent.account_id).where(AccountEvent.user_id == user.id)
+        assert list(await db_session.scalars(hot)) == [ledger.id]
+
+        state = await replay.handle(db_session=db_session, account_id=account.id, snapshot_every=None)
+        loaded = await db_session.scalar(select(Account).where(Account.id == account.id))
+        assert (state.balance, state.currency) == (loaded.balance, loaded.currency)
@@ -0,0 +1,36 @@
+from sqlalchemy import select
+
+from application.account.cqs.commands.migrate_event_payloads import handle as migrate
+from domain.account.events import AccountEvent, EnumAccountEvent, TransferPayload
+from domain.vo.money import Money, TransferRate
+
+
+async def test_migrate_event_payloads(dataset, session_maker):
+    """Тест переноса: события в JSON читаются до и после переноса одинаково, после переноса data пустая"""
+
+    user = await dataset.user()
+    src = await dataset.account(user=user, balance=Money(100))
+    dst = await dataset.account(user=user, balance=Money(0))
+    data = {'amount': '12.5', 'src_account_id': str(src.id), 'dst_account_id': str(dst.id), 'transfer_rate': '2'}
+    events = [
+        AccountEvent(user_id=user.id, account_id=src.id, event=EnumAccountEvent.TRANSFER_MONEY_SRC, data=data),
+        AccountEvent(user_id=user.id, account_id=dst.id, event=EnumAccountEvent.TRANSFER_MONEY_DST, data=data),
+    ]
+    async with session_maker() as db_session:
+        db_session.add_all(events)
+        await db_session.commit()
+
+    expected = TransferPayload(
+        amount=Money('12.5'), src_account_id=src.id, dst_account_id=dst.id, transfer_rate=TransferRate(2)
+    )
+    assert [event.payload for event in events] == [expected, expected]
+
+    async with session_maker() as db_session:
+        assert await migrate(db_session=db_session, batch_size=1) >= 2
+        assert await migrate(db_session=db_session) == 0
+
+    async with session_maker() as db_session:
+        statement = select(AccountEvent).where(AccountEvent.serial.in_([event.serial for event in events]))
+        migrated = list(await db_session.scalars(statement.order_by(AccountEvent.serial)))
+    assert [(event.data, event.payload) for event in migrated] == [(None, expected), (None, expected)]
+    assert (migrated[0].counterparty_id, migrated[1].counterparty_id) == (dst.id, src.id)
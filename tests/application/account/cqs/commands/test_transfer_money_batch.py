@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import func, select
+
+from application.account.cqs.commands.transfer_money_batch import TransferMoneyBatchCommand, TransferMoneyItem, handle
+from application.account.errors import AccountNotEnoughBalanceError
+from domain.account.events import AccountEvent, EnumAccountEvent
+from domain.account.model import Account
+from domain.vo.money import Money
+
+
+async def _accounts(dataset, *balances: str) -> list[Account]:
+    user = await dataset.user()
+    return [await dataset.account(user=user, balance=Money(balance)) for balance in balances]
+
+
+async def _balances(session_maker, accounts: list[Account]) -> list[Money]:
+    async with session_maker() as db_session:
+        statement = select(Account).where(Account.id.in_([account.id for account in accounts]))
+        loaded = {account.id: account for account in await db_session.scalars(statement)}
+    return [loaded[account.id].balance for account in accounts]
+
+
+async def test_transfer_money_batch(dataset, session_maker):
+    """Тест пачки переводов: следующий перевод видит балансы после предыдущих, события всех пар записаны"""
+
+    a, b, c = await _accounts(dataset, '100', '0', '0')
+    command = TransferMoneyBatchCommand(
+        transfers=[
+            TransferMoneyItem(src_account_id=a.id, dst_account_id=b.id, amount=Money(60)),
+            TransferMoneyItem(src_account_id=b.id, dst_account_id=c.id, amount=Money(50), transfer_rate=Money(2)),
+            TransferMoneyItem(src_account_id=c.id, dst_account_id=a.id, amount=Money(100)),
+        ]
+    )
+
+    async with session_maker() as db_session:
+        report = await handle(db_session=db_session, command=command)
+
+    assert report.applied == [0, 1, 2]
+    assert await _balances(session_maker, [a, b, c]) == [Money(140), Money(10), Money(0)]
+    async with session_maker() as db_session:
+        events = select(func.count()).where(
+            AccountEvent.account_id.in_([a.id, b.id, c.id]), AccountEvent.event != EnumAccountEvent.CREATE
+        )
+        assert await db_session.scalar(events) == 6
+
+
+async def test_transfer_money_batch_failed(dataset, session_maker):
+    """Тест ошибки в пачке: без skip_failed откатывается вся пачка"""
+
+    a, b = await _accounts(dataset, '100', '0')
+    command = TransferMoneyBatchCommand(
+        transfers=[
+            TransferMoneyItem(src_account_id=a.id, dst_account_id=b.id, amount=Money(60)),
+            TransferMoneyItem(src_account_id=a.id, dst_account_id=b.id, amount=Money(60)),
+        ]
+    )
+
+    async with session_maker() as db_session:
+        with pytest.raises(AccountNotEnoughBalanceError):
+            await handle(db_session=db_session, command=command)
+
+    assert await _balances(session_maker, [a, b]) == [Money(100), Money(0)]
+
+
+async def test_transfer_money_batch_skip_failed(dataset, session_maker, uuid7):
+    """Тест skip_failed: ошибочные переводы в отчете, остальные применены"""
+
+    a, b = await _accounts(dataset, '100', '0')
+    command = TransferMoneyBatchCommand(
+        transfers=[
+            TransferMoneyItem(src_account_id=a.id, dst_account_id=b.id, amount=Money(60)),
+            TransferMoneyItem(src_account_id=a.id, dst_account_id=b.id, amount=Money(60)),
+            TransferMoneyItem(src_account_id=a.id, dst_account_id=uuid7(), amount=Money(10)),
+            TransferMoneyItem(src_account_id=a.id, dst_account_id=b.id, amount=Money(40)),
+        ],
+        skip_failed=True,
+    )
+
+    async with session_maker() as db_session:
+        report = await handle(db_session=db_session, command=command)
+
+    assert report.applied == [0, 3]
+    assert [(failure.index, failure.code) for failure in report.failed] == [
+        (1, 'ACCOUNT_NOT_ENOUGH_BALANCE_ERROR'),
+        (2, 'ACCOUNT_NOT_FOUND_ERROR'),
+    ]
+    assert await _balances(session_maker, [a, b]) == [Money(0), Money(100)]
@@ -0,0 +1,35 @@
+import pytest
+
+from application.account.cqs.commands.update import UpdateAccountTitleCommand, handle_cas
+from application.account.errors import AccountNotFoundError, AccountVersionConflictError
+
+
+async def test_handle_cas_new_account(dataset, session_maker):
+    """Тест CAS сразу после создания: lsn еще не присвоен, но счет находится и изменяется"""
+
+    account = await dataset.account()
+
+    async with session_maker() as db_session:
+        updated_account = await handle_cas(
+            db_session=db_session,
+            account_id=account.id,
+            commands=[UpdateAccountTitleCommand(title='new')],
+        )
+
+    assert updated_account.title == 'new'
+    assert updated_account.lsn is not None
+    assert (await dataset.load_account(account_id=account.id)).title == 'new'
+
+
+async def test_handle_cas_errors(dataset, session_maker, uuid7):
+    """Тест CAS: устаревшая версия - конфликт, отсутствующий счет - не найден"""
+
+    account = await dataset.account()
+    commands = [UpdateAccountTitleCommand(title='new')]
+
+    async with session_maker() as db_session:
+        with pytest.raises(AccountVersionConflictError):
+            await handle_cas(db_session=db_session, account_id=account.id, commands=commands, expected_lsn=-1)
+
+        with pytest.raises(AccountNotFoundError):
+            await handle_cas(db_session=db_session, account_id=uuid7(), commands=commands)
@@ -0,0 +1,66 @@
+import datetime as dt
+
+from sqlalchemy import func, select
+
+from application.account.cqs.commands.archive_events import handle as archive
+from application.account.cqs.queries.list_events import handle as list_events
+from application.account.storage.archive import ARCHIVE_RETENTION, may_touch_archive
+from domain.account.archive import AccountEventArchive
+from domain.account.events import AccountEvent, BalanceAdjustmentPayload, EnumAccountEvent
+from domain.vo.money import Money
+from shared.utils import now
+
+
+async def test_list_events(dataset, session_maker):
+    """Тест выдачи: горячие и архивные события одной лентой по created_at, фильтры по дате и типу события"""
+
+    user = await dataset.user()
+    account = await dataset.account(user=user)
+    old = dt.datetime(2020, 1, 1, tzinfo=dt.UTC)
+    async with session_maker() as db_session:
+        for day in range(3):
+            payload = BalanceAdjustmentPayload(old_balance=Money(day), new_balance=Money(day + 1))
+            db_session.add(
+                AccountEvent.from_payload(
+                    account=account,
+                    event=EnumAccountEvent.BALANCE_ADJUSTMENT,
+                    payload=payload,
+                    created_at=old + dt.timedelta(days=day),
+                )
+            )
+        await db_session.commit()
+
+    async with session_maker() as db_session:
+        await archive(db_session=db_session, batch_size=2)
+        archived = select(func.count()).where(AccountEventArchive.account_id == account.id)
+        assert await db_session.scalar(archived) == 3
+
+    async with session_maker() as db_session:
+        events, _ = await list_events(db_session=db_session, account_id=account.id, cur_user=user)
+        # CREATE горячий, корректировки из архива
+        assert [event.event for event in events] == [
+            EnumAccountEvent.CREATE,
+            *[EnumAccountEvent.BALANCE_ADJUSTMENT] * 3,
+        ]
+        assert [event.payload.new_balance for event in events[1:]] == [Money(3), Money(2), Money(1)]
+
+        page, cursor = await list_events(
+            db_session=db_session,
+            account_id=account.id,
+            event=EnumAccountEvent.BALANCE_ADJUSTMENT,
+            max_created_at=old + dt.timedelta(days=2),
+        )
+        assert [event.serial for event in page] == [event.serial for event in events[2:]]
+
+        month = now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        recent, _ = await list_events(db_session=db_session, account_id=account.id, min_created_at=month)
+        assert [event.serial for event in recent] == [events[0].serial]
+
+
+def test_may_touch_archive():
+    """В архиве только события старше ARCHIVE_RETENTION: запрос за текущий месяц его не читает"""
+
+    month = now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    assert not may_touch_archive(month)
+    assert may_touch_archive(now() - ARCHIVE_RETENTION - dt.timedelta(days=1))
+    assert may_touch_archive(None)
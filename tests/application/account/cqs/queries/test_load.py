@@ -1,4 +1,6 @@
-from application.account.cqs.queries.load import LoadByAccountIDQuery, LoadByAccountNameQuery
+import asyncio
+
+from application.account.cqs.queries.load import LoadByAccountIDQuery, LoadByAccountNameQuery, load_account
 from application.account.cqs.queries.load import auto_handle as load_handle
 from application.account.schemas.model import AccountSchema
 
@@ -57,3 +59,23 @@ async def test_load_absent_account(uuid, uuid7, session_maker):
 
         loaded = await load_handle(db_session=db_session, account_id=account_id)
         assert loaded is None
+
+
+async def test_load_account_batch(dataset, session_maker, uuid7):
+    """Тест объединения конкурентных загрузок аккаунтов в один запрос"""
+
+    accounts = [await dataset.account() for _ in range(3)]
+    account_ids = [account.id for account in accounts] + [uuid7()]
+
+    @load_account(batch=True, raise_error=False)
+    async def handle(*, account, **_):
+        return account
+
+    async with session_maker() as db_session:
+        loaded = await asyncio.gather(
+            *(handle(db_session=db_session, account_id=account_id) for account_id in account_ids)
+        )
+        assert [account and account.id for account in loaded] == [*account_ids[:-1], None]
+
+        loaded_again = await handle(db_session=db_session, account_id=accounts[0].id)
+        assert loaded_again is loaded[0]
@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import select
+
+from application.account.cqs.commands.compact_ledger import handle as compact
+from application.account.cqs.commands.transfer_money_batch import TransferMoneyBatchCommand, TransferMoneyItem, handle
+from application.account.errors import AccountNotEnoughBalanceError
+from application.account.schemas.model import AccountSchema
+from application.account.storage.ledger import load_ledger_account
+from domain.account.events import AccountEvent
+from domain.account.model import Account, EnumAccountBalanceMode
+from domain.vo.money import Money
+
+
+async def _load(session_maker, account: Account) -> Account:
+    async with session_maker() as db_session:
+        return await db_session.scalar(select(Account).where(Account.id == account.id))
+
+
+async def test_ledger_transfer(dataset, session_maker):
+    """Тест переводов со счетом LEDGER: строка счета не меняется, баланс - снимок плюс несвернутые дельты"""
+
+    user = await dataset.user()
+    wallet = await dataset.account(user=user, balance=Money(100), balance_mode=EnumAccountBalanceMode.LEDGER)
+    card = await dataset.account(user=user, balance=Money(0))
+    command = TransferMoneyBatchCommand(
+        transfers=[
+            TransferMoneyItem(src_account_id=wallet.id, dst_account_id=card.id, amount=Money(70)),
+            TransferMoneyItem(src_account_id=card.id, dst_account_id=wallet.id, amount=Money(20)),
+        ]
+    )
+
+    async with session_maker() as db_session:
+        await handle(db_session=db_session, command=command)
+
+    loaded = await _load(session_maker, wallet)
+    assert (loaded.balance, loaded.pending_balance) == (Money(100), Money(-50))
+    assert AccountSchema.model_validate(loaded).balance == Money(50)
+    assert (await _load(session_maker, card)).balance == Money(50)
+
+    # Проверка баланса учитывает дельты: 60 из 50 не списать
+    command = TransferMoneyBatchCommand(
+        transfers=[TransferMoneyItem(src_account_id=wallet.id, dst_account_id=card.id, amount=Money(60))]
+    )
+    async with session_maker() as db_session:
+        with pytest.raises(AccountNotEnoughBalanceError):
+            await handle(db_session=db_session, command=command)
+
+
+async def test_compact_ledger(dataset, session_maker):
+    """Тест сворачивания: дельты переходят в снимок, итоговый баланс не меняется"""
+
+    user = await dataset.user()
+    wallet = await dataset.account(user=user, balance=Money(100), balance_mode=EnumAccountBalanceMode.LEDGER)
+    card = await dataset.account(user=user, balance=Money(0))
+    command = TransferMoneyBatchCommand(
+        transfers=[
+            TransferMoneyItem(src_account_id=wallet.id, dst_account_id=card.id, amount=Money(amount))
+            for amount in ('10', '20', '30')
+        ]
+    )
+    async with session_maker() as db_session:
+        await handle(db_session=db_session, command=command)
+
+    async with session_maker() as db_session:
+        assert await compact(db_session=db_session, account_id=wallet.id) == 3
+
+    loaded = await _load(session_maker, wallet)
+    assert (loaded.balance, loaded.pending_balance, loaded.effective_balance) == (Money(40), Money(0), Money(40))
+    async with session_maker() as db_session:
+        pending = select(AccountEvent).where(AccountEvent.account_id == wallet.id, AccountEvent.pending)
+        assert not list(await db_session.scalars(pending))
+
+
+async def test_load_ledger_account_rereads_mode(dataset, session_maker, uuid7):
+    """Тест загрузки под блокировкой журнала: счет, уже переведенный в ROW, возвращается с режимом ROW"""
+
+    account = await dataset.account(balance=Money(10), balance_mode=EnumAccountBalanceMode.ROW)
+
+    async with session_maker() as db_session:
+        loaded = await load_ledger_account(db_session, where=[Account.id == account.id])
+        assert loaded.balance_mode == EnumAccountBalanceMode.ROW
+        assert await load_ledger_account(db_session, where=[Account.id == uuid7()]) is None
@@ -0,0 +1,58 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from application.account.storage.mutations import AccountMutation, mutate_account, render_account_mutation
+from domain.account.events import AccountEvent, BalanceAdjustmentPayload, EnumAccountEvent
+from domain.account.model import Account
+from domain.vo.money import Money
+
+
+def _balance_mutation(balance: Money) -> AccountMutation:
+    return AccountMutation(
+        changed=lambda old: old.balance != balance,
+        values=lambda old: {'balance': balance},
+        event=EnumAccountEvent.BALANCE_ADJUSTMENT,
+        payload=lambda old: BalanceAdjustmentPayload(old_balance=old.balance, new_balance=balance),
+    )
+
+
+def test_render_account_mutation(uuid7):
+    """UPDATE и INSERT события в изменяющих CTE одного запроса, onupdate колонки обновляются"""
+
+    sql = str(
+        render_account_mutation([Account.id == uuid7()], _balance_mutation(Money(5))).compile(
+            dialect=postgresql.dialect()
+        )
+    )
+
+    assert sql.startswith('WITH "old" AS')
+    assert 'FOR UPDATE' in sql
+    assert 'upd AS \n(UPDATE accounts SET' in sql
+    assert 'lsn=next_val()' in sql
+    assert 'ev AS \n(INSERT INTO account_events' in sql
+
+
+async def test_mutate_account(dataset, session_maker, uuid7):
+    """Тест изменения: новое значение и событие, без изменений - счет как есть и без события, нет счета - None"""
+
+    user = await dataset.user()
+    account = await dataset.account(user=user, balance=Money(10))
+
+    async with session_maker() as db_session:
+        updated = await mutate_account(db_session, [Account.id == account.id], _balance_mutation(Money(50)))
+        unchanged = await mutate_account(db_session, [Account.id == account.id], _balance_mutation(Money(50)))
+        missing = await mutate_account(db_session, [Account.id == uuid7()], _balance_mutation(Money(50)))
+        await db_session.commit()
+
+    assert updated.balance == unchanged.balance == Money(50)
+    assert updated.lsn == unchanged.lsn != account.lsn
+    assert missing is None
+
+    async with session_maker() as db_session:
+        statement = select(AccountEvent).where(
+            AccountEvent.account_id == account.id, AccountEvent.event != EnumAccountEvent.CREATE
+        )
+        events = list(await db_session.scalars(statement))
+    assert [event.event for event in events] == [EnumAccountEvent.BALANCE_ADJUSTMENT]
+    assert events[0].payload == BalanceAdjustmentPayload(old_balance=Money(10), new_balance=Money(50))
+    assert events[0].data is None
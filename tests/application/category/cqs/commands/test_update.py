@@ -0,0 +1,50 @@
+import pytest
+
+from application.category.cqs.commands import update_parent
+from application.category.cqs.commands.update import UpdateCategoryTitleCommand
+from application.category.cqs.commands.update import auto_handle as update_handle
+from application.category.cqs.commands.update_parent import UpdateCategoryParentCommand
+from application.category.errors import CategoryNotFoundError
+
+
+async def test_handle_category_update(dataset, session_maker):
+    """Тест изменения категории, загруженной по id"""
+
+    user = await dataset.user()
+    category = await dataset.category(user=user)
+
+    async with session_maker() as db_session:
+        updated_category = await update_handle(
+            db_session=db_session,
+            cur_user=user,
+            category_id=category.id,
+            commands=[UpdateCategoryTitleCommand(title='new')],
+        )
+
+    assert updated_category.id == category.id
+    assert updated_category.title == 'new'
+
+
+async def test_handle_category_update_not_found(dataset, session_maker, uuid7):
+    """Тест изменения отсутствующей или чужой категории: CategoryNotFoundError до вызова обработчика"""
+
+    user = await dataset.user()
+    foreign_category = await dataset.category()
+
+    async with session_maker() as db_session:
+        for category_id in (uuid7(), foreign_category.id):
+            with pytest.raises(CategoryNotFoundError):
+                await update_handle(
+                    db_session=db_session,
+                    cur_user=user,
+                    category_id=category_id,
+                    commands=[UpdateCategoryTitleCommand(title='new')],
+                )
+
+        with pytest.raises(CategoryNotFoundError):
+            await update_parent.handle(
+                db_session=db_session,
+                cur_user=user,
+                category_id=uuid7(),
+                command=UpdateCategoryParentCommand(parent_id=uuid7()),
+            )
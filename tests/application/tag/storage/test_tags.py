@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import func, select
+
+from application.tag.storage.tags import intern_tags, render_tags_filter, sync_tags
+from domain.account.model import Account
+from domain.tag.model import AccountTag, Tag
+
+
+async def test_intern_tags(session_maker, uuid):
+    """Тест: повторное добавление тега возвращает тот же id"""
+
+    name = uuid()
+    async with session_maker() as db_session:
+        first = await intern_tags(db_session, [name])
+        second = await intern_tags(db_session, [name, uuid()])
+        await db_session.commit()
+
+        assert second[name] == first[name]
+        assert await db_session.scalar(select(func.count()).select_from(Tag).where(Tag.name == name)) == 1
+
+
+async def test_sync_tags(session_maker, dataset, uuid):
+    """Тест: синхронизация заменяет связи, пустой список удаляет их"""
+
+    tag1, tag2, tag3 = uuid(), uuid(), uuid()
+    account = await dataset.account(tags=[tag1, tag2])
+
+    async def linked() -> set[str]:
+        async with session_maker() as db_session:
+            statement = select(Tag.name).join(AccountTag, AccountTag.tag_id == Tag.id)
+            return set(await db_session.scalars(statement.where(AccountTag.entity_id == account.id)))
+
+    async with session_maker() as db_session:
+        await sync_tags(db_session, AccountTag, {account.id: [tag1, tag2]})
+        await db_session.commit()
+    assert await linked() == {tag1, tag2}
+
+    async with session_maker() as db_session:
+        await sync_tags(db_session, AccountTag, {account.id: [tag2, tag3, tag3]})
+        await db_session.commit()
+    assert await linked() == {tag2, tag3}
+
+    async with session_maker() as db_session:
+        await sync_tags(db_session, AccountTag, {account.id: []})
+        await db_session.commit()
+    assert await linked() == set()
+
+
+@pytest.mark.parametrize(
+    ('tags', 'filter_type', 'expected'),
+    [
+        (['b'], 'HAVE_ANY', [0, 1]),
+        (['a', 'c'], 'HAVE_ANY', [0, 2]),
+        ([], 'HAVE_ANY', []),
+        (['a', 'b'], 'HAVE_ALL', [0]),
+        (['b'], 'HAVE_ALL', [0, 1]),
+        ([], 'HAVE_ALL', [0, 1, 2, 3]),
+        (['b'], 'HAVE_NOTHING', [2, 3]),
+        ([], 'HAVE_NOTHING', [0, 1, 2, 3]),
+        (['b', 'a'], 'HAVE_SAME', [0]),
+        (['b'], 'HAVE_SAME', [1]),
+        ([], 'HAVE_EXACTLY', [3]),
+    ],
+)
+async def test_render_tags_filter(session_maker, dataset, uuid, tags, filter_type, expected):
+    """Тест фильтров по тегам через связи, имена тегов уникальны для каждого запуска"""
+
+    prefix = uuid()
+    user = await dataset.user()
+    accounts = [await dataset.account(user=user, tags=[]) for _ in range(4)]
+    account_tags = [['a', 'b'], ['b'], ['c'], []]
+
+    async with session_maker() as db_session:
+        await sync_tags(
+            db_session,
+            AccountTag,
+            {account.id: [prefix + tag for tag in tags] for account, tags in zip(accounts, account_tags)},
+        )
+        await db_session.commit()
+
+        statement = select(Account.id).where(
+            Account.user_id == user.id,
+            render_tags_filter(AccountTag, Account.id, [prefix + tag for tag in tags], filter_type),
+        )
+        found = set(await db_session.scalars(statement))
+
+    assert [i for i, account in enumerate(accounts) if account.id in found] == expected
@@ -0,0 +1,75 @@
+import io
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from application.transaction.cqs.commands.bulk_import import handle, read_csv
+from domain.category.model import Category
+from domain.tag.model import TransactionTag
+from domain.transaction.model import Transaction
+from domain.transaction.rollup import TransactionDailyRollup
+
+CSV = """date,type,amount,account_code,category_code,description,tags
+2024-01-01,EXPENSE,10.5,{account},food,coffee,morning;work
+2024-01-01,EXPENSE,10.5,{account},food,coffee,
+2024-01-02,EXPENSE,abc,{account},food,,
+2024-01-03,INCOME,100,missing,food,,
+2024-01-04,EXPENSE,7,{account},food,,"[""lunch""]"
+"""
+
+
+async def _seed(session_maker, dataset):
+    user = await dataset.user()
+    account = await dataset.account(user=user)
+    async with session_maker() as db_session:
+        db_session.add(Category(code='food', title='Food', user_id=user.id))
+        await db_session.commit()
+    return user, account
+
+
+async def _import(session_maker, user, account, **kwargs):
+    async with session_maker() as db_session:
+        records = read_csv(io.StringIO(CSV.format(account=account.code)))
+        return await handle(cur_user=user, db_session=db_session, records=records, **kwargs)
+
+
+async def test_bulk_import(session_maker, dataset):
+    """Тест импорта: ошибочные строки в отчете, одинаковые покупки за день не схлопываются, суммы и теги"""
+
+    user, account = await _seed(session_maker, dataset)
+    progress = []
+
+    report = await _import(session_maker, user, account, batch_size=2, progress=lambda r: progress.append(r.processed))
+
+    assert (report.processed, report.imported, report.duplicates) == (5, 3, 0)
+    assert [(error.row, error.field) for error in report.errors] == [(3, 'amount'), (4, 'account_code')]
+    assert progress == [2, 4, 5]
+
+    async with session_maker() as db_session:
+        amount = select(func.sum(Transaction.amount)).where(Transaction.user_id == user.id)
+        rollup_amount = select(func.sum(TransactionDailyRollup.amount)).where(TransactionDailyRollup.user_id == user.id)
+        links = (
+            select(func.count())
+            .select_from(TransactionTag)
+            .join(Transaction, Transaction.id == TransactionTag.entity_id)
+            .where(Transaction.user_id == user.id)
+        )
+        assert await db_session.scalar(amount) == Decimal(28)
+        assert await db_session.scalar(rollup_amount) == Decimal(28)
+        assert await db_session.scalar(links) == 3
+
+
+async def test_bulk_import_again(session_maker, dataset):
+    """Тест повторного импорта той же выписки: все строки - дубли"""
+
+    user, account = await _seed(session_maker, dataset)
+    await _import(session_maker, user, account)
+
+    report = await _import(session_maker, user, account)
+
+    assert (report.imported, report.duplicates) == (0, 3)
+    async with session_maker() as db_session:
+        count = select(func.count()).where(Transaction.user_id == user.id)
+        rollup_count = select(func.sum(TransactionDailyRollup.count)).where(TransactionDailyRollup.user_id == user.id)
+        assert await db_session.scalar(count) == 3
+        assert await db_session.scalar(rollup_count) == 3
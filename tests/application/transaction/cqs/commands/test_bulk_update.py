@@ -0,0 +1,169 @@
+import datetime as dt
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from application.transaction.cqs.commands import bulk_delete, bulk_update, delete, update
+from application.transaction.cqs.commands.create import CreateTransactionCommand
+from application.transaction.cqs.commands.create import handle as create
+from application.transaction.cqs.commands.rebuild_rollup import handle as rebuild_rollup
+from application.transaction.cqs.commands.update import (
+    UpdateTransactionAmountCommand,
+    UpdateTransactionCategoryCommand,
+    UpdateTransactionTagsCommand,
+)
+from domain.category.model import Category
+from domain.tag.model import Tag, TransactionTag
+from domain.transaction.model import EnumTransactionType, Transaction
+from domain.transaction.rollup import TransactionDailyRollup
+
+
+async def _seed(session_maker, dataset):
+    """10 расходов за 3 дня в категории food, нечетные с тегом coffee"""
+
+    user = await dataset.user()
+    account = await dataset.account(user=user)
+    async with session_maker() as db_session:
+        food = Category(code='food', title='Food', user_id=user.id)
+        cafe = Category(code='cafe', title='Cafe', user_id=user.id)
+        db_session.add_all([food, cafe])
+        await db_session.commit()
+
+    for i in range(10):
+        command = CreateTransactionCommand(
+            date=dt.date(2024, 1, 1 + i % 3),
+            description=None,
+            tags=['coffee'] if i % 2 else [],
+            type=EnumTransactionType.EXPENSE,
+            user_id=user.id,
+            account_id=account.id,
+            category_id=food.id,
+            amount=Decimal(i + 1),
+        )
+        async with session_maker() as db_session:
+            await create(command=command, db_session=db_session)
+    return user, food, cafe
+
+
+async def _assert_rollup_consistent(session_maker, user):
+    """Дневные суммы после дельт совпадают с пересчитанными с нуля"""
+
+    statement = select(
+        TransactionDailyRollup.date,
+        TransactionDailyRollup.category_id,
+        TransactionDailyRollup.amount,
+        TransactionDailyRollup.count,
+    ).where(TransactionDailyRollup.user_id == user.id, TransactionDailyRollup.count != 0)
+
+    async with session_maker() as db_session:
+        incremental = set((await db_session.execute(statement)).tuples())
+        await rebuild_rollup(db_session=db_session, user_id=user.id)
+        assert incremental == set((await db_session.execute(statement)).tuples())
+
+
+async def test_bulk_update(session_maker, dataset):
+    """Тест изменения по фильтру тегов: категория, сумма и теги меняются одним запросом, суммы согласованы"""
+
+    user, food, cafe = await _seed(session_maker, dataset)
+    async with session_maker() as db_session:
+        statement = select(Transaction.id, Transaction.lsn).where(Transaction.user_id == user.id)
+        lsn_before = dict((await db_session.execute(statement)).tuples().all())
+
+    async with session_maker() as db_session:
+        ids = await bulk_update.handle(
+            cur_user=user,
+            db_session=db_session,
+            commands=[
+                UpdateTransactionCategoryCommand(category_id=cafe.id),
+                UpdateTransactionAmountCommand(amount=Decimal(3)),
+                UpdateTransactionTagsCommand(tags=['cafe']),
+            ],
+            tags=['coffee'],
+            filter_type='HAVE_ANY',
+        )
+
+    assert len(ids) == 5
+    async with session_maker() as db_session:
+        updated = list(await db_session.scalars(select(Transaction).where(Transaction.id.in_(ids))))
+        assert {(t.category_id, t.amount, tuple(t.tags)) for t in updated} == {(cafe.id, Decimal(3), ('cafe',))}
+        assert all(t.lsn > lsn_before[t.id] for t in updated)
+
+        tag_names = await db_session.scalars(
+            select(Tag.name)
+            .join(TransactionTag, TransactionTag.tag_id == Tag.id)
+            .where(TransactionTag.entity_id.in_(ids))
+        )
+        assert set(tag_names) == {'cafe'}
+
+    await _assert_rollup_consistent(session_maker, user)
+
+
+async def test_bulk_update_no_match(session_maker, dataset):
+    user, food, cafe = await _seed(session_maker, dataset)
+
+    async with session_maker() as db_session:
+        ids = await bulk_update.handle(
+            cur_user=user,
+            db_session=db_session,
+            commands=[UpdateTransactionCategoryCommand(category_id=food.id)],
+            category_id=cafe.id,
+        )
+
+    assert ids == []
+    await _assert_rollup_consistent(session_maker, user)
+
+
+async def test_bulk_delete(session_maker, dataset):
+    """Тест удаления по фильтру: связи тегов и дневные суммы удаленных транзакций убираются"""
+
+    user, food, cafe = await _seed(session_maker, dataset)
+
+    async with session_maker() as db_session:
+        ids = await bulk_delete.handle(
+            cur_user=user, db_session=db_session, min_date=dt.date(2024, 1, 2), max_date=None
+        )
+
+    assert len(ids) == 6
+    async with session_maker() as db_session:
+        assert len(list(await db_session.scalars(select(Transaction.id).where(Transaction.user_id == user.id)))) == 4
+        assert not list(await db_session.scalars(select(TransactionTag).where(TransactionTag.entity_id.in_(ids))))
+
+    await _assert_rollup_consistent(session_maker, user)
+
+
+async def test_update_stale_entity(session_maker, dataset):
+    """Тест изменения по устаревшей сущности: старые значения дневных сумм берутся из БД"""
+
+    user, food, cafe = await _seed(session_maker, dataset)
+    statement = select(Transaction).where(Transaction.user_id == user.id).limit(1)
+    async with session_maker() as db_session:
+        transaction = await db_session.scalar(statement)
+    async with session_maker() as db_session:
+        stale = await db_session.scalar(statement)
+
+    async with session_maker() as db_session:
+        await update.handle(
+            transaction=transaction, db_session=db_session, commands=[UpdateTransactionAmountCommand(amount=Decimal(7))]
+        )
+    async with session_maker() as db_session:
+        await update.handle(
+            transaction=stale,
+            db_session=db_session,
+            commands=[UpdateTransactionCategoryCommand(category_id=cafe.id)],
+        )
+
+    await _assert_rollup_consistent(session_maker, user)
+
+
+async def test_delete_twice(session_maker, dataset):
+    """Тест повторного удаления: сумма транзакции вычитается один раз"""
+
+    user, food, cafe = await _seed(session_maker, dataset)
+    async with session_maker() as db_session:
+        transaction = await db_session.scalar(select(Transaction).where(Transaction.user_id == user.id).limit(1))
+
+    for _ in range(2):
+        async with session_maker() as db_session:
+            await delete.handle(transaction=transaction, db_session=db_session)
+
+    await _assert_rollup_consistent(session_maker, user)
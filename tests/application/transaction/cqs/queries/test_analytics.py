@@ -0,0 +1,91 @@
+import datetime as dt
+from collections import defaultdict
+from decimal import Decimal
+
+import pytest
+
+from application.transaction.cqs.queries.analytics import handle as analytics
+from domain.transaction.model import EnumTransactionType
+from shared.storage.functions import EnumDateGranularity
+
+DATES = [dt.date(2024, 1, 30), dt.date(2024, 1, 31), dt.date(2024, 2, 1)]
+
+
+async def _seed(dataset):
+    """12 транзакций по 2 счетам и 2 категориям за 3 дня на стыке месяцев, типы чередуются"""
+
+    user = await dataset.user()
+    accounts = [await dataset.account(user=user) for _ in range(2)]
+    categories = [await dataset.category(user=user) for _ in range(2)]
+
+    transactions = [
+        await dataset.transaction(
+            user=user,
+            account=accounts[i % 2],
+            category=categories[i // 2 % 2],
+            date=DATES[i % 3],
+            type=EnumTransactionType.INCOME if i % 4 < 2 else EnumTransactionType.EXPENSE,
+            amount=Decimal(i + 1),
+        )
+        for i in range(12)
+    ]
+    # Транзакции другого пользователя в суммы не попадают
+    await dataset.transaction(date=DATES[0])
+    return user, accounts, transactions
+
+
+def _expected(transactions, bucket):
+    """Суммы по (тип, период): отдельно по счетам и по категориям"""
+
+    by_accounts = defaultdict(lambda: defaultdict(Decimal))
+    by_categories = defaultdict(lambda: defaultdict(Decimal))
+    for transaction in transactions:
+        key = (transaction.type, bucket(transaction.date))
+        by_accounts[key][transaction.account_id] += transaction.amount
+        by_categories[key][transaction.category_id] += transaction.amount
+    return {key: (dict(by_accounts[key]), dict(by_categories[key])) for key in by_accounts}
+
+
+def _actual(result):
+    actual = {}
+    for type, days in [(EnumTransactionType.INCOME, result.income), (EnumTransactionType.EXPENSE, result.expense)]:
+        assert [day.date for day in days] == sorted({day.date for day in days})
+        actual.update({(type, day.date): (dict(day.by_accounts), dict(day.by_categories)) for day in days})
+    return actual
+
+
+@pytest.mark.parametrize('use_rollup', [True, False])
+@pytest.mark.parametrize(
+    ('granularity', 'bucket'),
+    [(EnumDateGranularity.DAY, lambda date: date), (EnumDateGranularity.MONTH, lambda date: date.replace(day=1))],
+)
+async def test_analytics(session_maker, dataset, granularity, bucket, use_rollup):
+    """Тест группировки по периодам, счетам и категориям: суммы равны посчитанным по транзакциям"""
+
+    user, _, transactions = await _seed(dataset)
+
+    async with session_maker() as db_session:
+        result = await analytics(cur_user=user, db_session=db_session, granularity=granularity, use_rollup=use_rollup)
+
+    assert result.granularity == granularity
+    assert _actual(result) == _expected(transactions, bucket)
+
+
+@pytest.mark.parametrize('use_rollup', [True, False])
+async def test_analytics_filtered(session_maker, dataset, use_rollup):
+    """Тест сумм под фильтрами счета и дат"""
+
+    user, accounts, transactions = await _seed(dataset)
+
+    async with session_maker() as db_session:
+        result = await analytics(
+            cur_user=user,
+            db_session=db_session,
+            use_rollup=use_rollup,
+            account_id=accounts[0].id,
+            min_date=DATES[1],
+            max_date=None,
+        )
+
+    matched = [t for t in transactions if t.account_id == accounts[0].id and t.date >= DATES[1]]
+    assert _actual(result) == _expected(matched, lambda date: date)
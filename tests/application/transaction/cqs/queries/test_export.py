@@ -0,0 +1,77 @@
+import csv
+import datetime as dt
+import gzip
+import io
+import json
+from decimal import Decimal
+
+from application.transaction.cqs.queries.export import EXPORT_FIELDS, EnumExportFormat, handle
+from domain.category.model import Category
+from domain.transaction.model import EnumTransactionType, Transaction
+
+
+async def _seed(session_maker, dataset, count: int):
+    user = await dataset.user()
+    account = await dataset.account(user=user)
+    async with session_maker() as db_session:
+        category = Category(code='food', title='Food', user_id=account.user_id)
+        db_session.add(category)
+        await db_session.flush()
+        db_session.add_all(
+            Transaction(
+                date=dt.date(2024, 1, 1) + dt.timedelta(days=i),
+                type=EnumTransactionType.EXPENSE,
+                user_id=account.user_id,
+                amount=Decimal(i) + Decimal('0.5'),
+                account_id=account.id,
+                category_id=category.id,
+                tags=['t', str(i)],
+                lsn=0,
+            )
+            for i in range(count)
+        )
+        await db_session.commit()
+    return user, account
+
+
+async def _export(session_maker, user, **kwargs) -> bytes:
+    async with session_maker() as db_session:
+        chunks = await handle(cur_user=user, db_session=db_session, **kwargs)
+        return b''.join([chunk async for chunk in chunks])
+
+
+async def test_export_csv(session_maker, dataset):
+    """Тест выгрузки в CSV: заголовок, коды счета и категории, все строки по порядку"""
+
+    user, account = await _seed(session_maker, dataset, 25)
+
+    data = await _export(session_maker, user, fetch_size=10)
+
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    assert tuple(rows[0]) == EXPORT_FIELDS
+    assert len(rows) == 25
+    assert [row['date'] for row in rows] == sorted(row['date'] for row in rows)
+    assert rows[0]['account_code'] == account.code
+    assert rows[0]['category_code'] == 'food'
+    assert rows[3]['amount'].startswith('3.5')
+    assert json.loads(rows[3]['tags']) == ['t', '3']
+
+
+async def test_export_ndjson_gzip(session_maker, dataset):
+    """Тест выгрузки в NDJSON со сжатием и фильтром списка транзакций"""
+
+    user, _ = await _seed(session_maker, dataset, 10)
+
+    data = await _export(
+        session_maker,
+        user,
+        format=EnumExportFormat.NDJSON,
+        compress=True,
+        min_date=dt.date(2024, 1, 5),
+        max_date=None,
+    )
+
+    rows = [json.loads(line) for line in gzip.decompress(data).splitlines()]
+    assert len(rows) == 6
+    assert rows[0]['date'] == '2024-01-05'
+    assert Decimal(rows[0]['amount']) == Decimal('4.5')
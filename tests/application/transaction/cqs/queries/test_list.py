@@ -0,0 +1,49 @@
+import datetime as dt
+
+import pytest
+
+from application.transaction.cqs.queries.list import handle as list_transactions
+from shared.errors.application import InvalidCursorError
+
+
+@pytest.mark.parametrize(('count', 'page_sizes'), [(6, [3, 3]), (7, [3, 3, 1])])
+async def test_list_pages(session_maker, dataset, count, page_sizes):
+    """Тест обхода страниц по курсору: на равных датах нет дублей и пропусков, последняя страница без курсора"""
+
+    user = await dataset.user()
+    account = await dataset.account(user=user)
+    category = await dataset.category(user=user)
+    transactions = [
+        await dataset.transaction(user=user, account=account, category=category, date=dt.date(2024, 1, 1 + i % 2))
+        for i in range(count)
+    ]
+    # Транзакция другого пользователя в выдачу не попадает
+    await dataset.transaction(date=dt.date(2024, 1, 1))
+
+    pages = []
+    cursor = None
+    async with session_maker() as db_session:
+        while True:
+            items, cursor = await list_transactions(cur_user=user, db_session=db_session, cursor=cursor, limit=3)
+            pages.append([transaction.id for transaction in items])
+            if cursor is None:
+                break
+
+    assert [len(page) for page in pages] == page_sizes
+    ordered = sorted(transactions, key=lambda transaction: (transaction.date, transaction.id), reverse=True)
+    assert [transaction_id for page in pages for transaction_id in page] == [transaction.id for transaction in ordered]
+
+
+async def test_list_tampered_cursor(session_maker, dataset):
+    """Тест подмены курсора: измененный токен отклоняется"""
+
+    user = await dataset.user()
+    for _ in range(3):
+        await dataset.transaction(user=user)
+
+    async with session_maker() as db_session:
+        _, cursor = await list_transactions(cur_user=user, db_session=db_session, limit=2)
+        tampered = cursor[:-3] + ('A' if cursor[-3] != 'A' else 'B') + cursor[-2:]
+
+        with pytest.raises(InvalidCursorError):
+            await list_transactions(cur_user=user, db_session=db_session, cursor=tampered, limit=2)
@@ -0,0 +1,56 @@
+import datetime as dt
+from decimal import Decimal
+
+from sqlalchemy import delete, update
+
+from application.transaction.cqs.commands.rebuild_rollup import handle as rebuild_rollup
+from application.transaction.cqs.queries.verify_rollup import handle as verify_rollup
+from domain.transaction.model import EnumTransactionType
+from domain.transaction.rollup import TransactionDailyRollup
+
+
+async def test_verify_rollup(session_maker, dataset):
+    """Тест сверки: внесенные вручную расхождения находятся, пересчет их убирает"""
+
+    user = await dataset.user()
+    account = await dataset.account(user=user)
+    category = await dataset.category(user=user)
+    for day in (1, 1, 2, 3):
+        await dataset.transaction(
+            user=user,
+            account=account,
+            category=category,
+            date=dt.date(2024, 1, day),
+            type=EnumTransactionType.EXPENSE,
+            amount=Decimal(10),
+        )
+
+    async with session_maker() as db_session:
+        assert await verify_rollup(db_session=db_session, user_id=user.id) == []
+
+    key = (user.id, dt.date(2024, 1, 1), EnumTransactionType.EXPENSE, account.id, category.id)
+    missing_key = (user.id, dt.date(2024, 1, 3), EnumTransactionType.EXPENSE, account.id, category.id)
+    async with session_maker() as db_session:
+        await db_session.execute(
+            update(TransactionDailyRollup)
+            .where(TransactionDailyRollup.user_id == user.id, TransactionDailyRollup.date == dt.date(2024, 1, 1))
+            .values(amount=TransactionDailyRollup.amount + 1)
+        )
+        await db_session.execute(
+            delete(TransactionDailyRollup).where(
+                TransactionDailyRollup.user_id == user.id, TransactionDailyRollup.date == dt.date(2024, 1, 3)
+            )
+        )
+        await db_session.commit()
+
+    async with session_maker() as db_session:
+        drifts = {drift.key: drift for drift in await verify_rollup(db_session=db_session, user_id=user.id)}
+
+    assert drifts.keys() == {key, missing_key}
+    assert (drifts[key].expected_amount, drifts[key].actual_amount) == (Decimal(20), Decimal(21))
+    assert (drifts[key].expected_count, drifts[key].actual_count) == (2, 2)
+    assert (drifts[missing_key].expected_count, drifts[missing_key].actual_count) == (1, 0)
+
+    async with session_maker() as db_session:
+        assert await rebuild_rollup(db_session=db_session, user_id=user.id) == 3
+        assert await verify_rollup(db_session=db_session, user_id=user.id) == []
@@ -0,0 +1,133 @@
+import datetime as dt
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+
+from application.transaction.cqs.commands import bulk_delete, bulk_update, delete, update
+from application.transaction.cqs.commands.update import (
+    UpdateTransactionAmountCommand,
+    UpdateTransactionCategoryCommand,
+    UpdateTransactionDateCommand,
+    UpdateTransactionTypeCommand,
+)
+from application.transaction.storage.rollup import ROLLUP_DIMENSIONS, NotExpressibleOnRollup, to_rollup_statement
+from domain.transaction.model import EnumTransactionType, Transaction
+from domain.transaction.rollup import TransactionDailyRollup
+
+
+async def _seed(dataset):
+    """12 транзакций пользователя по 2 счетам и 2 категориям за 3 дня, первые 6 - доходы"""
+
+    user = await dataset.user()
+    accounts = [await dataset.account(user=user) for _ in range(2)]
+    categories = [await dataset.category(user=user) for _ in range(2)]
+
+    for i in range(12):
+        await dataset.transaction(
+            user=user,
+            account=accounts[i % 2],
+            category=categories[i // 2 % 2],
+            date=dt.date(2024, 1, 1 + i % 3),
+            type=EnumTransactionType.INCOME if i < 6 else EnumTransactionType.EXPENSE,
+            amount=Decimal(i + 1),
+        )
+    return user, accounts, categories
+
+
+async def _assert_rollup_matches_transactions(session_maker, user):
+    """Дневные суммы равны агрегату прямо по транзакциям"""
+
+    group_by = [getattr(Transaction, dimension) for dimension in ROLLUP_DIMENSIONS]
+    expected = (
+        select(*group_by, func.sum(Transaction.amount), func.count())
+        .where(Transaction.user_id == user.id)
+        .group_by(*group_by)
+    )
+    actual = select(
+        *(getattr(TransactionDailyRollup, dimension) for dimension in ROLLUP_DIMENSIONS),
+        TransactionDailyRollup.amount,
+        TransactionDailyRollup.count,
+    ).where(TransactionDailyRollup.user_id == user.id, TransactionDailyRollup.count != 0)
+
+    async with session_maker() as db_session:
+        assert set((await db_session.execute(actual)).tuples()) == set((await db_session.execute(expected)).tuples())
+
+
+async def test_rollup_after_create(session_maker, dataset):
+    """Тест дневных сумм после создания транзакций"""
+
+    user, _, _ = await _seed(dataset)
+
+    await _assert_rollup_matches_transactions(session_maker, user)
+
+
+async def test_rollup_after_mixed_writes(session_maker, dataset):
+    """Тест дневных сумм после чередования созданий, изменений, удалений и изменений по фильтру"""
+
+    user, accounts, categories = await _seed(dataset)
+    async with session_maker() as db_session:
+        statement = select(Transaction).where(Transaction.user_id == user.id).order_by(Transaction.id)
+        transactions = list(await db_session.scalars(statement))
+
+    async with session_maker() as db_session:
+        await update.handle(
+            transaction=transactions[0],
+            db_session=db_session,
+            commands=[
+                UpdateTransactionAmountCommand(amount=Decimal(100)),
+                UpdateTransactionDateCommand(date=dt.date(2024, 1, 5)),
+            ],
+        )
+    async with session_maker() as db_session:
+        await update.handle(
+            transaction=transactions[7],
+            db_session=db_session,
+            commands=[
+                UpdateTransactionTypeCommand(type=EnumTransactionType.INCOME),
+                UpdateTransactionCategoryCommand(category_id=categories[0].id),
+            ],
+        )
+    async with session_maker() as db_session:
+        await delete.handle(transaction=transactions[2], db_session=db_session)
+
+    await dataset.transaction(user=user, account=accounts[0], category=categories[1], date=dt.date(2024, 1, 1))
+
+    async with session_maker() as db_session:
+        await bulk_update.handle(
+            cur_user=user,
+            db_session=db_session,
+            commands=[UpdateTransactionAmountCommand(amount=Decimal(7))],
+            account_id=accounts[1].id,
+        )
+    async with session_maker() as db_session:
+        await bulk_delete.handle(cur_user=user, db_session=db_session, min_date=dt.date(2024, 1, 3), max_date=None)
+
+    await _assert_rollup_matches_transactions(session_maker, user)
+
+
+async def test_to_rollup_statement(session_maker, dataset):
+    """Тест перевода агрегата по транзакциям на дневные суммы: результат тот же"""
+
+    user, accounts, _ = await _seed(dataset)
+    statement = (
+        select(Transaction.date, Transaction.category_id, func.sum(Transaction.amount))
+        .where(Transaction.user_id == user.id, Transaction.account_id == accounts[0].id)
+        .group_by(Transaction.date, Transaction.category_id)
+    )
+
+    async with session_maker() as db_session:
+        expected = set((await db_session.execute(statement)).tuples())
+        actual = set((await db_session.execute(to_rollup_statement(statement))).tuples())
+
+    assert expected
+    assert actual == expected
+
+
+def test_to_rollup_statement_not_expressible():
+    """Тест отказа для запроса по колонкам, которых нет в дневных суммах"""
+
+    statement = select(Transaction.date, func.sum(Transaction.amount)).where(Transaction.description == 'coffee')
+
+    with pytest.raises(NotExpressibleOnRollup):
+        to_rollup_statement(statement.group_by(Transaction.date))
@@ -12,6 +12,8 @@ from sqlalchemy.ext.asyncio import (
 
 from domain.account.model import Account
 from shared.cqs.schemas import SchemaBase
+from shared.storage.cursor import set_cursor_secret
+from shared.storage.json import json_serializer
 from shared.utils import uuid as _uuid
 from shared.utils import uuid7 as _uuid7
 
@@ -28,7 +30,7 @@ def uuid():
 
 @pytest.fixture(scope='session')
 def async_engine() -> AsyncEngine:
-    return create_async_engine('sqlite+aiosqlite:///./temp/test.db', echo=False)
+    return create_async_engine('sqlite+aiosqlite:///./temp/test.db', echo=False, json_serializer=json_serializer)
 
 
 @pytest.fixture(scope='session')
@@ -47,6 +49,11 @@ async def db_session(session_maker: async_sessionmaker[AsyncSession]) -> AsyncGe
         yield db_session
 
 
+@pytest.fixture(autouse=True, scope='session')
+def cursor_secret() -> None:
+    set_cursor_secret(b'test-cursor-secret')
+
+
 @pytest.fixture(autouse=True, scope='session')
 async def create_test_tables(async_engine: AsyncEngine) -> None:
     async with async_engine.begin() as conn:
@@ -1,3 +1,4 @@
+import datetime as dt
 import random
 from collections.abc import Callable
 from dataclasses import dataclass
@@ -8,9 +9,14 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from application.account.cqs.commands.create import auto_handle as account_create_handle
 from application.account.cqs.queries.load import auto_handle as account_load_handle
+from application.category.cqs.commands.create import handle as category_create_handle
+from application.transaction.cqs.commands.create import CreateTransactionCommand
+from application.transaction.cqs.commands.create import handle as transaction_create_handle
 from application.user.cqs.commands.create import auto_handle as user_create_handle
 from application.user.cqs.queries.load import auto_handle as user_load_handle
 from domain.account.model import Account, EnumAccountType
+from domain.category.model import Category
+from domain.transaction.model import EnumTransactionType, Transaction
 from domain.user.model import User
 from domain.vo.money import Money
 
@@ -55,3 +61,30 @@ class Dataset:
     async def load_account(self, **kwargs: Any) -> Account | None:
         async with self.session_maker() as db_session:
             return await account_load_handle(db_session=db_session, **kwargs)
+
+    async def category(self, **kwargs: Any) -> Category:
+        kwargs.setdefault('code', self.uuid())
+        kwargs.setdefault('title', self.uuid())
+        kwargs.setdefault('description', random.choice([None, self.uuid()]))
+        kwargs.setdefault('tags', [self.uuid() for _ in range(random.randint(0, 5))])
+        kwargs.setdefault('parent_id', None)
+
+        user = kwargs.pop('user', None) or await self.user()
+
+        async with self.session_maker() as db_session:
+            return await category_create_handle(db_session=db_session, cur_user=user, **kwargs)
+
+    async def transaction(self, **kwargs: Any) -> Transaction:
+        kwargs.setdefault('date', dt.date(2024, 1, random.randint(1, 31)))
+        kwargs.setdefault('description', random.choice([None, self.uuid()]))
+        kwargs.setdefault('tags', [])
+        kwargs.setdefault('type', random.choice(list(EnumTransactionType)))
+        kwargs.setdefault('amount', Money(random.randint(1, 10_000)))
+
+        user = kwargs.pop('user', None) or await self.user()
+        account = kwargs.pop('account', None) or await self.account(user=user)
+        category = kwargs.pop('category', None) or await self.category(user=user)
+        command = CreateTransactionCommand(user_id=user.id, account_id=account.id, category_id=category.id, **kwargs)
+
+        async with self.session_maker() as db_session:
+            return await transaction_create_handle(command=command, db_session=db_session)
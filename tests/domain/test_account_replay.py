@@ -0,0 +1,46 @@
+from domain.account.events import (
+    BalanceAdjustmentPayload,
+    CreatePayload,
+    EditCurrencyPayload,
+    EnumAccountEvent,
+    TransferPayload,
+)
+from domain.account.replay import AccountState
+from domain.vo.money import Money, TransferRate
+
+
+def test_account_state_apply(uuid7):
+    """Свертка событий: перевод с курсом и смена валюты округляются до точности Account.balance"""
+
+    account_id, other_id = uuid7(), uuid7()
+    state = AccountState()
+    events = [
+        (EnumAccountEvent.CREATE, CreatePayload(balance=Money('100.0000'), currency='RUB')),
+        (
+            EnumAccountEvent.TRANSFER_MONEY_SRC,
+            TransferPayload(
+                amount=Money(30), src_account_id=account_id, dst_account_id=other_id, transfer_rate=TransferRate(1)
+            ),
+        ),
+        (
+            EnumAccountEvent.TRANSFER_MONEY_DST,
+            TransferPayload(
+                amount=Money(10),
+                src_account_id=other_id,
+                dst_account_id=account_id,
+                transfer_rate=TransferRate('1.33335'),
+            ),
+        ),
+        (
+            EnumAccountEvent.EDIT_CURRENCY,
+            EditCurrencyPayload(new_currency='USD', old_currency='RUB', transfer_rate=TransferRate('0.5')),
+        ),
+    ]
+    for serial, (event, payload) in enumerate(events, start=1):
+        state.apply(serial=serial, event=event, payload=payload)
+
+    assert (state.balance, state.currency, state.serial) == (Money('41.6668'), 'USD', 4)
+
+    payload = BalanceAdjustmentPayload(old_balance=Money(1), new_balance=Money('7.5'))
+    state.apply(serial=5, event=EnumAccountEvent.BALANCE_ADJUSTMENT, payload=payload)
+    assert (state.balance, state.applied) == (Money('7.5'), 5)
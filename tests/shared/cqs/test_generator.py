@@ -0,0 +1,87 @@
+from typing import Literal
+from uuid import UUID
+
+from pydantic import ConfigDict
+from sqlalchemy import ColumnElement, Select, select
+
+from domain.account.model import Account
+from domain.user.model import User
+from shared.cqs.generator import generate_load_handle
+from shared.cqs.query import QueryFilterBase, QueryStatementBase
+from shared.storage.statement_cache import StatementCache
+
+
+class AccountIDQuery(QueryFilterBase):
+    account_id: UUID
+
+    def render_filter(self) -> ColumnElement[bool]:
+        return Account.id == self.account_id
+
+
+class AccountCodeQuery(QueryFilterBase):
+    code: str
+    match: Literal['EXACT', 'PREFIX'] = 'EXACT'
+
+    def render_filter(self) -> ColumnElement[bool]:
+        if self.match == 'PREFIX':
+            return Account.code.startswith(self.code)
+        return Account.code == self.code
+
+
+class IsolateByUser(QueryFilterBase):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    cur_user: User
+
+    def render_filter(self) -> ColumnElement[bool]:
+        return Account.user_id == self.cur_user.id
+
+
+class ForUpdate(QueryStatementBase):
+    for_update: bool
+
+    def apply_query(self, statement: Select) -> Select:
+        return statement.with_for_update() if self.for_update else statement
+
+
+load_account = generate_load_handle(
+    base_statement=select(Account),
+    query_types=[AccountIDQuery | AccountCodeQuery, ForUpdate, IsolateByUser],
+)
+
+
+async def test_load_statement_cache(dataset, session_maker):
+    """Тест шаблонов load-обработчика: значения полей и атрибуты cur_user - параметры, Literal - форма запроса"""
+
+    users = [await dataset.user() for _ in range(2)]
+    accounts = [await dataset.account(user=user) for user in users]
+    cache: StatementCache = load_account.statement_cache  # type: ignore
+    cache.clear()
+
+    async with session_maker() as db_session:
+        for user, account in zip(users, accounts):
+            loaded = await load_account(account_id=account.id, cur_user=user, db_session=db_session)
+            assert loaded.id == account.id
+        # Чужой счет под изоляцией по пользователю не находится
+        assert await load_account(account_id=accounts[0].id, cur_user=users[1], db_session=db_session) is None
+
+        code = accounts[0].code
+        assert (await load_account(code=code, cur_user=users[0], db_session=db_session)).id == accounts[0].id
+        assert await load_account(code=code[:-1], cur_user=users[0], db_session=db_session) is None
+        prefix = await load_account(code=code[:-1], match='PREFIX', cur_user=users[0], db_session=db_session)
+        assert prefix.id == accounts[0].id
+
+    assert cache.misses == 3
+    assert cache.hits == 3
+
+
+def test_statement_cache_lru():
+    """Тест вытеснения давно не использованных шаблонов при переполнении"""
+
+    cache = StatementCache[str](max_size=2)
+    cache.get('a', lambda: 'a')
+    cache.get('b', lambda: 'b')
+    cache.get('a', lambda: 'a')
+    cache.get('c', lambda: 'c')
+
+    assert list(cache.templates) == ['a', 'c']
@@ -0,0 +1,80 @@
+from typing import Literal
+
+from pydantic import ConfigDict
+from sqlalchemy import ColumnElement, Select, select
+
+from domain.account.model import Account
+from domain.user.model import User
+from shared.cqs.plans import RegisteredHandle, find_seq_scans, make_probes, render_probe
+from shared.cqs.query import QueryFilterBase, QueryStatementBase
+
+
+class AccountIDQuery(QueryFilterBase):
+    account_id: str
+
+    def render_filter(self) -> ColumnElement[bool]:
+        return Account.id == self.account_id
+
+
+class AccountCodeQuery(QueryFilterBase):
+    code: str
+    match: Literal['EXACT', 'PREFIX'] = 'EXACT'
+
+    def render_filter(self) -> ColumnElement[bool]:
+        if self.match == 'PREFIX':
+            return Account.code.startswith(self.code)
+        return Account.code == self.code
+
+
+class IsolateByUser(QueryFilterBase):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    cur_user: User
+
+    def render_filter(self) -> ColumnElement[bool]:
+        return Account.user_id == self.cur_user.id
+
+
+class ForUpdate(QueryStatementBase):
+    for_update: bool
+
+    def apply_query(self, statement: Select) -> Select:
+        return statement.with_for_update() if self.for_update else statement
+
+
+class NeedsValue(QueryFilterBase):
+    titles: list[str]
+
+    def render_filter(self) -> ColumnElement[bool]:
+        return Account.title.in_([title.lower() for title in self.titles])
+
+
+def test_make_probes():
+    """Тест: проба на каждый вариант union, значения запросов - параметры"""
+
+    handle = RegisteredHandle(
+        'load', select(Account), (AccountIDQuery | AccountCodeQuery, ForUpdate, IsolateByUser, NeedsValue)
+    )
+
+    by_id, by_code = make_probes(handle)
+
+    assert by_id.name == 'load accounts [AccountIDQuery, ForUpdate, IsolateByUser, -NeedsValue]'
+    assert by_code.name == 'load accounts [AccountCodeQuery, ForUpdate, IsolateByUser, -NeedsValue]'
+
+    sql = render_probe(by_code.statement)
+    assert "accounts.code = 'probe'" in sql
+    assert 'accounts.user_id = ' in sql
+    assert sql.endswith('FOR UPDATE')
+
+
+def test_find_seq_scans():
+    plan = {
+        'Node Type': 'Nested Loop',
+        'Plans': [
+            {'Node Type': 'Index Scan', 'Relation Name': 'transactions'},
+            {'Node Type': 'Seq Scan', 'Relation Name': 'accounts'},
+        ],
+    }
+
+    assert find_seq_scans(plan) == ['accounts']
+    assert find_seq_scans(plan['Plans'][0]) == []
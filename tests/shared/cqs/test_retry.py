@@ -0,0 +1,24 @@
+import pytest
+
+from shared.cqs.retry import retry_on_conflict
+from shared.errors.application import VersionConflictError
+
+
+async def test_retry_on_conflict():
+    """Тест повтора: конфликт повторяется до attempts раз, затем пробрасывается"""
+
+    calls = []
+
+    @retry_on_conflict(attempts=3, backoff=0)
+    async def handle(*, conflicts: int) -> int:
+        calls.append(1)
+        if len(calls) <= conflicts:
+            raise VersionConflictError
+        return len(calls)
+
+    assert await handle(conflicts=2) == 3
+
+    calls.clear()
+    with pytest.raises(VersionConflictError):
+        await handle(conflicts=3)
+    assert len(calls) == 3
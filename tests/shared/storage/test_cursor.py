@@ -0,0 +1,77 @@
+import datetime as dt
+import uuid
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from domain.account.model import Account
+from domain.category.model import Category
+from shared.errors.application import InvalidCursorError
+from shared.storage.cursor import decode_cursor_values, encode_cursor_values, set_cursor_secret
+from shared.storage.keyset import compile_keyset
+
+
+@pytest.mark.parametrize(
+    'value',
+    [
+        None,
+        True,
+        -(2**70),
+        'код',
+        uuid.UUID('01890a5d-ac96-774b-bcce-b302099a8057'),
+        dt.date(2024, 2, 29),
+        dt.datetime(2025, 1, 1, 12, 30, 0, 15),
+        dt.datetime(2025, 1, 1, 12, tzinfo=dt.timezone(dt.timedelta(hours=3))),
+        Decimal('-0.0100'),
+    ],
+)
+def test_round_trip(value):
+    """Тест кодирования значений курсора без потери типа"""
+
+    [(index, decoded)] = decode_cursor_values(encode_cursor_values([(0, value)]))
+
+    assert index == 0
+    assert type(decoded) is type(value)
+    assert str(decoded) == str(value)
+
+
+def test_tampered_token():
+    """Тест отклонения подмененного курсора"""
+
+    token = encode_cursor_values([(0, 42)])
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor_values(token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB'))
+    with pytest.raises(InvalidCursorError):
+        decode_cursor_values('not a cursor')
+
+
+def test_cursor_bound_to_order():
+    """Тест: курсор одного списка не подходит к списку с другой сортировкой"""
+
+    by_title = compile_keyset(select(Account).order_by(Account.title, Account.id)._order_by_clauses)
+    by_code = compile_keyset(select(Account).order_by(Account.code, Account.id)._order_by_clauses)
+    token = by_title.dumps(by_title.make_cursor(Account(title='a', id=uuid.uuid4())))
+
+    assert by_title.loads(token).values[0].value == 'a'
+    with pytest.raises(InvalidCursorError):
+        by_code.loads(token)
+
+
+def test_cursor_bound_to_table(uuid7):
+    """Тест: курсор одного списка не подходит к списку другой сущности с той же сортировкой"""
+
+    accounts = compile_keyset(select(Account).order_by(Account.id)._order_by_clauses)
+    categories = compile_keyset(select(Category).order_by(Category.id)._order_by_clauses)
+    token = accounts.dumps(accounts.make_cursor(Account(id=uuid7())))
+
+    with pytest.raises(InvalidCursorError):
+        categories.loads(token)
+
+
+def test_cursor_secret_required():
+    """Тест: пустой ключ подписи не принимается"""
+
+    with pytest.raises(ValueError):
+        set_cursor_secret('')
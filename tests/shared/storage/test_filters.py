@@ -0,0 +1,46 @@
+from sqlalchemy.dialects import postgresql
+
+from application.account.storage.repository import AccountFilterHandler, AccountRepository
+from domain.account.model import Account
+from shared.storage.filters import FilterPlan, UseInForArrays
+
+
+def render(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect())).split('WHERE ')[-1]
+
+
+def test_dispatch_table():
+    """Тест таблицы обработчиков, собранной при создании класса"""
+
+    assert set(AccountFilterHandler.filter_methods) == {'account_id', 'for_update'}
+
+
+def test_use_in_declines_scalar(uuid7):
+    """Тест цепочки: массив уходит в IN, скаляр - в сравнение с полем"""
+
+    user_id = uuid7()
+
+    assert render(AccountRepository.select(code=['a', 'b'], user_id=user_id)) == (
+        'accounts.code IN (__[POSTCOMPILE_code_1]) AND accounts.user_id = %(user_id_1)s::UUID'
+    )
+    assert render(AccountRepository.select(code='a', account_id=user_id, for_update=True)) == (
+        'accounts.id = %(id_1)s::UUID AND accounts.code = %(code_1)s FOR UPDATE'
+    )
+
+
+class AccountCodePrefix(UseInForArrays[Account]):
+    @classmethod
+    def code_prefix(cls, entity_cls, statement, value):
+        return statement.where(Account.code.startswith(value))
+
+
+def test_use_in_keeps_subclass_methods():
+    """Тест подкласса UseInForArrays: его методы фильтров работают наравне с IN по полям"""
+
+    assert {'code_prefix', 'for_update'} <= set(AccountCodePrefix.filter_methods)
+
+    plan = FilterPlan(Account, [AccountCodePrefix])
+    statement = plan.apply(AccountRepository.select(), {'code_prefix': 'a', 'title': ['x', 'y']})
+    assert render(statement) == (
+        "(accounts.code LIKE %(code_1)s || '%%') AND accounts.title IN (__[POSTCOMPILE_title_1])"
+    )
@@ -0,0 +1,31 @@
+import datetime as dt
+
+import pytest
+from sqlalchemy import Date, literal, select
+
+from shared.storage.functions import EnumDateGranularity, date_bucket
+
+
+@pytest.mark.parametrize(
+    ('granularity', 'expected'),
+    [
+        (EnumDateGranularity.DAY, dt.date(2024, 6, 9)),
+        (EnumDateGranularity.WEEK, dt.date(2024, 6, 3)),
+        (EnumDateGranularity.MONTH, dt.date(2024, 6, 1)),
+        (EnumDateGranularity.QUARTER, dt.date(2024, 4, 1)),
+        (EnumDateGranularity.YEAR, dt.date(2024, 1, 1)),
+    ],
+)
+async def test_date_bucket(db_session, granularity, expected):
+    """Тест начала периода для даты (2024-06-09 - воскресенье)"""
+
+    assert await db_session.scalar(select(date_bucket(granularity, literal(dt.date(2024, 6, 9), Date)))) == expected
+
+
+def test_date_bucket_cache_key():
+    """Тест: гранулярность входит в ключ кэша запроса"""
+
+    month = select(date_bucket(EnumDateGranularity.MONTH, literal(dt.date(2024, 6, 9), Date)))
+    year = select(date_bucket(EnumDateGranularity.YEAR, literal(dt.date(2024, 6, 9), Date)))
+
+    assert month._generate_cache_key() != year._generate_cache_key()
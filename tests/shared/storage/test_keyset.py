@@ -0,0 +1,55 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from domain.account.events import AccountEvent
+from domain.account.model import Account
+from shared.storage.cursor import EnumDirection
+from shared.storage.keyset import compile_keyset
+
+
+def render_where(statement, cursor) -> str:
+    keyset = compile_keyset(statement._order_by_clauses)
+    return str(keyset.render(cursor).compile(dialect=postgresql.dialect()))
+
+
+def test_single_column_desc():
+    """Тест курсора по одной колонке"""
+
+    statement = select(AccountEvent).order_by(AccountEvent.serial.desc())
+    keyset = compile_keyset(statement._order_by_clauses)
+    cursor = keyset.make_cursor(AccountEvent(serial=42))
+
+    assert [(value.field_name, value.direction, value.value) for value in cursor.values] == [
+        ('serial', EnumDirection.DESC, 42)
+    ]
+    assert render_where(statement, cursor) == 'account_events.serial < %(serial_1)s'
+
+
+def test_row_value_for_uniform_direction(uuid7):
+    """Тест сравнения строк (a, b) > (:a, :b) при одинаковом направлении"""
+
+    statement = select(Account).order_by(Account.code, Account.id)
+    cursor = compile_keyset(statement._order_by_clauses).make_cursor(Account(code='code', id=uuid7()))
+
+    assert render_where(statement, cursor).startswith('(accounts.code, accounts.id) > (')
+
+
+def test_expanded_for_mixed_directions(uuid7):
+    """Тест раскрытия в OR при разных направлениях"""
+
+    statement = select(Account).order_by(Account.code.desc(), Account.id)
+    cursor = compile_keyset(statement._order_by_clauses).make_cursor(Account(code='code', id=uuid7()))
+
+    assert ' OR ' in render_where(statement, cursor)
+
+
+def test_plan_cached_per_order_shape():
+    """Тест того, что разбор формы ORDER BY кэшируется по форме, а не по объектам выражений"""
+
+    first = compile_keyset(select(AccountEvent).order_by(AccountEvent.serial.desc())._order_by_clauses)
+    second = compile_keyset(
+        select(AccountEvent).where(AccountEvent.serial > 0).order_by(AccountEvent.serial.desc())._order_by_clauses
+    )
+
+    assert first.get_values is second.get_values
+    assert first.signature == second.signature
@@ -0,0 +1,242 @@
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from application.account.storage.repository import AccountRepository
+from domain.account.model import Account
+from shared.errors.application import NotFoundError
+from shared.storage.repository import RepositoryBase, RepositoryConfig
+
+
+async def test_load_many(dataset, session_maker, uuid7):
+    """Тест пачечной загрузки аккаунтов по первичным ключам"""
+
+    accounts = [await dataset.account() for _ in range(3)]
+    missing_id = uuid7()
+
+    async with session_maker() as db_session:
+        account_repo = AccountRepository(db_session)
+        loaded = await account_repo.load_many(accounts[2].id, missing_id, accounts[0].id, accounts[2].id)
+
+    assert [account and account.id for account in loaded] == [accounts[2].id, None, accounts[0].id, accounts[2].id]
+
+
+async def test_load_many_or_error(dataset, session_maker, uuid7):
+    """Тест ошибки при отсутствии части ключей"""
+
+    account = await dataset.account()
+    missing_id = uuid7()
+
+    async with session_maker() as db_session:
+        with pytest.raises(NotFoundError) as exc_info:
+            await AccountRepository(db_session).load_many_or_error(account.id, missing_id)
+
+    assert exc_info.value.details == {'missing': [missing_id]}
+
+
+async def test_load_many_by(dataset, session_maker, uuid):
+    """Тест пачечной загрузки аккаунтов по коду"""
+
+    user = await dataset.user()
+    accounts = [await dataset.account(user=user) for _ in range(2)]
+
+    async with session_maker() as db_session:
+        loaded = await AccountRepository(db_session).load_many_by(
+            'code', [accounts[1].code, uuid(), accounts[0].code], user_id=user.id
+        )
+
+    assert [account and account.id for account in loaded] == [accounts[1].id, None, accounts[0].id]
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+async def test_ilist_prefetch(dataset, session_maker, prefetch):
+    """Тест обхода keyset-страниц с предзагрузкой"""
+
+    user = await dataset.user()
+    accounts = [await dataset.account(user=user) for _ in range(5)]
+
+    async with session_maker() as db_session:
+        account_repo = AccountRepository(db_session)
+        statement = account_repo.select(user_id=user.id).order_by(Account.id).limit(2)
+        loaded_ids = [account.id async for account in account_repo.ilist(statement, prefetch=prefetch)]
+
+    assert loaded_ids == sorted(account.id for account in accounts)
+
+
+async def test_ibatch_prefetch_early_stop(dataset, session_maker):
+    """Тест остановки итерации с предзагрузкой до конца выборки"""
+
+    user = await dataset.user()
+    [await dataset.account(user=user) for _ in range(5)]
+
+    async with session_maker() as db_session:
+        account_repo = AccountRepository(db_session)
+        statement = account_repo.select(user_id=user.id).order_by(Account.id).limit(2)
+
+        async with aclosing(account_repo.ibatch(statement, prefetch=2)) as batches:
+            async for items in batches:
+                assert len(items) == 2
+                break
+
+        assert await account_repo.exists(user_id=user.id)
+
+
+async def test_ibatch_prefetch_overlap(dataset, session_maker):
+    """Тест prefetch=1: следующая страница загружается, пока обрабатывается текущая"""
+
+    user = await dataset.user()
+    [await dataset.account(user=user) for _ in range(5)]
+
+    async with session_maker() as db_session:
+        account_repo = AccountRepository(db_session)
+        statement = account_repo.select(user_id=user.id).order_by(Account.id).limit(2)
+
+        list_cursor = account_repo.list_cursor
+        fetched_pages = 0
+        next_page_fetched = asyncio.Event()
+
+        async def counting_list_cursor(*args, **kwargs):
+            nonlocal fetched_pages
+            result = await list_cursor(*args, **kwargs)
+            fetched_pages += 1
+            if fetched_pages == 2:
+                next_page_fetched.set()
+            return result
+
+        account_repo.list_cursor = counting_list_cursor
+
+        async with aclosing(account_repo.ibatch(statement, prefetch=1)) as batches:
+            assert len(await anext(batches)) == 2
+            # Первая страница еще не отпущена, вторая уже должна быть загружена
+            await asyncio.wait_for(next_page_fetched.wait(), timeout=5)
+            assert [len(items) async for items in batches] == [2, 1]
+
+
+async def test_stream(dataset, session_maker):
+    """Тест потокового чтения через серверный курсор"""
+
+    user = await dataset.user()
+    accounts = [await dataset.account(user=user) for _ in range(5)]
+
+    async with session_maker() as db_session:
+        account_repo = AccountRepository(db_session)
+        result = await account_repo.stream(account_repo.select(user_id=user.id).order_by(Account.id), fetch_size=2)
+        partitions = [[account.id for account in partition] async for partition in result.partitions()]
+
+    assert [len(partition) for partition in partitions] == [2, 2, 1]
+    assert sum(partitions, []) == sorted(account.id for account in accounts)
+
+
+async def test_statement_cache(dataset, session_maker, uuid7):
+    """Тест переиспользования шаблонов запросов по форме фильтров"""
+
+    user = await dataset.user()
+    accounts = [await dataset.account(user=user) for _ in range(3)]
+    AccountRepository.statement_cache.clear()
+
+    async with session_maker() as db_session:
+        account_repo = AccountRepository(db_session)
+        for account in accounts:
+            assert (await account_repo.load(account.id)).id == account.id
+            assert (await account_repo.load_by(account_id=account.id, user_id=user.id)).id == account.id
+        assert not await account_repo.exists(account_id=uuid7(), user_id=user.id)
+        # Массивы не кэшируются
+        assert await account_repo.load_by(account_id=[accounts[0].id], user_id=user.id) is not None
+
+    assert AccountRepository.statement_cache.misses == 3
+    assert AccountRepository.statement_cache.hits == 4
+
+
+async def test_insert_many(dataset, session_maker):
+    """Тест многострочной вставки с умолчаниями и RETURNING"""
+
+    user = await dataset.user()
+
+    async with session_maker() as db_session:
+        account_repo = AccountRepository(db_session)
+        accounts = await account_repo.insert_many(
+            [{'code': f'bulk-{i}', 'title': 'Bulk', 'user_id': user.id} for i in range(5)]
+            + [Account(code='bulk-entity', title='Bulk', user_id=user.id)]
+        )
+        await db_session.commit()
+
+    assert [account.code for account in accounts] == [*(f'bulk-{i}' for i in range(5)), 'bulk-entity']
+    assert all(account.id and account.serial and account.created_at for account in accounts)
+    assert accounts[0].tags == []
+
+
+async def test_upsert_many(dataset, session_maker):
+    """Тест вставки с обновлением по уникальному ключу"""
+
+    user = await dataset.user()
+    account = await dataset.account(user=user)
+
+    async with session_maker() as db_session:
+        accounts = await AccountRepository(db_session).upsert_many(
+            [
+                {'code': account.code, 'title': 'Updated', 'user_id': user.id},
+                {'code': 'upsert-new', 'title': 'New', 'user_id': user.id},
+            ],
+            index_elements=['user_id', 'code'],
+        )
+        await db_session.commit()
+
+    assert [(item.id == account.id, item.title) for item in accounts] == [(True, 'Updated'), (False, 'New')]
+
+
+async def test_copy_many(dataset, session_maker):
+    """Тест вставки без RETURNING (на sqlite - через INSERT)"""
+
+    user = await dataset.user()
+
+    async with session_maker() as db_session:
+        account_repo = AccountRepository(db_session)
+        count = await account_repo.copy_many(
+            {'code': f'copy-{i}', 'title': 'Copy', 'user_id': user.id} for i in range(3)
+        )
+        await db_session.commit()
+
+        assert count == 3
+        assert len(await account_repo.list_full(account_repo.select(user_id=user.id))) == 3
+
+
+class LimitedAccountRepository(
+    RepositoryBase[Account],
+    config=RepositoryConfig(entity_cls=Account, primary_key=Account.id, max_limit=2),
+):
+    pass
+
+
+async def test_list_cursor_limit(dataset, session_maker):
+    """Тест размера страницы: limit ограничен сверху max_limit"""
+
+    user = await dataset.user()
+    [await dataset.account(user=user) for _ in range(3)]
+
+    async with session_maker() as db_session:
+        account_repo = LimitedAccountRepository(db_session)
+        statement = account_repo.select(user_id=user.id).order_by(Account.id)
+
+        assert len((await account_repo.list_cursor(statement, limit=1))[0]) == 1
+        assert len((await account_repo.list_cursor(statement, limit=100))[0]) == 2
+
+
+async def test_compare_and_swap(dataset, session_maker):
+    """Тест CAS по lsn: совпавшая версия меняет строку и lsn, устаревшая - ничего не меняет"""
+
+    account = await dataset.account()
+
+    async with session_maker() as db_session:
+        account_repo = AccountRepository(db_session)
+        lsn = (await account_repo.load(account.id)).lsn
+
+        updated = await account_repo.compare_and_swap(account.id, expected_lsn=lsn, values={'title': 'new'})
+        assert updated.title == 'new'
+        assert updated.lsn != lsn
+
+        assert await account_repo.compare_and_swap(account.id, expected_lsn=lsn, values={'title': 'stale'}) is None
+        await db_session.commit()
+
+    async with session_maker() as db_session:
+        assert (await AccountRepository(db_session).load(account.id)).title == 'new'
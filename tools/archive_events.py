@@ -0,0 +1,40 @@
+"""
+Перенос событий счетов старше срока хранения в архивную таблицу.
+
+    DATABASE_URL=postgresql+asyncpg://... PYTHONPATH=src python tools/archive_events.py [--batch-size N]
+
+Несвернутые события LEDGER и события, чьи поля еще в JSON, остаются до сворачивания и migrate_event_payloads.
+Место в account_events переиспользуется новыми строками после обычного VACUUM.
+"""
+
+import argparse
+import asyncio
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from application.account.cqs.commands.archive_events import ARCHIVE_BATCH_SIZE
+from application.account.cqs.commands.archive_events import handle as archive
+from shared.storage.json import json_serializer
+
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='событий в одной транзакции')
+    args = parser.parse_args()
+
+    engine = create_async_engine(DATABASE_URL, json_serializer=json_serializer)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    try:
+        async with session_maker() as db_session:
+            archived = await archive(db_session=db_session, batch_size=args.batch_size)
+    finally:
+        await engine.dispose()
+
+    print(f'archived {archived} events')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+"""
+Умолчание lsn при вставке для счетов и категорий и lsn для строк, которые ни разу не изменялись.
+
+    DATABASE_URL=postgresql+asyncpg://... PYTHONPATH=src python tools/backfill_lsn.py [--batch-size N]
+
+Пока lsn выдавался только при UPDATE, такие строки хранили NULL. Повторный запуск ничего не меняет.
+"""
+
+import argparse
+import asyncio
+import os
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from domain.account.model import Account
+from domain.category.model import Category
+
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=10_000, help='строк в одной транзакции')
+    args = parser.parse_args()
+
+    engine = create_async_engine(DATABASE_URL)
+    try:
+        for entity_cls in (Account, Category):
+            table = entity_cls.__table__
+            async with engine.begin() as conn:
+                await conn.execute(text(f'ALTER TABLE {table.name} ALTER COLUMN lsn SET DEFAULT next_val()'))
+
+            backfilled = 0
+            while True:
+                pending = select(table.c.id).where(table.c.lsn.is_(None)).limit(args.batch_size)
+                statement = update(table).where(table.c.id.in_(pending)).values(lsn=func.next_val())
+                async with engine.begin() as conn:
+                    if not (rowcount := (await conn.execute(statement)).rowcount):
+                        break
+                backfilled += rowcount
+
+            print(f'{table.name}: backfilled {backfilled} rows')
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
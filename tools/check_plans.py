@@ -0,0 +1,194 @@
+"""
+Проверка планов запросов сгенерированных list/load обработчиков: EXPLAIN каждой пробы
+при enable_seqscan = off, падает если план все равно читает таблицу последовательно - нет подходящего индекса.
+
+    PLANS_DATABASE_URL=postgresql+asyncpg://... PYTHONPATH=src python tools/check_plans.py [--seed N] [--output F]
+
+Схема в базе должна существовать. --seed N добавляет N пользователей и их данные на время проверки.
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import importlib
+import itertools
+import json
+import os
+import random
+import sys
+from decimal import Decimal
+from pathlib import Path
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import application
+from domain.account.events import AccountEvent, EnumAccountEvent
+from domain.account.model import Account, EnumAccountStatus
+from domain.category.model import Category, EnumCategoryStatus
+from domain.transaction.model import EnumTransactionType, Transaction
+from domain.user.model import User
+from shared.cqs.plans import explain, find_seq_scans, iter_probes
+
+DATABASE_URL = os.environ.get('PLANS_DATABASE_URL', '')
+
+ACCOUNTS_PER_USER = 5
+CATEGORIES_PER_USER = 20
+TRANSACTIONS_PER_USER = 2000
+EVENTS_PER_USER = 500
+CHUNK_SIZE = 2000
+
+
+def import_handlers() -> list[str]:
+    """Импортирует модули application, обработчики регистрируются при импорте"""
+
+    # Пакеты без __init__.py, pkgutil.walk_packages их не обходит
+    failed = []
+    for root in map(Path, application.__path__):
+        for path in sorted(root.rglob('*.py')):
+            module_name = '.'.join(('application', *path.relative_to(root).with_suffix('').parts))
+            try:
+                importlib.import_module(module_name.removesuffix('.__init__'))
+            except Exception as error:
+                failed.append(f'{module_name}: {error!r}')
+    return failed
+
+
+def make_rows(user_ids: list[UUID]) -> dict[type, list[dict]]:
+    now = dt.datetime.now(dt.UTC)
+    today = dt.date.today()
+    rows = {entity_cls: list[dict]() for entity_cls in (User, Account, Category, Transaction, AccountEvent)}
+
+    for user_id in user_ids:
+        rows[User].append({'id': user_id, 'nickname': f'plans-{user_id}', 'lsn': 0, 'updated': now})
+        accounts = [uuid4() for _ in range(ACCOUNTS_PER_USER)]
+        categories = [uuid4() for _ in range(CATEGORIES_PER_USER)]
+        rows[Account].extend(
+            {
+                'id': account_id,
+                'code': f'account-{i}',
+                'user_id': user_id,
+                'title': f'Account {i}',
+                'status': random.choice(list(EnumAccountStatus)),
+                'lsn': 0,
+                'updated_at': now,
+            }
+            for i, account_id in enumerate(accounts)
+        )
+        rows[Category].extend(
+            {
+                'id': category_id,
+                'code': f'category-{i}',
+                'user_id': user_id,
+                'title': f'Category {i}',
+                'status': random.choice(list(EnumCategoryStatus)),
+                'lsn': 0,
+                'updated_at': now,
+            }
+            for i, category_id in enumerate(categories)
+        )
+        rows[Transaction].extend(
+            {
+                'id': uuid4(),
+                'date': today - dt.timedelta(days=random.randrange(730)),
+                'type': random.choice(list(EnumTransactionType)),
+                'user_id': user_id,
+                'amount': Decimal(random.randrange(100, 100_000)) / 100,
+                'account_id': random.choice(accounts),
+                'category_id': random.choice(categories),
+                'lsn': 0,
+                'updated': now,
+            }
+            for _ in range(TRANSACTIONS_PER_USER)
+        )
+        rows[AccountEvent].extend(
+            {
+                'user_id': user_id,
+                'account_id': random.choice(accounts),
+                'event': EnumAccountEvent.BALANCE_ADJUSTMENT,
+                'old_balance': Decimal(0),
+                'new_balance': Decimal(0),
+            }
+            for _ in range(EVENTS_PER_USER)
+        )
+    return rows
+
+
+async def seed(session_maker: async_sessionmaker[AsyncSession], user_ids: list[UUID]) -> None:
+    async with session_maker() as db_session:
+        for entity_cls, rows in make_rows(user_ids).items():
+            for chunk in itertools.batched(rows, CHUNK_SIZE):
+                await db_session.execute(insert(entity_cls), chunk)
+        await db_session.commit()
+
+    async with session_maker() as db_session:
+        await db_session.execute(text('ANALYZE'))
+        await db_session.commit()
+
+
+async def cleanup(session_maker: async_sessionmaker[AsyncSession], user_ids: list[UUID]) -> None:
+    async with session_maker() as db_session:
+        for entity_cls in (AccountEvent, Transaction, Category, Account):
+            await db_session.execute(delete(entity_cls).where(entity_cls.user_id.in_(user_ids)))
+        await db_session.execute(delete(User).where(User.id.in_(user_ids)))
+        await db_session.commit()
+
+
+async def check(session_maker: async_sessionmaker[AsyncSession], output: str | None) -> int:
+    failures, plans = 0, {}
+    for probe in iter_probes():
+        async with session_maker() as db_session:
+            try:
+                plan = await explain(db_session, probe.statement)
+            except Exception as error:
+                failures += 1
+                print(f'ERROR {probe.name}: {error!r}')
+                continue
+            finally:
+                await db_session.rollback()
+
+        plans[probe.name] = plan
+        if seq_scans := find_seq_scans(plan):
+            failures += 1
+            print(f'SEQ   {probe.name}: {", ".join(seq_scans)}')
+        else:
+            print(f'OK    {probe.name}')
+
+    if output:
+        await asyncio.to_thread(Path(output).write_text, json.dumps(plans, indent=2, ensure_ascii=False))
+    return failures
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seed', type=int, default=0, help='сколько добавить тестовых пользователей')
+    parser.add_argument('--output', help='файл для планов в JSON')
+    args = parser.parse_args()
+
+    if not DATABASE_URL.startswith('postgresql'):
+        print('PLANS_DATABASE_URL должен указывать на postgresql')
+        return 2
+
+    # Необработанный модуль - непроверенные планы его обработчиков, это провал, а не пропуск
+    import_failures = import_handlers()
+    for failed in import_failures:
+        print(f'IMPORT {failed}')
+
+    engine = create_async_engine(DATABASE_URL)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    user_ids = [uuid4() for _ in range(args.seed)]
+    try:
+        if user_ids:
+            await seed(session_maker, user_ids)
+        failures = await check(session_maker, args.output)
+    finally:
+        if user_ids:
+            await cleanup(session_maker, user_ids)
+        await engine.dispose()
+
+    return 1 if failures or import_failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
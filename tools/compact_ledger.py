@@ -0,0 +1,45 @@
+"""
+Фоновое сворачивание дельт счетов в режиме LEDGER в снимки балансов.
+
+    DATABASE_URL=postgresql+asyncpg://... PYTHONPATH=src python tools/compact_ledger.py [--interval S] [--once]
+
+Пока очередь не пуста, пачки сворачиваются подряд, затем пауза --interval секунд.
+"""
+
+import argparse
+import asyncio
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from application.account.cqs.commands.compact_ledger import COMPACT_BATCH_SIZE
+from application.account.cqs.commands.compact_ledger import handle as compact
+from shared.storage.json import json_serializer
+
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--interval', type=float, default=1.0, help='пауза в секундах, когда сворачивать нечего')
+    parser.add_argument('--limit', type=int, default=COMPACT_BATCH_SIZE, help='событий за одну транзакцию')
+    parser.add_argument('--once', action='store_true', help='свернуть текущую очередь и выйти')
+    args = parser.parse_args()
+
+    engine = create_async_engine(DATABASE_URL, json_serializer=json_serializer)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    try:
+        while True:
+            async with session_maker() as db_session:
+                folded = await compact(db_session=db_session, limit=args.limit)
+            print(f'folded {folded} events', flush=True)
+            if folded < args.limit:
+                if args.once:
+                    break
+                await asyncio.sleep(args.interval)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
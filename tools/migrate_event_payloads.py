@@ -0,0 +1,40 @@
+"""
+Перенос полей событий счетов из JSON data в типизированные колонки.
+
+    DATABASE_URL=postgresql+asyncpg://... PYTHONPATH=src python tools/migrate_event_payloads.py [--batch-size N]
+
+Колонки должны существовать. Пока перенос не закончен, чтение декодирует старый и новый форматы.
+Место, освобожденное data, таблица вернет после VACUUM FULL (или pg_repack без долгой блокировки).
+"""
+
+import argparse
+import asyncio
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from application.account.cqs.commands.migrate_event_payloads import MIGRATE_BATCH_SIZE
+from application.account.cqs.commands.migrate_event_payloads import handle as migrate
+from shared.storage.json import json_serializer
+
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=MIGRATE_BATCH_SIZE, help='событий в одной транзакции')
+    args = parser.parse_args()
+
+    engine = create_async_engine(DATABASE_URL, json_serializer=json_serializer)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    try:
+        async with session_maker() as db_session:
+            migrated = await migrate(db_session=db_session, batch_size=args.batch_size)
+    finally:
+        await engine.dispose()
+
+    print(f'migrated {migrated} events')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
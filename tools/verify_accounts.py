@@ -0,0 +1,47 @@
+"""
+Сверка балансов и валют всех счетов против воспроизведения их событий.
+
+    DATABASE_URL=postgresql+asyncpg://... PYTHONPATH=src python tools/verify_accounts.py [--batch-size N]
+
+Код выхода 1, если есть расхождения.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from application.account.cqs.commands.verify_replay import VERIFY_BATCH_SIZE, VERIFY_CONCURRENCY
+from application.account.cqs.commands.verify_replay import handle as verify
+from shared.storage.json import json_serializer
+
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=VERIFY_BATCH_SIZE, help='счетов в одной транзакции')
+    parser.add_argument('--concurrency', type=int, default=VERIFY_CONCURRENCY, help='пачек одновременно')
+    args = parser.parse_args()
+
+    engine = create_async_engine(DATABASE_URL, json_serializer=json_serializer, pool_size=args.concurrency + 1)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    try:
+        report = await verify(
+            async_session_maker=session_maker,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+        )
+    finally:
+        await engine.dispose()
+
+    for mismatch in report.mismatched:
+        print(f'MISMATCH {mismatch.model_dump_json()}')
+    print(f'checked {report.checked} accounts, {len(report.mismatched)} mismatched')
+    return 1 if report.mismatched else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))